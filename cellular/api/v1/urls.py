@@ -1,8 +1,8 @@
 from django.urls import path
 
 from cellular.api.v1.views.calibration import CalibrationView, RefLossView
-from cellular.api.v1.views.positioning import LocateUserView, SnapshotLocateView
-from cellular.api.v1.views.system import DbInfoView
+from cellular.api.v1.views.positioning import LocateBatchView, LocateUserView, SnapshotLocateView
+from cellular.api.v1.views.system import DbInfoView, ProvidersStatusView
 from cellular.api.v1.views.towers import (
     CellTowerBoundingBoxView,
     CellTowerBulkUploadView,
@@ -15,6 +15,7 @@ from cellular.api.v1.views.towers import (
 urlpatterns = [
     # --- Positioning ---
     path("locate/", LocateUserView.as_view(), name="locate_user"),
+    path("locate/batch/", LocateBatchView.as_view(), name="locate_batch"),
     path("snapshot/locate/", SnapshotLocateView.as_view(), name="snapshot_locate"),
 
     # --- Towers ---
@@ -31,4 +32,5 @@ urlpatterns = [
 
     # --- System ---
     path("system/db-info/", DbInfoView.as_view(), name="db_info"),
+    path("system/providers/", ProvidersStatusView.as_view(), name="providers_status"),
 ]
@@ -5,13 +5,21 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from cellular.models import CellTower
+from cellular.permissions import ImportApiKeyPermission
 from cellular.serializers import (
     CalibrationRequestSerializer,
     CalibrationResponseSerializer,
     RefLossRequestSerializer,
     RefLossResponseSerializer,
 )
-from cellular.utils.geometry import earfcn_to_freq_mhz, estimate_ref_loss_from_earfcn
+from cellular.utils.geometry import earfcn_to_freq_mhz, estimate_ref_loss_from_earfcn, tower_path_loss
+
+# Plausible path-loss exponents: ~2 in free space up to ~6 deep indoors/dense urban.
+PATH_LOSS_N_MIN = 1.6
+PATH_LOSS_N_MAX = 6.0
+# Weight of one new sample against the exponent already stored on the tower.
+PATH_LOSS_N_SAMPLE_WEIGHT = 0.25
 
 
 class CalibrationView(APIView):
@@ -20,7 +28,11 @@ class CalibrationView(APIView):
     @extend_schema(
         request=CalibrationRequestSerializer,
         responses=CalibrationResponseSerializer,
-        description="Compute effective path-loss exponent `n` from ground-truth sample",
+        description=(
+            "Compute effective path-loss exponent `n` from ground-truth sample. With `tower_id`, the tower's "
+            "position and constants are the defaults and a positive `n`, clamped to a plausible range and "
+            "blended with the tower's stored exponent, is saved as its `path_loss_n`."
+        ),
         summary="Calibration: compute n_effective",
         tags=["Calibration"],
     )
@@ -29,12 +41,23 @@ class CalibrationView(APIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
+        tower = None
+        if data.get("tower_id") is not None:
+            # Writes tower data, so it is guarded like the imports.
+            if not ImportApiKeyPermission().has_permission(request, self):
+                self.permission_denied(request, message=ImportApiKeyPermission.message)
+            tower = CellTower.objects.filter(pk=data["tower_id"]).first()
+            if tower is None:
+                return Response({"error": "tower not found"}, status=status.HTTP_404_NOT_FOUND)
+        tower_lat = data["tower_lat"] if data.get("tower_lat") is not None else tower.lat
+        tower_lon = data["tower_lon"] if data.get("tower_lon") is not None else tower.lon
+
         # compute distance between tower and user
         import math
 
         R = 6371000.0
-        lat1 = math.radians(data["tower_lat"])
-        lon1 = math.radians(data["tower_lon"])
+        lat1 = math.radians(tower_lat)
+        lon1 = math.radians(tower_lon)
         lat2 = math.radians(data["user_lat"])
         lon2 = math.radians(data["user_lon"])
         dlat = lat2 - lat1
@@ -47,8 +70,10 @@ class CalibrationView(APIView):
         ref_loss = data.get("ref_loss")
         from math import log10
 
-        tx_eff = tx if tx is not None else 40.0
-        ref_eff = ref_loss if ref_loss is not None else 80.0
+        # The constants the solvers use for this tower (see tower_path_loss), unless overridden.
+        tower_tx, _n, tower_ref = tower_path_loss(tower) if tower is not None else (40.0, None, 80.0)
+        tx_eff = tx if tx is not None else tower_tx
+        ref_eff = ref_loss if ref_loss is not None else tower_ref
         if d <= 0:
             return Response(
                 {"error": "distance between tower and user must be > 0"},
@@ -57,13 +82,29 @@ class CalibrationView(APIView):
 
         n_effective = ((tx_eff - data["rsrp"]) - ref_eff) / (10.0 * log10(d))
 
+        details = {
+            "distance_m": f"{d:.2f}",
+            "tx_used": str(tx_eff),
+            "ref_loss_used": str(ref_eff),
+        }
+        if tower is not None:
+            # A non-positive exponent means the sample contradicts the model; keep the old one.
+            saved = n_effective > 0
+            if saved:
+                # One noisy sample must not decide every later fix: clamp it, then move the
+                # stored exponent only part of the way towards it.
+                n_sample = min(PATH_LOSS_N_MAX, max(PATH_LOSS_N_MIN, n_effective))
+                if tower.path_loss_n is not None:
+                    n_sample = tower.path_loss_n + PATH_LOSS_N_SAMPLE_WEIGHT * (n_sample - tower.path_loss_n)
+                tower.path_loss_n = float(n_sample)
+                tower.save(update_fields=["path_loss_n", "updated_at"])
+            details["path_loss_n_saved"] = str(saved).lower()
+            if tower.path_loss_n is not None:
+                details["path_loss_n"] = f"{tower.path_loss_n:.4f}"
+
         resp = {
             "n_effective": float(n_effective),
-            "details": {
-                "distance_m": f"{d:.2f}",
-                "tx_used": str(tx_eff),
-                "ref_loss_used": str(ref_eff),
-            },
+            "details": details,
         }
         resp_ser = CalibrationResponseSerializer(resp)
         return Response(resp_ser.data, status=status.HTTP_200_OK)
@@ -12,9 +12,13 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from cellular.services.locator import build_anchor_markers, locate_cells
+from cellular.services.batch_locator import locate_batch
+from cellular.services.locator import build_anchor_markers, locate_cells, resolve_requests
 from cellular.services.tower_resolver import TowerResolver
+from cellular.services.tracking import locate_tracked
 from cellular.serializers import (
+    LocateBatchRequestSerializer,
+    LocateBatchResponseSerializer,
     LocateUserRequestSerializer,
     LocateUserResponseSerializer,
     SnapshotLocateRequestSerializer,
@@ -62,9 +66,18 @@ class LocateUserView(APIView):
             )
 
         cells_data = serializer.validated_data.get("cells", [])
+        device_id = serializer.validated_data.get("device_id")
+        measured_at = serializer.validated_data.get("timestamp")
 
         try:
-            response_data = locate_cells(cells_data)
+            if device_id:
+                response_data = locate_tracked(
+                    cells_data,
+                    device_id=device_id,
+                    timestamp=measured_at.timestamp() if measured_at is not None else None,
+                )
+            else:
+                response_data = locate_cells(cells_data)
         except ValueError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:  # noqa
@@ -80,6 +93,54 @@ class LocateUserView(APIView):
         )
 
 
+class LocateBatchView(APIView):
+    """
+    Locate many device reports in one request: all towers are resolved in one
+    batched pass and the solvers run over arrays for the whole batch.
+    Each report is validated and located on its own; failures are reported per item.
+    """
+
+    @extend_schema(
+        request=LocateBatchRequestSerializer,
+        responses=LocateBatchResponseSerializer,
+        summary="Locate many reports",
+        description="Batch version of locate: results are returned in request order, with a per-item error instead of failing the batch.",
+        tags=["Positioning"],
+    )
+    def post(self, request):
+        batch = LocateBatchRequestSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        reports = batch.validated_data["reports"]
+        allow_external = batch.validated_data["allow_external"]
+
+        items: list[dict] = [{"index": i} for i in range(len(reports))]
+        valid_idx: list[int] = []
+        valid_cells: list[list[dict]] = []
+        for i, report in enumerate(reports):
+            serializer = LocateUserRequestSerializer(data=report)
+            if not serializer.is_valid():
+                items[i].update({"error": "Invalid request format", "details": serializer.errors})
+                continue
+            valid_idx.append(i)
+            valid_cells.append(serializer.validated_data.get("cells", []))
+
+        try:
+            outcomes = locate_batch(valid_cells, allow_external_serving=allow_external)
+        except Exception as exc:  # noqa
+            logger.exception("Batch locate error: %s", exc)
+            return Response(
+                {"error": "Unable to compute location"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        for i, outcome in zip(valid_idx, outcomes):
+            if "error" in outcome:
+                items[i]["error"] = outcome["error"]
+            else:
+                items[i]["result"] = LocateUserResponseSerializer(outcome).data
+        return Response({"results": items}, status=status.HTTP_200_OK)
+
+
 class SnapshotLocateView(APIView):
     """
     Fetch a snapshot JSON from an external API endpoint, extract raw_data.cellTowerInfo,
@@ -144,7 +205,8 @@ class SnapshotLocateView(APIView):
         raw = snapshot.get("raw_data") or {}
         cti = raw.get("cellTowerInfo") or {}
         all_cell_info = cti.get("allCellInfo") or []
-        snapshot_cells_for_table = []
+        snapshot_items = []
+        table_requests = []
         for idx, item in enumerate(all_cell_info[:500]):  # safety cap
             if not isinstance(item, dict):
                 continue
@@ -159,7 +221,6 @@ class SnapshotLocateView(APIView):
             pci = item.get("pci", item.get("psc"))
             earfcn = item.get("earfcn", item.get("uarfcn", item.get("arfcn")))
             rsrp = item.get("rsrp", item.get("dbm"))
-            rsrq = item.get("rsrq")
             registered = item.get("registered")
 
             # Infer MCC/MNC for neighbor cells with sentinel values using simOperator.
@@ -168,31 +229,44 @@ class SnapshotLocateView(APIView):
             if mnc in (None, 2147483647) and default_mnc is not None:
                 mnc = default_mnc
 
-            tower_obj = None
-            tower_source = None
+            request_idx = None
             try:
                 if mcc is not None and mnc is not None and cell_id is not None:
-                    res = resolver.resolve(
-                        radio_type=_guess_radio_type(cell_type),
-                        mcc=int(mcc),
-                        mnc=int(mnc),
-                        cell_id=int(cell_id),
-                        lac=int(lac) if lac is not None else None,
-                        pci=int(pci) if pci is not None else None,
-                        earfcn=int(earfcn) if earfcn is not None else None,
-                        signal_strength=int(rsrp) if rsrp is not None else None,
-                        allow_external=bool(allow_external_neighbors and not registered),
+                    table_requests.append(
+                        {
+                            "radio_type": _guess_radio_type(cell_type),
+                            "mcc": int(mcc),
+                            "mnc": int(mnc),
+                            "cell_id": int(cell_id),
+                            "lac": int(lac) if lac is not None else None,
+                            "pci": int(pci) if pci is not None else None,
+                            "earfcn": int(earfcn) if earfcn is not None else None,
+                            "signal_strength": int(rsrp) if rsrp is not None else None,
+                            "allow_external": bool(allow_external_neighbors and not registered),
+                        }
                     )
-                    tower_obj, tower_source = res.tower, res.source
+                    request_idx = len(table_requests) - 1
             except Exception:
-                tower_obj = None
-                tower_source = None
+                request_idx = None
+
+            snapshot_items.append((idx, item, mcc, mnc, cell_id, lac, pci, earfcn, rsrp, request_idx))
+
+        try:
+            table_results = resolver.resolve_many(table_requests)
+        except Exception:
+            table_results = [None] * len(table_requests)
+
+        snapshot_cells_for_table = []
+        for idx, item, mcc, mnc, cell_id, lac, pci, earfcn, rsrp, request_idx in snapshot_items:
+            res = table_results[request_idx] if request_idx is not None else None
+            tower_obj = res.tower if res is not None else None
+            tower_source = res.source if res is not None else None
 
             snapshot_cells_for_table.append(
                 {
                     "idx": idx,
-                    "type": cell_type,
-                    "registered": registered,
+                    "type": item.get("type"),
+                    "registered": item.get("registered"),
                     "mcc": mcc,
                     "mnc": mnc,
                     "lac": lac,
@@ -200,7 +274,7 @@ class SnapshotLocateView(APIView):
                     "pci": pci,
                     "earfcn": earfcn,
                     "rsrp": rsrp,
-                    "rsrq": rsrq,
+                    "rsrq": item.get("rsrq"),
                     "dbm": item.get("dbm"),
                     "alphaLong": item.get("alphaLong"),
                     "alphaShort": item.get("alphaShort"),
@@ -228,18 +302,10 @@ class SnapshotLocateView(APIView):
         cells_for_table = []
 
         towers_found_cells = []
-        for c in cleaned_cells:
-            res = resolver.resolve(
-                radio_type=c.get("radio_type"),
-                mcc=c["mcc"],
-                mnc=c["mnc"],
-                cell_id=c["cellId"],
-                lac=c.get("lac"),
-                pci=c.get("pci"),
-                earfcn=c.get("earfcn"),
-                signal_strength=c.get("signalStrength"),
-                allow_external=True,
-            )
+        cell_results = resolver.resolve_many(
+            resolve_requests(cleaned_cells, allow_external_serving=True, allow_external_neighbors=True)
+        )
+        for c, res in zip(cleaned_cells, cell_results):
             tower_obj, source = res.tower, res.source
             tower_found = tower_obj is not None
             if tower_found:
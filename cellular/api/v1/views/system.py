@@ -8,6 +8,13 @@ from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from cellular.services.locate_cache import get_locate_cache
+from cellular.services.providers.transport import transport_stats
+from cellular.services.singleflight import get_single_flight
+from cellular.services.tower_cache import get_negative_lookup_cache, get_shared_tower_cache
+from cellular.services.tracking import get_device_tracker
+from cellular.services.write_behind import get_write_buffer
+
 
 class DbInfoView(APIView):
     """
@@ -46,3 +53,51 @@ class DbInfoView(APIView):
             }
         )
 
+
+class ProvidersStatusView(APIView):
+    """
+    Diagnostic view of the external provider layer in this worker: circuit breaker
+    and rate limiter state per provider, plus resolver cache counters.
+    """
+
+    permission_classes = [AllowAny] if getattr(settings, "DEBUG", False) else [IsAdminUser]
+
+    @extend_schema(
+        summary="External provider status (debug)",
+        description=(
+            "Per-provider transport state (circuit breaker, token bucket, call counts) and the "
+            "tower/negative cache, single-flight, write-behind, locate result cache and device tracker counters of the answering worker."
+        ),
+        responses={
+            200: inline_serializer(
+                name="ProvidersStatus",
+                fields={
+                    "providers": serializers.DictField(),
+                    "tower_cache": serializers.DictField(allow_null=True),
+                    "negative_cache": serializers.DictField(allow_null=True),
+                    "single_flight": serializers.DictField(),
+                    "write_behind": serializers.DictField(allow_null=True),
+                    "locate_cache": serializers.DictField(allow_null=True),
+                    "tracking": serializers.DictField(allow_null=True),
+                },
+            )
+        },
+        tags=["System"],
+    )
+    def get(self, request, *args, **kwargs):
+        tower_cache = get_shared_tower_cache()
+        negative_cache = get_negative_lookup_cache()
+        write_buffer = get_write_buffer()
+        locate_cache = get_locate_cache()
+        tracker = get_device_tracker()
+        return Response(
+            {
+                "providers": transport_stats(),
+                "tower_cache": tower_cache.stats() if tower_cache is not None else None,
+                "negative_cache": negative_cache.stats() if negative_cache is not None else None,
+                "single_flight": get_single_flight().stats(),
+                "write_behind": write_buffer.stats() if write_buffer is not None else None,
+                "locate_cache": locate_cache.stats() if locate_cache is not None else None,
+                "tracking": tracker.stats() if tracker is not None else None,
+            }
+        )
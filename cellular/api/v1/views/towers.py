@@ -90,6 +90,7 @@ class CellTowerBulkUploadView(APIView):
             serializer.validated_data["csv_file"],
             dataset_source=serializer.validated_data["dataset_source"],
             update_existing=serializer.validated_data["update_existing"],
+            **_import_filters(serializer.validated_data),
         )
         return Response(stats, status=status.HTTP_201_CREATED)
 
@@ -144,7 +145,11 @@ class CellTowerBoundingBoxView(APIView):
         return Response(CellTowerMarkerSerializer(towers_qs, many=True).data)
 
 
-def _run_import_job(job_id: str, file_path: str, dataset_source: str, update_existing: bool) -> None:
+def _import_filters(data) -> dict:
+    return {"mcc": data.get("mcc") or None, "mnc": data.get("mnc") or None, "radio_types": data.get("radio_type") or None}
+
+
+def _run_import_job(job_id: str, file_path: str, dataset_source: str, update_existing: bool, filters: dict) -> None:
     try:
         with open(file_path, "rb") as f:
             import_towers_from_csv(
@@ -152,6 +157,8 @@ def _run_import_job(job_id: str, file_path: str, dataset_source: str, update_exi
                 dataset_source=dataset_source,
                 update_existing=update_existing,
                 job_id=job_id,
+                path=file_path,
+                **filters,
             )
     except Exception as exc:  # noqa
         update_job(job_id, status="FAILED", error=str(exc))
@@ -192,7 +199,7 @@ class ImportStartView(APIView):
         job_id = create_job()
         thread = threading.Thread(
             target=_run_import_job,
-            args=(job_id, tmp_path, dataset_source, update_existing),
+            args=(job_id, tmp_path, dataset_source, update_existing, _import_filters(serializer.validated_data)),
             daemon=True,
         )
         thread.start()
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CellularConfig(AppConfig):
     name = 'cellular'
+
+    def ready(self):
+        # Connects the CellTower signals that invalidate cached towers and locate results.
+        from cellular.services import locate_cache, tower_cache  # noqa: F401
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from cellular.utils.geometry import (
+    bearing_many,
+    calculate_bearing_between_coords,
+    calculate_distance,
+    calculate_distance_many,
+    calculate_new_coordinates,
+    destination_many,
+    haversine_distance,
+    haversine_many,
+    rsrp_weight_many,
+    trilaterate_two_many,
+    trilaterate_two_towers,
+    weighted_centroid,
+    weighted_centroid_many,
+)
+
+
+def _best_of(repeat: int, fn: Callable[[], object]) -> Tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark the scalar geometry functions (one point at a time, as called in loops) "
+        "against their array kernels on the same random inputs, with the largest difference between them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", "-n", type=int, default=20000, help="Points (or problems) per kernel.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best one is kept.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        n = max(1, options["size"])
+        repeat = max(1, options["repeat"])
+        rng = np.random.default_rng(options["seed"])
+
+        lat1 = rng.uniform(25.0, 40.0, n)
+        lon1 = rng.uniform(44.0, 63.0, n)
+        lat2 = lat1 + rng.uniform(-0.05, 0.05, n)
+        lon2 = lon1 + rng.uniform(-0.05, 0.05, n)
+        dist = rng.uniform(50.0, 5000.0, n)
+        brng = rng.uniform(0.0, 360.0, n)
+        rsrp = rng.uniform(-125.0, -60.0, n)
+        tx = rng.integers(30, 46, n).astype(float)
+        k = 5
+        c_lat = lat1[:, None] + rng.uniform(-0.02, 0.02, (n, k))
+        c_lon = lon1[:, None] + rng.uniform(-0.02, 0.02, (n, k))
+        c_rsrp = rng.uniform(-125.0, -60.0, (n, k))
+        r1 = rng.uniform(500.0, 5000.0, n)
+        r2 = rng.uniform(500.0, 5000.0, n)
+
+        # Plain Python lists for the scalar side, as the callers have them.
+        py = {
+            name: arr.tolist()
+            for name, arr in (
+                ("lat1", lat1), ("lon1", lon1), ("lat2", lat2), ("lon2", lon2), ("dist", dist),
+                ("brng", brng), ("rsrp", rsrp), ("tx", tx), ("r1", r1), ("r2", r2),
+            )
+        }
+        towers = [
+            [{"lat": a, "lon": b, "rsrp": c} for a, b, c in zip(row_lat, row_lon, row_rsrp)]
+            for row_lat, row_lon, row_rsrp in zip(c_lat.tolist(), c_lon.tolist(), c_rsrp.tolist())
+        ]
+
+        cases: List[Tuple[str, Callable[[], object], Callable[[], object]]] = [
+            (
+                "haversine",
+                lambda: [haversine_distance(*p) for p in zip(py["lat1"], py["lon1"], py["lat2"], py["lon2"])],
+                lambda: haversine_many(lat1, lon1, lat2, lon2),
+            ),
+            (
+                "bearing",
+                lambda: [calculate_bearing_between_coords(*p) for p in zip(py["lat1"], py["lon1"], py["lat2"], py["lon2"])],
+                lambda: bearing_many(lat1, lon1, lat2, lon2),
+            ),
+            (
+                "destination",
+                lambda: [
+                    (d["lat"], d["lon"])
+                    for d in (calculate_new_coordinates(*p) for p in zip(py["lat1"], py["lon1"], py["dist"], py["brng"]))
+                ],
+                lambda: np.stack(destination_many(lat1, lon1, dist, brng), axis=-1),
+            ),
+            (
+                "distance",
+                lambda: [calculate_distance(r, t) for r, t in zip(py["rsrp"], py["tx"])],
+                lambda: calculate_distance_many(rsrp, tx),
+            ),
+            (
+                f"centroid (k={k})",
+                lambda: [(c["lat"], c["lon"]) for c in map(weighted_centroid, towers)],
+                lambda: np.stack(weighted_centroid_many(c_lat, c_lon, rsrp_weight_many(c_rsrp)), axis=-1),
+            ),
+            (
+                "two towers",
+                lambda: [
+                    (c["lat"], c["lon"])
+                    for c in (
+                        trilaterate_two_towers({"lat": a, "lon": b, "radius": ra}, {"lat": c, "lon": d, "radius": rb})
+                        for a, b, ra, c, d, rb in zip(py["lat1"], py["lon1"], py["r1"], py["lat2"], py["lon2"], py["r2"])
+                    )
+                ],
+                lambda: np.stack(trilaterate_two_many(lat1, lon1, r1, lat2, lon2, r2), axis=-1),
+            ),
+        ]
+
+        self.stdout.write(f"{n} items, best of {repeat}")
+        self.stdout.write(f"{'kernel':<16} {'scalar us/item':>15} {'array us/item':>14} {'speedup':>8} {'max diff':>10}")
+        for name, scalar, vectorized in cases:
+            t_scalar, expected = _best_of(repeat, scalar)
+            t_array, got = _best_of(repeat, vectorized)
+            diff = float(np.max(np.abs(np.asarray(expected, dtype=float) - np.asarray(got, dtype=float))))
+            self.stdout.write(
+                f"{name:<16} {t_scalar / n * 1e6:>15.3f} {t_array / n * 1e6:>14.3f} "
+                f"{t_scalar / t_array:>7.1f}x {diff:>10.2e}"
+            )
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, List
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from cellular.models import CellTower
+from cellular.utils.importers import _chunked, _fetch_existing_lookup, tower_import_config
+
+# MCC 001 is reserved for test networks, so the seeded keys cannot collide with real towers.
+MCC = 1
+MNCS = (1, 2, 3, 4)
+
+
+def _or_chained_lookup(rows: List[Dict]) -> int:
+    """The previous lookup (one OR-ed Q per key, 200 keys per query), as a baseline."""
+    found = 0
+    for chunk in _chunked(rows, 200):
+        condition = Q()
+        for row in chunk:
+            key = Q(mcc=row["mcc"], mnc=row["mnc"], cell_id=row["cell_id"])
+            key &= Q(lac__isnull=True) if row["lac"] is None else Q(lac=row["lac"])
+            condition |= key
+        found += CellTower.objects.filter(condition).count()
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the import's existing-row lookup on synthetic keys under the test-network MCC 001: seeds "
+        "towers for part of them in a transaction that is always rolled back, then times the lookup chunk by "
+        "chunk as import_towers_from_csv runs it. Run it against a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", "-n", type=int, default=1_000_000, help="Keys in the synthetic file.")
+        parser.add_argument("--existing", type=float, default=0.5, help="Fraction of keys already in the DB.")
+        parser.add_argument("--null-lac", type=float, default=0.1, help="Fraction of keys without a LAC.")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Default: TOWER_IMPORT CHUNK_SIZE.")
+        parser.add_argument("--baseline-rows", type=int, default=20000, help="Keys timed with the old OR-chained lookup (0: skip).")
+        parser.add_argument("--target", type=float, default=0, help="Fail below this many keys/s.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        n = max(1, options["rows"])
+        chunk_size = max(1, options["chunk_size"] or tower_import_config()["CHUNK_SIZE"])
+        rng = np.random.default_rng(options["seed"])
+
+        mnc = rng.choice(MNCS, n)
+        cell_id = rng.permutation(np.arange(1, 50 * n + 1))[:n]
+        lac = rng.integers(1, 65535, n)
+        null_lac = rng.random(n) < options["null_lac"]
+        existing = rng.random(n) < options["existing"]
+
+        def rows_of(idx: np.ndarray) -> List[Dict]:
+            return [
+                {"mcc": MCC, "mnc": int(mnc[i]), "cell_id": int(cell_id[i]), "lac": None if null_lac[i] else int(lac[i])}
+                for i in idx
+            ]
+
+        if CellTower.objects.filter(mcc=MCC).exists():
+            raise CommandError(f"The database already has towers with MCC {MCC:03d}; run against a throwaway database")
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            existing_idx = np.flatnonzero(existing)
+            for idx in _chunked(existing_idx, 5000):
+                CellTower.objects.bulk_create(
+                    (CellTower(lat=35.7, lon=51.4, **row) for row in rows_of(idx)), ignore_conflicts=True
+                )
+            # Same cell, other LAC: must not match the NULL-LAC keys.
+            decoys = np.flatnonzero(null_lac & ~existing)
+            for idx in _chunked(decoys, 5000):
+                CellTower.objects.bulk_create(
+                    (CellTower(lat=35.7, lon=51.4, **{**row, "lac": 1}) for row in rows_of(idx)), ignore_conflicts=True
+                )
+            self.stdout.write(
+                f"seeded {len(existing_idx)} towers (+{len(decoys)} LAC decoys) in {time.perf_counter() - started:.1f}s"
+            )
+
+            started = time.perf_counter()
+            matched = 0
+            for idx in _chunked(np.arange(n), chunk_size):
+                matched += len(_fetch_existing_lookup(rows_of(idx)))
+            elapsed = time.perf_counter() - started
+            rate = n / elapsed if elapsed else float("inf")
+            self.stdout.write(
+                f"set-based lookup: {n} keys in {elapsed:.2f}s = {rate:,.0f} keys/s "
+                f"(chunks of {chunk_size}), matched {matched}"
+            )
+            if matched != len(existing_idx):
+                raise CommandError(f"Lookup matched {matched} keys, expected {len(existing_idx)}")
+
+            baseline = min(n, max(0, options["baseline_rows"]))
+            if baseline:
+                started = time.perf_counter()
+                _or_chained_lookup(rows_of(np.arange(baseline)))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"OR-chained lookup: {baseline} keys in {elapsed:.2f}s = {baseline / elapsed:,.0f} keys/s"
+                )
+            transaction.set_rollback(True)
+
+        if options["target"] and rate < options["target"]:
+            raise CommandError(f"{rate:,.0f} keys/s is below the target of {options['target']:,.0f}")
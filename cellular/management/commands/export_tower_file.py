@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cellular.models import CellTower
+from cellular.services.tower_file import export_tower_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Export CellTower into the memory-mapped tower file used by TOWER_INDEX BACKEND=mmap "
+        "and by `locate_offline`. The file is replaced atomically; running workers remap it "
+        "on their next index refresh."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            "-o",
+            default=(getattr(settings, "TOWER_INDEX", None) or {}).get("PATH") or "",
+            help="Target path (default: TOWER_INDEX['PATH']).",
+        )
+        parser.add_argument("--mcc", type=int, action="append", help="Only export these MCCs (repeatable).")
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        if not path:
+            raise CommandError("No output path: pass --output or set TOWER_INDEX_PATH.")
+
+        qs = CellTower.objects.all()
+        if options["mcc"]:
+            qs = qs.filter(mcc__in=options["mcc"])
+
+        info = export_tower_file(path, qs)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {info['towers']} towers ({info['signatures']} PCI signatures, {info['bytes']} bytes) "
+                f"to {info['path']} (data version {info['data_version']})"
+            )
+        )
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cellular.choices import DatasetSource, RadioType
+from cellular.utils.importers import import_towers_from_csv
+from cellular.utils.tower_sources import LAYOUTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Import towers straight from a CSV or a compressed dump (.csv.gz, .bz2, .zip), including the "
+        "header-less OpenCellID/MLS exports, in one streaming pass. MCC/MNC/radio filters are applied "
+        "while parsing, e.g. `import_towers cell_towers.csv.gz --source OPENCELLID --mcc 432`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, optionally gzip/bzip2/zip compressed.")
+        parser.add_argument("--source", choices=DatasetSource.values, default=DatasetSource.OTHER, help="Dataset source of the rows.")
+        parser.add_argument("--mcc", type=int, action="append", help="Only import these MCCs (repeatable).")
+        parser.add_argument("--mnc", type=int, action="append", help="Only import these MNCs (repeatable).")
+        parser.add_argument("--radio", choices=RadioType.values, action="append", help="Only import these radio types (repeatable).")
+        parser.add_argument("--layout", choices=LAYOUTS, default="auto", help="Header row or header-less OpenCellID columns (default: sniffed).")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Rows per chunk (default: TOWER_IMPORT).")
+        parser.add_argument("--workers", type=int, default=None, help="Parse/normalize processes; 0 parses in-process (default: TOWER_IMPORT).")
+        parser.add_argument("--no-update", action="store_true", help="Only create new towers; leave existing ones untouched.")
+
+    def handle(self, *args, **options):
+        try:
+            source = open(options["path"], "rb")
+        except OSError as exc:
+            raise CommandError(f"Cannot read input: {exc}") from exc
+
+        started = time.monotonic()
+        with source:
+            try:
+                result = import_towers_from_csv(
+                    source,
+                    dataset_source=options["source"],
+                    update_existing=not options["no_update"],
+                    chunk_size=options["chunk_size"],
+                    mcc=options["mcc"],
+                    mnc=options["mnc"],
+                    radio_types=options["radio"],
+                    layout=options["layout"],
+                    workers=options["workers"],
+                    path=options["path"],
+                )
+            except (ValueError, OSError, EOFError) as exc:
+                raise CommandError(f"Cannot import {options['path']}: {exc}") from exc
+
+        for error in result["errors"][:20]:
+            self.stderr.write(error, style_func=lambda msg: msg)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result['created']} created, {result['updated']} updated, {result['filtered']} filtered out, "
+                f"{len(result['errors'])} errors in {time.monotonic() - started:.1f}s"
+            )
+        )
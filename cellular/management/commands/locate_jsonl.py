@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+CSV_COLUMNS = ("line", "id", "lat", "lon", "radius", "source", "confidence", "error")
+
+# Set in each worker by `_init_worker`.
+_worker: Dict[str, Any] = {}
+
+
+def _cells_of(payload: Any, *, all_cells: bool) -> Tuple[Any, List[Dict[str, Any]]]:
+    """(id, cells) from a locate payload, a bare cells list or a device snapshot."""
+    if isinstance(payload, list):
+        return None, payload
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object or list")
+    report_id = payload.get("id", payload.get("snapshot_id"))
+    if "cells" in payload:
+        return report_id, payload["cells"] or []
+    if "raw_data" in payload:
+        from cellular.utils.snapshots import extract_cells_from_snapshot
+
+        return report_id, extract_cells_from_snapshot(payload, registered_only=not all_cells)
+    raise ValueError("No `cells` or `raw_data` in report")
+
+
+def _init_pool_worker(options: Dict[str, Any]) -> None:
+    import django
+    from django.apps import apps
+
+    if not apps.ready:  # spawned (not forked) workers
+        django.setup()
+    from django.db import connections
+
+    # Never share the parent's DB connections across processes.
+    connections.close_all()
+    _init_worker(options)
+
+
+def _init_worker(options: Dict[str, Any]) -> None:
+    from cellular.services.tower_resolver import TowerResolver
+
+    class CountingResolver(TowerResolver):
+        def resolve_many(self, cells):
+            results = super().resolve_many(cells)
+            _worker["sources"].update(r.source for r in results)
+            return results
+
+    _worker.clear()
+    _worker.update(options=options, resolver_cls=CountingResolver, sources=Counter(), index=None)
+    if options.get("tower_file"):
+        from cellular.services.tower_file import TowerFile
+
+        _worker["index"] = TowerFile(options["tower_file"]).load()
+
+
+def _locate_chunk(lines: List[Tuple[int, str]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Locate one chunk of (line number, raw line); returns results and worker counters."""
+    from cellular.services.locate_cache import get_locate_cache
+    from cellular.services.locator import locate_cells
+    from cellular.services.tower_cache import get_shared_tower_cache
+    from cellular.services.write_behind import flush_write_buffer
+
+    options = _worker["options"]
+    _worker["sources"] = Counter()
+    results: List[Dict[str, Any]] = []
+    for line_no, raw in lines:
+        item: Dict[str, Any] = {"line": line_no}
+        try:
+            report_id, cells = _cells_of(json.loads(raw), all_cells=options["all_cells"])
+            if report_id is not None:
+                item["id"] = report_id
+            # One resolver per report keeps its per-request cache small; the
+            # worker-wide tower cache carries hits across reports.
+            resolver = _worker["resolver_cls"](index=_worker["index"])
+            item["result"] = locate_cells(
+                cells,
+                resolver=resolver,
+                allow_external_serving=options["allow_external"],
+                allow_external_neighbors=False,
+            )
+        except (ValueError, TypeError) as exc:
+            item["error"] = str(exc)
+        except Exception as exc:  # noqa
+            item["error"] = f"{type(exc).__name__}: {exc}"
+        results.append(item)
+    # Pool workers exit without running atexit handlers.
+    flush_write_buffer()
+
+    tower_cache = get_shared_tower_cache()
+    locate_cache = get_locate_cache()
+    counters = {
+        "pid": os.getpid(),
+        "sources": dict(_worker["sources"]),
+        "tower_cache": tower_cache.stats() if tower_cache is not None else None,
+        "locate_cache": locate_cache.stats() if locate_cache is not None else None,
+    }
+    return results, counters
+
+
+class _Writer:
+    def __init__(self, stream, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.writer(stream, lineterminator="\n")
+            self.csv.writerow(CSV_COLUMNS)
+
+    def write(self, item: Dict[str, Any]) -> None:
+        if self.csv is None:
+            self.stream.write(json.dumps(item, ensure_ascii=False) + "\n")
+            return
+        result = item.get("result") or {}
+        location = result.get("location") or {}
+        debug = result.get("debug") or {}
+        self.csv.writerow(
+            [
+                item["line"],
+                item.get("id", ""),
+                location.get("lat", ""),
+                location.get("lon", ""),
+                result.get("radius", ""),
+                debug.get("source", ""),
+                debug.get("confidence") or "",
+                item.get("error", ""),
+            ]
+        )
+
+
+class _InlineExecutor:
+    """`--workers 0`: run chunks in this process (same interface as the pool)."""
+
+    def __init__(self, options: Dict[str, Any]):
+        _init_worker(options)
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, **kwargs: Any) -> None:
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Locate every report of a JSONL file (one locate payload, cells list or device snapshot "
+        "per line) across a process pool, streaming results to JSONL or CSV in input order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="JSONL file ('-' for stdin).")
+        parser.add_argument("--output", "-o", default="-", help="Output file (default: stdout).")
+        parser.add_argument("--format", choices=("jsonl", "csv"), default=None, help="Default: from the output extension, else jsonl.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes; 0 runs in-process.")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Reports per task.")
+        parser.add_argument("--max-in-flight", type=int, default=None, help="Chunks queued at once (default: 2 x workers).")
+        parser.add_argument("--tower-file", default=None, help="Resolve from a tower file (`export_tower_file`) instead of the DB.")
+        parser.add_argument("--allow-external", action="store_true", help="Allow paid provider lookups for unknown serving cells.")
+        parser.add_argument("--all-cells", action="store_true", help="For snapshots, use neighbor cells too (not only registered).")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or ("csv" if options["output"].lower().endswith(".csv") else "jsonl")
+        chunk_size = max(1, options["chunk_size"])
+        workers = max(0, options["workers"])
+        max_in_flight = max(1, options["max_in_flight"] or 2 * max(1, workers))
+        worker_options = {
+            "tower_file": options["tower_file"],
+            "allow_external": options["allow_external"],
+            "all_cells": options["all_cells"],
+        }
+
+        try:
+            source = sys.stdin if options["input"] == "-" else open(options["input"], encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(f"Cannot read input: {exc}") from exc
+        sink = self.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8", newline="")
+
+        if workers == 0:
+            executor: Any = _InlineExecutor(worker_options)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"),
+                initializer=_init_pool_worker,
+                initargs=(worker_options,),
+            )
+
+        writer = _Writer(sink, fmt)
+        totals: Counter = Counter()
+        worker_stats: Dict[int, Dict[str, Any]] = {}
+        started = time.monotonic()
+
+        def drain(future: Future) -> None:
+            results, counters = future.result()
+            for item in results:
+                writer.write(item)
+                totals["reports"] += 1
+                totals["errors" if "error" in item else "located"] += 1
+            worker_stats[counters["pid"]] = counters
+            totals.update({f"source:{k}": v for k, v in counters["sources"].items()})
+
+        pending: deque = deque()
+        try:
+            for chunk in self._chunks(source, chunk_size):
+                pending.append(executor.submit(_locate_chunk, chunk))
+                # Bounded memory: write finished chunks in order before reading further.
+                while len(pending) >= max_in_flight:
+                    drain(pending.popleft())
+            while pending:
+                drain(pending.popleft())
+        finally:
+            executor.shutdown(cancel_futures=True)
+            if source is not sys.stdin:
+                source.close()
+            if sink is not self.stdout:
+                sink.close()
+
+        self._report(totals, worker_stats, time.monotonic() - started)
+
+    @staticmethod
+    def _chunks(source, size: int) -> Iterator[List[Tuple[int, str]]]:
+        chunk: List[Tuple[int, str]] = []
+        for line_no, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            chunk.append((line_no, line))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _report(self, totals: Counter, worker_stats: Dict[int, Dict[str, Any]], elapsed: float) -> None:
+        def hit_rate(name: str) -> Optional[float]:
+            hits = sum((s.get(name) or {}).get("hits", 0) for s in worker_stats.values())
+            misses = sum((s.get(name) or {}).get("misses", 0) for s in worker_stats.values())
+            return hits / (hits + misses) if hits + misses else None
+
+        sources = {k.split(":", 1)[1]: v for k, v in totals.items() if k.startswith("source:")}
+        cells = sum(sources.values())
+        resolved = cells - sources.get("NOT_FOUND", 0)
+        lines = [
+            f"{totals['reports']} reports ({totals['located']} located, {totals['errors']} errors) "
+            f"in {elapsed:.1f}s: {totals['reports'] / elapsed if elapsed else 0:.0f} reports/s "
+            f"with {max(1, len(worker_stats))} worker(s)",
+            f"cells: {cells}, resolved: {resolved} ({(resolved / cells * 100) if cells else 0:.1f}%), "
+            + ", ".join(f"{k}={v}" for k, v in sorted(sources.items())),
+        ]
+        for name in ("tower_cache", "locate_cache"):
+            rate = hit_rate(name)
+            lines.append(f"{name} hit rate: " + (f"{rate * 100:.1f}%" if rate is not None else "n/a"))
+        for line in lines:
+            self.stderr.write(line, style_func=lambda msg: msg)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cellular.services.locator import locate_cells
+from cellular.services.tower_file import TowerFile
+from cellular.services.tower_resolver import TowerResolver
+
+
+class Command(BaseCommand):
+    help = (
+        "Locate a device from a tower file, without a database or external providers. "
+        "Input is the `cells` list of the locate API (or an object with `cells`), as JSON."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("tower_file", help="File written by `export_tower_file`.")
+        parser.add_argument("input", nargs="?", default="-", help="JSON file with the cells (default: stdin).")
+        parser.add_argument("--ref-lat", type=float, default=None, help="Reference latitude for PCI signatures.")
+        parser.add_argument("--ref-lon", type=float, default=None, help="Reference longitude for PCI signatures.")
+
+    def handle(self, *args, **options):
+        try:
+            towers = TowerFile(options["tower_file"]).load()
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        try:
+            if options["input"] == "-":
+                payload = json.load(sys.stdin)
+            else:
+                with open(options["input"], encoding="utf-8") as fh:
+                    payload = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read cells: {exc}") from exc
+        cells = payload.get("cells", []) if isinstance(payload, dict) else payload
+
+        resolver = TowerResolver(reference_lat=options["ref_lat"], reference_lon=options["ref_lon"], index=towers)
+        try:
+            result = locate_cells(
+                cells,
+                reference_lat=options["ref_lat"],
+                reference_lon=options["ref_lon"],
+                resolver=resolver,
+                allow_external_serving=False,
+                allow_external_neighbors=False,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cellular", "0003_towerlookuplog_payloads"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="celltower",
+            name="cellular_ce_mcc_46b31c_idx",
+        ),
+        migrations.AddIndex(
+            model_name="celltower",
+            index=models.Index(fields=["mcc", "mnc", "pci", "earfcn"], name="celltower_signature_idx"),
+        ),
+    ]
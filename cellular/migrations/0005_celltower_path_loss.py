@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-18
+
+import math
+
+from django.db import migrations, models
+
+# Frozen copy of cellular.utils.geometry.band_ref_loss as of this migration, so later
+# changes to the band table or gains do not change what the backfill computes.
+_BANDS = (
+    # n_offs, n_low, n_high, f_dl_low (MHz)
+    (0, 0, 599, 2110.0),
+    (1200, 1200, 1949, 1805.0),
+    (2750, 2750, 3449, 2620.0),
+    (3450, 3450, 3799, 925.0),
+    (6150, 6150, 6449, 791.0),
+)
+
+
+def _freq_mhz(earfcn):
+    n = int(earfcn)
+    if 70 <= n <= 6000:  # already a frequency in MHz
+        return float(n)
+    for n_offs, n_low, n_high, f_low in _BANDS:
+        if n_low <= n <= n_high:
+            return f_low + 0.1 * (n - n_offs)
+    return None
+
+
+def band_ref_loss(earfcn):
+    freq = _freq_mhz(earfcn)
+    if freq is None:
+        return None
+    # FSPL at 1 m, minus 15 dBi tower gain and 0 dBi handset gain, plus 3 dB system losses.
+    return round(20.0 * math.log10(freq) + 32.44 - 15.0 - 0.0 + 3.0, 2)
+
+
+def backfill_ref_loss(apps, schema_editor):
+    CellTower = apps.get_model("cellular", "CellTower")
+    # One UPDATE per distinct EARFCN rather than per tower.
+    earfcns = CellTower.objects.exclude(earfcn__isnull=True).values_list("earfcn", flat=True).distinct()
+    for earfcn in list(earfcns):
+        ref_loss = band_ref_loss(earfcn)
+        if ref_loss is not None:
+            CellTower.objects.filter(earfcn=earfcn).update(ref_loss_db=ref_loss)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cellular", "0004_celltower_signature_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="celltower",
+            name="ref_loss_db",
+            field=models.FloatField(
+                blank=True,
+                help_text="Reference loss at 1 m (dB); band-derived from the EARFCN by imports, and by save() when empty",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="celltower",
+            name="path_loss_n",
+            field=models.FloatField(
+                blank=True,
+                help_text="Path-loss exponent calibrated for this tower via /calibrate/ (empty: PATH_LOSS N_DEFAULT)",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_ref_loss, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cellular", "0005_celltower_path_loss"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="celltower",
+            index=models.Index(fields=["lat", "lon"], name="celltower_lat_lon_idx"),
+        ),
+    ]
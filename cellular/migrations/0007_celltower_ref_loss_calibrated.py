@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Same frozen band table the 0005 backfill used.
+band_ref_loss = import_module("cellular.migrations.0005_celltower_path_loss").band_ref_loss
+
+
+def mark_explicit_ref_loss(apps, schema_editor):
+    CellTower = apps.get_model("cellular", "CellTower")
+    # Values that are not the band default for the tower's EARFCN were set by hand.
+    explicit = CellTower.objects.filter(ref_loss_db__isnull=False)
+    for earfcn in list(explicit.values_list("earfcn", flat=True).distinct()):
+        ref_loss = band_ref_loss(earfcn) if earfcn is not None else None
+        rows = explicit.filter(earfcn__isnull=True) if earfcn is None else explicit.filter(earfcn=earfcn)
+        if ref_loss is not None:
+            rows = rows.exclude(ref_loss_db=ref_loss)
+        rows.update(ref_loss_calibrated=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cellular", "0006_celltower_lat_lon_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="celltower",
+            name="ref_loss_calibrated",
+            field=models.BooleanField(
+                default=False,
+                help_text="ref_loss_db was set explicitly; saves and imports no longer re-derive it from the EARFCN",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="celltower",
+            name="ref_loss_db",
+            field=models.FloatField(
+                blank=True,
+                help_text="Reference loss at 1 m (dB); band-derived from the EARFCN unless ref_loss_calibrated is set",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(mark_explicit_ref_loss, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@
 from django.db import models
 from django.db.models import Count, Q
 from .choices import RadioType, DatasetSource
+from .utils.geometry import band_ref_loss
 
 class CellTower(models.Model):
     # --- نوع سل تاور (Radio Type) ---
@@ -38,6 +39,21 @@ class CellTower(models.Model):
         blank=True,
         help_text="Optional antenna azimuth (degrees 0-360) for this tower"
     )
+    # --- path-loss constants (precomputed for RSRP -> distance) ---
+    ref_loss_db = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Reference loss at 1 m (dB); band-derived from the EARFCN unless ref_loss_calibrated is set"
+    )
+    ref_loss_calibrated = models.BooleanField(
+        default=False,
+        help_text="ref_loss_db was set explicitly; saves and imports no longer re-derive it from the EARFCN"
+    )
+    path_loss_n = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Path-loss exponent calibrated for this tower via /calibrate/ (empty: PATH_LOSS N_DEFAULT)"
+    )
 
     # --- system metadata ---
     source = models.CharField(
@@ -54,9 +70,22 @@ class CellTower(models.Model):
     class Meta:
         unique_together = ('mcc', 'mnc', 'cell_id', 'lac')
         indexes = [
-            models.Index(fields=['mcc', 'mnc', 'pci']), # برای جستجوی سریع همسایه‌ها
+            # برای جستجوی سریع همسایه‌ها (PCI signature lookups, optionally narrowed by EARFCN)
+            models.Index(fields=['mcc', 'mnc', 'pci', 'earfcn'], name='celltower_signature_idx'),
+            # Bounding box around the reference point in SQL signature ranking
+            models.Index(fields=['lat', 'lon'], name='celltower_lat_lon_idx'),
         ]
 
+    def save(self, *args, **kwargs):
+        # A band-derived value follows the EARFCN; a calibrated one stays (band default when empty).
+        if not self.ref_loss_calibrated or self.ref_loss_db is None:
+            ref_loss_db = band_ref_loss(self.earfcn)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and ref_loss_db != self.ref_loss_db:
+                kwargs["update_fields"] = {*update_fields, "ref_loss_db"}
+            self.ref_loss_db = ref_loss_db
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.mcc}-{self.mnc}-{self.cell_id} (PCI: {self.pci})"
 
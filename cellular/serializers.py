@@ -1,6 +1,7 @@
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from .models import CellTower
-from .choices import DatasetSource
+from .choices import DatasetSource, RadioType
 
 
 class CellTowerSerializer(serializers.ModelSerializer):
@@ -8,6 +9,12 @@ class CellTowerSerializer(serializers.ModelSerializer):
         model = CellTower
         fields = '__all__'
 
+    def validate(self, attrs):
+        # A ref_loss_db sent by the client is a calibrated value, not the band default.
+        if attrs.get("ref_loss_db") is not None and "ref_loss_calibrated" not in attrs:
+            attrs["ref_loss_calibrated"] = True
+        return attrs
+
 
 class CellTowerMarkerSerializer(serializers.ModelSerializer):
     """Lightweight tower serializer for map marker rendering."""
@@ -82,6 +89,15 @@ class LocateUserRequestSerializer(serializers.Serializer):
         many=True,
         help_text="tower cell list detected by user device"
     )
+    device_id = serializers.CharField(
+        required=False,
+        max_length=128,
+        help_text="client device ID; enables tracking mode (warm-started solve fused with the device's track)"
+    )
+    timestamp = serializers.DateTimeField(
+        required=False,
+        help_text="when the cells were measured (tracking mode); defaults to the request time"
+    )
 
 
 class LocationResponseSerializer(serializers.Serializer):
@@ -121,14 +137,25 @@ class DebugInfoSerializer(serializers.Serializer):
 
 
 class CalibrationRequestSerializer(serializers.Serializer):
-    tower_lat = serializers.FloatField()
-    tower_lon = serializers.FloatField()
+    tower_id = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        help_text="CellTower to calibrate: its position, tx_power and ref_loss_db are the defaults, "
+        "and a positive n_effective (clamped, blended with the stored value) updates its path_loss_n",
+    )
+    tower_lat = serializers.FloatField(required=False, allow_null=True)
+    tower_lon = serializers.FloatField(required=False, allow_null=True)
     rsrp = serializers.IntegerField()
     user_lat = serializers.FloatField()
     user_lon = serializers.FloatField()
     tx = serializers.IntegerField(required=False, allow_null=True)
     ref_loss = serializers.FloatField(required=False, allow_null=True)
 
+    def validate(self, attrs):
+        if attrs.get("tower_id") is None and (attrs.get("tower_lat") is None or attrs.get("tower_lon") is None):
+            raise serializers.ValidationError("Provide tower_id or both tower_lat and tower_lon.")
+        return attrs
+
 
 class CalibrationResponseSerializer(serializers.Serializer):
     n_effective = serializers.FloatField()
@@ -149,6 +176,28 @@ class RefLossResponseSerializer(serializers.Serializer):
     details = serializers.DictField(child=serializers.CharField(), required=False)
 
 
+class TrackingInfoSerializer(serializers.Serializer):
+    """device track state after fusing the fix (tracking mode only)"""
+    device_id = serializers.CharField()
+    status = serializers.CharField(
+        help_text="started / updated / outlier (fix rejected, prediction returned) / restarted"
+    )
+    updates = serializers.IntegerField(
+        help_text="fixes fused into the track so far"
+    )
+    speed_mps = serializers.FloatField()
+    heading = serializers.FloatField(
+        help_text="direction of travel (0-360, clockwise from north)"
+    )
+    raw_location = serializers.DictField(
+        child=serializers.FloatField(),
+        help_text="unfiltered fix (lat, lon)"
+    )
+    raw_radius = serializers.FloatField(
+        help_text="uncertainty radius of the unfiltered fix (meters)"
+    )
+
+
 class LocateUserResponseSerializer(serializers.Serializer):
     """location response serializer"""
     location = LocationResponseSerializer(
@@ -160,16 +209,84 @@ class LocateUserResponseSerializer(serializers.Serializer):
     debug = DebugInfoSerializer(
         help_text="debug information about each cell tower used in location calculation"
     )
+    tracking = TrackingInfoSerializer(
+        required=False,
+        help_text="present when the request had a device_id"
+    )
+
+
+@extend_schema_field(LocateUserRequestSerializer(many=True))
+class ReportListField(serializers.ListField):
+    """list of reports; the view validates each with `LocateUserRequestSerializer`, so any value is accepted here"""
+    child = serializers.JSONField()
+
+
+class LocateBatchRequestSerializer(serializers.Serializer):
+    """many device reports located in one call"""
+    reports = ReportListField(
+        help_text="device reports; each is validated on its own so one bad report does not reject the batch"
+    )
+    allow_external = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="allow paid external lookups for unknown serving cells; off by default, since one batch "
+        "could otherwise trigger a paid lookup per report"
+    )
+
+    def get_fields(self):
+        from .services.batch_locator import locate_batch_config
+
+        # LOCATE_BATCH["MAX_REPORTS"] is a setting, so the cap is applied per instance.
+        fields = super().get_fields()
+        fields["reports"] = ReportListField(
+            max_length=int(locate_batch_config()["MAX_REPORTS"]), help_text=fields["reports"].help_text
+        )
+        return fields
+
+
+class LocateBatchItemSerializer(serializers.Serializer):
+    """one report's outcome: `result` on success, `error` otherwise"""
+    index = serializers.IntegerField(
+        help_text="position of the report in the request"
+    )
+    result = LocateUserResponseSerializer(
+        required=False,
+        help_text="location result (same shape as the single locate endpoint)"
+    )
+    error = serializers.CharField(
+        required=False,
+        help_text="why this report could not be located"
+    )
+    details = serializers.DictField(
+        required=False,
+        help_text="validation errors of the report"
+    )
+
+
+class LocateBatchResponseSerializer(serializers.Serializer):
+    results = LocateBatchItemSerializer(
+        many=True,
+        help_text="one entry per report, in request order"
+    )
 
 
 class CellTowerCsvUploadSerializer(serializers.Serializer):
-    csv_file = serializers.FileField(help_text="CSV file containing cell tower records")
+    csv_file = serializers.FileField(help_text="CSV file containing cell tower records (may be .gz, .bz2 or .zip, or a header-less OpenCellID dump)")
     dataset_source = serializers.ChoiceField(choices=DatasetSource.choices, help_text="Dataset source (e.g., MLS, OPENCELLID)")
     update_existing = serializers.BooleanField(
         required=False,
         default=True,
         help_text="If enabled, existing records will be updateds.",
     )
+    mcc = serializers.ListField(
+        child=serializers.IntegerField(), required=False, help_text="Only import rows with these MCCs"
+    )
+    mnc = serializers.ListField(
+        child=serializers.IntegerField(), required=False, help_text="Only import rows with these MNCs"
+    )
+    radio_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=RadioType.choices), required=False, help_text="Only import these radio types"
+    )
 
 
 class CellTowerBoundingBoxSerializer(serializers.Serializer):
@@ -0,0 +1,246 @@
+"""
+Async variant of `TowerResolver` for ASGI views and batch jobs.
+
+Local lookups use Django's async ORM; external lookups go through each provider's
+native `alookup` (httpx), so many cells can wait on Combain/Google at once without a
+thread per request. At most `TOWER_PROVIDER_FANOUT["ASYNC_MAX_CONCURRENCY"]` cells are
+looked up externally at the same time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import DatabaseError
+
+from cellular.models import CellTower, TowerLookupLog
+from cellular.services.providers.fanout import ProviderAttempt, aquery_providers, fanout_config
+from cellular.services.singleflight import get_single_flight
+from cellular.services.tower_resolver import (
+    SIGNATURE_CANDIDATE_LIMIT,
+    ExactKey,
+    ResolveResult,
+    SignatureKey,
+    TowerResolver,
+    _SIGNATURE_ROW_FIELDS,
+    _bucket_signature_rows,
+    _buffer_update,
+    _exact_condition,
+    _lookup_log_fields,
+    _merge_lookup,
+    _new_tower_defaults,
+    _pending_exact_keys,
+    _pending_signature_keys,
+    _signature_condition,
+    _signature_lookup_config,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTowerResolver(TowerResolver):
+    """
+    Same resolution order and caches as `TowerResolver`, exposed as coroutines
+    (`aresolve`, `aresolve_many`). The sync methods stay usable from sync code.
+    """
+
+    async def aresolve(self, **cell: Any) -> ResolveResult:
+        return (await self.aresolve_many([cell]))[0]
+
+    async def aresolve_many(self, cells: List[Dict[str, Any]]) -> List[ResolveResult]:
+        results, pending, pending_idxs = self._split_cached(cells)
+        if pending:
+            self._merge_resolved(results, pending_idxs, await self._aresolve_uncached_many(pending))
+        return [r if r is not None else ResolveResult(tower=None, source="NOT_FOUND") for r in results]
+
+    async def _aresolve_uncached_many(
+        self, pending: Dict[Tuple[Any, ...], Dict[str, Any]]
+    ) -> Dict[Tuple[Any, ...], ResolveResult]:
+        results: Dict[Tuple[Any, ...], ResolveResult] = {}
+
+        exact_keys = _pending_exact_keys(pending)
+        exact_hits = await self._alookup_local_exact_many(k for k in exact_keys.values() if k is not None)
+        for cache_key, key in exact_keys.items():
+            tower = exact_hits.get(key) if key is not None else None
+            if tower is not None:
+                results[cache_key] = ResolveResult(tower=tower, source="LOCAL_DB")
+
+        signature_keys = _pending_signature_keys(pending, skip=results)
+        signature_hits = await self._alookup_local_signature_many(k for k in signature_keys.values() if k is not None)
+        for cache_key, key in signature_keys.items():
+            tower = signature_hits.get(key) if key is not None else None
+            if tower is not None:
+                results[cache_key] = ResolveResult(tower=tower, source="LOCAL_DB_SIGNATURE")
+
+        external = [
+            (cache_key, cell)
+            for cache_key, cell in pending.items()
+            if cache_key not in results
+            and cell.get("allow_external")
+            and not self._recently_failed(
+                mcc=cell.get("mcc"), mnc=cell.get("mnc"), cell_id=cell.get("cell_id"), lac=cell.get("lac")
+            )
+        ]
+        if external:
+            limit = asyncio.Semaphore(max(1, int(fanout_config()["ASYNC_MAX_CONCURRENCY"])))
+
+            async def lookup(cell: Dict[str, Any]) -> Optional[ResolveResult]:
+                async with limit:
+                    return await self._alookup_external_and_upsert(
+                        radio_type=cell.get("radio_type"),
+                        mcc=cell.get("mcc"),
+                        mnc=cell.get("mnc"),
+                        cell_id=cell.get("cell_id"),
+                        lac=cell.get("lac"),
+                        pci=cell.get("pci"),
+                        earfcn=cell.get("earfcn"),
+                        signal_strength=cell.get("signal_strength"),
+                    )
+
+            answers = await asyncio.gather(*(lookup(cell) for _, cell in external))
+            for (cache_key, _), answer in zip(external, answers):
+                if answer is not None:
+                    results[cache_key] = answer
+
+        for cache_key in pending:
+            results.setdefault(cache_key, ResolveResult(tower=None, source="NOT_FOUND"))
+        return results
+
+    async def _alookup_local_exact_many(self, keys: Iterable[ExactKey]) -> Dict[ExactKey, CellTower]:
+        if self._index is not None:
+            return self._index_exact_many(keys)
+        found, wanted = self._shared_cache_lookup(keys)
+        if not wanted:
+            return found
+
+        try:
+            towers = [t async for t in CellTower.objects.filter(_exact_condition(wanted)).order_by("pk")]
+        except Exception as exc:
+            logger.exception("Local DB batch lookup failed: %s", exc)
+            return found
+
+        found.update(self._match_exact(wanted, towers))
+        return found
+
+    async def _alookup_local_signature_many(self, keys: Iterable[SignatureKey]) -> Dict[SignatureKey, CellTower]:
+        if self._index is not None:
+            return self._index_signature_many(keys)
+        wanted = set(keys)
+        if not wanted:
+            return {}
+
+        try:
+            if self._has_reference() and _signature_lookup_config()["SQL_RANKING"]:
+                try:
+                    winners = await self._arank_signatures_sql(wanted)
+                except DatabaseError as exc:
+                    logger.warning("SQL signature ranking unavailable, falling back to Python: %s", exc)
+                    winners = await self._arank_signatures_python(wanted)
+            else:
+                winners = await self._arank_signatures_python(wanted)
+
+            towers = await CellTower.objects.ain_bulk(set(winners.values())) if winners else {}
+        except Exception as exc:
+            logger.exception("Signature batch lookup failed: %s", exc)
+            return {}
+
+        return {key: towers[pk] for key, pk in winners.items() if pk in towers}
+
+    async def _arank_signatures_sql(self, wanted: set) -> Dict[SignatureKey, int]:
+        winners: Dict[SignatureKey, int] = {}
+        remaining = set(wanted)
+        for bbox in (self._reference_bbox(), None):
+            if not remaining:
+                break
+            rows = [row async for row in self._ranked_signature_rows(remaining, bbox)]
+            for key, bucket in _bucket_signature_rows(rows, remaining, limit=1).items():
+                if bucket:
+                    winners[key] = bucket[0][0]
+            remaining.difference_update(winners)
+        return winners
+
+    async def _arank_signatures_python(self, wanted: set) -> Dict[SignatureKey, int]:
+        qs = CellTower.objects.filter(_signature_condition(wanted)).order_by("-updated_at").values_list(*_SIGNATURE_ROW_FIELDS)
+        rows = [row async for row in qs]
+        return self._pick_nearest(_bucket_signature_rows(rows, wanted, limit=SIGNATURE_CANDIDATE_LIMIT))
+
+    async def _alookup_external_and_upsert(
+        self,
+        *,
+        radio_type: str | None,
+        mcc: int | None,
+        mnc: int | None,
+        cell_id: int | None,
+        lac: int | None,
+        pci: int | None,
+        earfcn: int | None,
+        signal_strength: int | None,
+    ) -> Optional[ResolveResult]:
+        request = self._external_request(
+            radio_type=radio_type, mcc=mcc, mnc=mnc, cell_id=cell_id, lac=lac, pci=pci, earfcn=earfcn,
+            signal_strength=signal_strength,
+        )
+        if request is None:
+            return None
+        ids = request[1]
+        return await get_single_flight().ado(
+            (ids["mcc"], ids["mnc"], ids["lac"], ids["cell_id"]),
+            lambda: self._aquery_providers_and_upsert(*request),
+            on_remote_done=lambda: self._aafter_remote_lookup(ids),
+        )
+
+    async def _aquery_providers_and_upsert(
+        self, rt: str, ids: Dict[str, Any], lookup_kwargs: Dict[str, Any]
+    ) -> Optional[ResolveResult]:
+        chosen, attempts = await aquery_providers(self._providers, lookup_kwargs)
+        for attempt in attempts:
+            await self._alog_attempt(attempt, ids)
+        if not self._note_attempts(chosen, attempts, ids):
+            return None
+
+        try:
+            tower = await self._aupsert_from_lookup(chosen, radio_type=rt, **ids)
+        except Exception as exc:
+            logger.exception("%s upsert failed: %s", chosen.provider_name, exc)
+            return None
+        return self._external_result(chosen, tower, ids)
+
+    async def _aafter_remote_lookup(self, ids: Dict[str, Any]) -> Optional[ResolveResult]:
+        key = (ids["mcc"], ids["mnc"], ids["cell_id"], ids["lac"])
+        found = await self._alookup_local_exact_many([key])
+        tower = found.get(key)
+        return ResolveResult(tower=tower, source="LOCAL_DB") if tower is not None else None
+
+    @staticmethod
+    async def _alog_attempt(attempt: ProviderAttempt, ids: Dict[str, Any]) -> None:
+        try:
+            await TowerLookupLog.objects.acreate(**_lookup_log_fields(attempt, ids))
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _aupsert_from_lookup(
+        attempt: ProviderAttempt,
+        *,
+        radio_type: str,
+        mcc: int,
+        mnc: int,
+        lac: Optional[int],
+        cell_id: int,
+        pci: Optional[int],
+        earfcn: Optional[int],
+    ) -> CellTower:
+        tower, created = await CellTower.objects.aget_or_create(
+            mcc=mcc,
+            mnc=mnc,
+            cell_id=cell_id,
+            lac=lac,
+            defaults=_new_tower_defaults(attempt, radio_type=radio_type, pci=pci, earfcn=earfcn),
+        )
+        if not created:
+            update_fields = _merge_lookup(tower, attempt)
+            if not _buffer_update(tower, update_fields):
+                await tower.asave(update_fields=update_fields)
+        return tower
@@ -0,0 +1,242 @@
+"""
+Batch locate: many device reports per call.
+
+All towers of the batch are resolved with a single `TowerResolver.resolve_many()`
+pass, then reports are grouped by how many towers resolved (1, 2, 3+) and each
+group is solved at once with the array kernels in `cellular.utils.geometry`.
+Results match `locate_cells` report by report (including its result cache); a
+report that cannot be located gets an `error` entry instead of failing the batch.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from cellular.services.locate_cache import get_locate_cache
+from cellular.services.locator import resolve_requests
+from cellular.services.tower_resolver import TowerResolver
+from cellular.utils.cleaners import clean_cells
+from cellular.utils.geometry import (
+    calculate_distance_many,
+    destination_many,
+    distance_from_ta_many,
+    estimate_bearing_many,
+    rsrp_weight_many,
+    tower_path_loss,
+    tower_weight_many,
+    trilaterate_linear_many,
+    trilaterate_nlls_many,
+    trilaterate_two_many,
+    weighted_centroid_many,
+)
+
+DEFAULT_LOCATE_BATCH = {
+    # Upper bound on reports per request.
+    "MAX_REPORTS": 1000,
+}
+
+# (cell, tower, source) for every resolved cell of one report, in input order.
+Resolved = List[Tuple[Dict[str, Any], Any, str]]
+
+
+def locate_batch_config() -> Dict[str, Any]:
+    return {**DEFAULT_LOCATE_BATCH, **(getattr(settings, "LOCATE_BATCH", None) or {})}
+
+
+def _nan(value: Any) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def _result(lat: float, lon: float, radius: float, debug: Dict[str, Any]) -> Dict[str, Any]:
+    lat, lon = round(float(lat), 7), round(float(lon), 7)
+    return {
+        "location": {"lat": lat, "lon": lon, "google": f"{lat},{lon}"},
+        "radius": radius,
+        "debug": debug,
+    }
+
+
+def _padded(groups: List[Resolved], fn) -> np.ndarray:
+    """(B, K) float array of `fn(cell, tower)` over ragged groups, NaN-padded."""
+    width = max(len(g) for g in groups)
+    out = np.full((len(groups), width), np.nan)
+    for i, group in enumerate(groups):
+        out[i, : len(group)] = [_nan(fn(c, t)) for c, t, _s in group]
+    return out
+
+
+def _path_loss(groups: List[Resolved]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(tx, n, ref_loss) arrays of the per-tower path-loss constants, NaN-padded like `_padded`."""
+    return (
+        _padded(groups, lambda c, t: tower_path_loss(t)[0]),
+        _padded(groups, lambda c, t: tower_path_loss(t)[1]),
+        _padded(groups, lambda c, t: tower_path_loss(t)[2]),
+    )
+
+
+def _solve_single(groups: List[Resolved]) -> List[Dict[str, Any]]:
+    rsrp = _padded(groups, lambda c, t: c.get("signalStrength"))[:, 0]
+    ta_dist = distance_from_ta_many(_padded(groups, lambda c, t: c.get("timingAdvance"))[:, 0])
+    t_lat = _padded(groups, lambda c, t: t.lat)[:, 0]
+    t_lon = _padded(groups, lambda c, t: t.lon)[:, 0]
+    tx, n, ref_loss = (a[:, 0] for a in _path_loss(groups))
+    azimuth = _padded(groups, lambda c, t: getattr(t, "antenna_azimuth", None))[:, 0]
+    bearing = np.where(np.isnan(azimuth), estimate_bearing_many([g[0][1].cell_id or 0 for g in groups]), azimuth)
+
+    has_ta = ~np.isnan(ta_dist)
+    with np.errstate(invalid="ignore"):
+        strong = ~has_ta & (rsrp > -70)
+    radius = np.where(has_ta, ta_dist, np.where(strong, 100.0, calculate_distance_many(rsrp, tx, n, ref_loss)))
+    d_lat, d_lon = destination_many(t_lat, t_lon, radius, bearing)
+    lat = np.where(strong, t_lat, d_lat)
+    lon = np.where(strong, t_lon, d_lon)
+
+    results = []
+    for i, group in enumerate(groups):
+        cell, _tower, source = group[0]
+        signal = cell.get("signalStrength")
+        if has_ta[i] or strong[i]:
+            confidence = "high"
+        else:
+            confidence = "low" if signal is None or signal <= -100 else "medium"
+        results.append(
+            _result(
+                lat[i],
+                lon[i],
+                round(float(radius[i]), 2),
+                {
+                    "source": source,
+                    "bearing_used": 0.0 if strong[i] else float(bearing[i]),
+                    "signal": signal,
+                    "confidence": confidence,
+                },
+            )
+        )
+    return results
+
+
+def _solve_pair(groups: List[Resolved]) -> List[Dict[str, Any]]:
+    rsrp = _padded(groups, lambda c, t: c["signalStrength"])
+    t_lat = _padded(groups, lambda c, t: t.lat)
+    t_lon = _padded(groups, lambda c, t: t.lon)
+    radius = calculate_distance_many(rsrp, *_path_loss(groups))
+    lat, lon = trilaterate_two_many(
+        t_lat[:, 0], t_lon[:, 0], radius[:, 0], t_lat[:, 1], t_lon[:, 1], radius[:, 1], rsrp1=rsrp[:, 0], rsrp2=rsrp[:, 1]
+    )
+    min_radius = radius.min(axis=1)
+    return [
+        _result(
+            lat[i], lon[i], max(50.0, round(float(min_radius[i]), 2)),
+            {"source": "COMPOSITE", "bearing_used": None, "signal": None},
+        )
+        if np.isfinite(lat[i]) and np.isfinite(lon[i])
+        else {"error": "Unable to compute location"}
+        for i in range(len(groups))
+    ]
+
+
+def _solve_multi(groups: List[Resolved]) -> List[Dict[str, Any]]:
+    # Every resolved tower, strongest first (stable for equal signals, like `locate_cells`).
+    ranked = [sorted(g, key=lambda item: item[0]["signalStrength"], reverse=True) for g in groups]
+    r_lat = _padded(ranked, lambda c, t: t.lat)
+    r_lon = _padded(ranked, lambda c, t: t.lon)
+    r_rsrp = _padded(ranked, lambda c, t: c["signalStrength"])
+    r_mask = ~np.isnan(r_rsrp)
+    radius = calculate_distance_many(r_rsrp, *_path_loss(ranked))
+    radius = np.where(r_mask, radius, np.nan)
+    weight = tower_weight_many(r_rsrp, _padded(ranked, lambda c, t: c.get("rsrq")))
+    lat, lon, ok = trilaterate_nlls_many(r_lat, r_lon, radius, weight, r_mask)
+    l_lat, l_lon, l_ok = trilaterate_linear_many(r_lat, r_lon, radius)
+    lat, lon = np.where(ok, lat, l_lat), np.where(ok, lon, l_lon)
+    ok |= l_ok
+    min_radius = np.nanmin(radius, axis=1)
+
+    # Fallback: RSRP-weighted centroid of every resolved tower.
+    rsrp = _padded(groups, lambda c, t: c["signalStrength"])
+    mask = ~np.isnan(rsrp)
+    c_lat, c_lon = weighted_centroid_many(
+        _padded(groups, lambda c, t: t.lat), _padded(groups, lambda c, t: t.lon), rsrp_weight_many(rsrp), mask
+    )
+    c_radius = np.where(mask, calculate_distance_many(rsrp, *_path_loss(groups)), -np.inf).max(axis=1)
+
+    results = []
+    for i in range(len(groups)):
+        if ok[i]:
+            results.append(
+                _result(
+                    lat[i], lon[i], round(float(min_radius[i]), 2),
+                    {"source": "TRILATERATION", "bearing_used": None, "signal": None},
+                )
+            )
+        elif np.isfinite(c_lat[i]):
+            results.append(
+                _result(
+                    c_lat[i], c_lon[i], round(float(c_radius[i]), 2),
+                    {"source": "FALLBACK_CENTROID", "bearing_used": None, "signal": None},
+                )
+            )
+        else:
+            results.append({"error": "No towers found in database for provided cells"})
+    return results
+
+
+def locate_batch(
+    reports: Sequence[List[Dict[str, Any]]],
+    *,
+    resolver: Optional[TowerResolver] = None,
+    allow_external_serving: bool = True,
+    allow_external_neighbors: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Locate every report (a `cells` list as accepted by `locate_cells`).
+
+    Returns one entry per report, in input order: the `locate_cells` result, or
+    `{"error": ...}` with the message `locate_cells` would have raised.
+    """
+    if resolver is None:
+        resolver = TowerResolver()
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(reports)
+    cleaned: Dict[int, List[Dict[str, Any]]] = {}
+    requests: List[Dict[str, Any]] = []
+    for i, cells_data in enumerate(reports):
+        cells = clean_cells(cells_data)
+        if not cells:
+            results[i] = {"error": "No valid cells after cleaning"}
+            continue
+        cleaned[i] = cells
+        requests.extend(
+            resolve_requests(cells, allow_external_serving=allow_external_serving, allow_external_neighbors=allow_external_neighbors)
+        )
+
+    lookups = iter(resolver.resolve_many(requests))
+    result_cache = get_locate_cache()
+    epoch = result_cache.epoch if result_cache is not None else 0
+    keys: Dict[int, Any] = {}
+    by_size: Dict[int, Tuple[List[int], List[Resolved]]] = {1: ([], []), 2: ([], []), 3: ([], [])}
+    for i, cells in cleaned.items():
+        resolved = [(c, res.tower, res.source) for c, res in zip(cells, lookups) if res.tower is not None]
+        if not resolved:
+            results[i] = {"error": "No towers found in database for provided cells"}
+            continue
+        if result_cache is not None:
+            key = keys[i] = result_cache.fingerprint(resolved)
+            cached = result_cache.lookup(key, [c for c, _t, _s in resolved]) if key is not None else None
+            if cached is not None:
+                results[i] = cached
+                continue
+        idxs, groups = by_size[min(len(resolved), 3)]
+        idxs.append(i)
+        groups.append(resolved)
+
+    for size, solve in ((1, _solve_single), (2, _solve_pair), (3, _solve_multi)):
+        idxs, groups = by_size[size]
+        if groups:
+            for i, result in zip(idxs, solve(groups)):
+                results[i] = result
+                if keys.get(i) is not None and "error" not in result:
+                    result_cache.store(keys[i], result, epoch=epoch)
+    return results  # type: ignore[return-value]
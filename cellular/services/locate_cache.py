@@ -0,0 +1,215 @@
+"""
+Result cache in front of the locate solvers.
+
+Stationary devices (IoT trackers especially) keep reporting the same serving and
+neighbor cells with barely changing signal values. After tower resolution, the
+report is reduced to a fingerprint, the sorted resolved tower identities with
+RSRP / TA / RSRQ quantized into buckets, and a fresh result for the same
+fingerprint is returned without running the solvers again.
+
+Entries are evicted LRU/TTL and invalidated as soon as one of their towers changes:
+`CellTower` saves/deletes (signals), write-behind flushes, CSV imports and tower
+index refreshes all call `invalidate_locate_results()`, which also evicts the towers
+from the shared tower cache so the next solve re-reads them; full index reloads
+(and tower file remaps) call `invalidate_all_locate_results()`. Invalidation is per process;
+changes made elsewhere reach other workers through the index refresh when the tower
+index is enabled, and through `TTL_S` otherwise.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+import threading
+from typing import Any, Dict, Hashable, Iterable, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from cellular.models import CellTower
+from cellular.services.tower_cache import MISSING, LruTtlCache, evict_all_towers, evict_towers
+
+DEFAULT_LOCATE_CACHE = {
+    "ENABLED": True,
+    "MAX_ENTRIES": 20000,
+    "TTL_S": 60.0,
+    # Bucket widths for the fingerprint; 0 keeps exact values.
+    "RSRP_BUCKET_DB": 2,
+    "TA_BUCKET": 1,
+    "RSRQ_BUCKET_DB": 2,
+}
+
+
+def locate_cache_config() -> Dict[str, Any]:
+    return {**DEFAULT_LOCATE_CACHE, **(getattr(settings, "LOCATE_CACHE", None) or {})}
+
+
+def _bucket(value: Any, width: float) -> Optional[int]:
+    if value is None:
+        return None
+    if width <= 0:
+        return value
+    return math.floor(float(value) / width)
+
+
+def _part_order(part: Tuple) -> Tuple:
+    # Buckets may be None; order them first without comparing None to numbers.
+    return (part[0], part[1]) + tuple((v is not None, v or 0) for v in part[2:])
+
+
+class LocateResultCache(LruTtlCache):
+    """`LruTtlCache` of locate results that also knows which towers each entry used."""
+
+    def __init__(self, *, max_entries: int, ttl_s: float, rsrp_bucket_db: float, ta_bucket: float, rsrq_bucket_db: float):
+        super().__init__(max_entries=max_entries, ttl_s=ttl_s)
+        self.rsrp_bucket_db = float(rsrp_bucket_db)
+        self.ta_bucket = float(ta_bucket)
+        self.rsrq_bucket_db = float(rsrq_bucket_db)
+        self._towers_of: Dict[Hashable, Tuple[int, ...]] = {}
+        self._keys_by_tower: Dict[int, Set[Hashable]] = {}
+        # Bumped by every invalidation; results computed across one are not stored.
+        self.epoch = 0
+        self.invalidations = 0
+
+    def fingerprint(self, resolved: Iterable[Tuple[Dict[str, Any], Any, str]]) -> Optional[Tuple]:
+        """Key for resolved (cell, tower, source) triples, or None if a tower has no pk."""
+        parts = []
+        for cell, tower, source in resolved:
+            pk = getattr(tower, "pk", None)
+            if pk is None:
+                return None
+            parts.append(
+                (
+                    int(pk),
+                    source,
+                    _bucket(cell.get("signalStrength"), self.rsrp_bucket_db),
+                    _bucket(cell.get("timingAdvance"), self.ta_bucket),
+                    _bucket(cell.get("rsrq"), self.rsrq_bucket_db),
+                )
+            )
+        return tuple(sorted(parts, key=_part_order))
+
+    def lookup(self, key: Hashable, cells: Sequence[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        A private copy of the cached result for `key`, or None. The serving cell's
+        `debug.signal` is taken from `cells` (this report), not the cached one.
+        """
+        result = self.get(key)
+        if result is MISSING:
+            return None
+        result = copy.deepcopy(result)
+        debug = result.get("debug")
+        if isinstance(debug, dict) and debug.get("signal") is not None and len(cells) == 1:
+            debug["signal"] = cells[0].get("signalStrength")
+        return result
+
+    def store(self, key: Hashable, result: Dict[str, Any], *, epoch: int) -> None:
+        """Cache `result`, unless towers were invalidated since `epoch` was read."""
+        towers = tuple(sorted({part[0] for part in key}))
+        value = copy.deepcopy(result)
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            self._towers_of[key] = towers
+            for pk in towers:
+                self._keys_by_tower.setdefault(pk, set()).add(key)
+            self.set(key, value)
+
+    def invalidate_towers(self, pks: Iterable[Any]) -> int:
+        """Drop every result that used one of the towers `pks`; returns how many."""
+        with self._lock:
+            self.epoch += 1
+            keys: Set[Hashable] = set()
+            for pk in pks:
+                keys |= self._keys_by_tower.get(int(pk), set())
+            for key in keys:
+                self.delete(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def _discard(self, key: Hashable) -> None:
+        for pk in self._towers_of.pop(key, ()):
+            keys = self._keys_by_tower.get(pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tower[pk]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._towers_of.clear()
+            self._keys_by_tower.clear()
+            super().clear()
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "invalidations": self.invalidations,
+            "buckets": {"rsrp_db": self.rsrp_bucket_db, "ta": self.ta_bucket, "rsrq_db": self.rsrq_bucket_db},
+        }
+
+
+_cache: Any = MISSING
+_cache_lock = threading.Lock()
+
+
+def get_locate_cache() -> Optional[LocateResultCache]:
+    """Worker-wide locate result cache, or None when `LOCATE_CACHE["ENABLED"]` is off."""
+    global _cache
+    if _cache is MISSING:
+        with _cache_lock:
+            if _cache is MISSING:
+                cfg = locate_cache_config()
+                _cache = (
+                    LocateResultCache(
+                        max_entries=cfg["MAX_ENTRIES"],
+                        ttl_s=cfg["TTL_S"],
+                        rsrp_bucket_db=cfg["RSRP_BUCKET_DB"],
+                        ta_bucket=cfg["TA_BUCKET"],
+                        rsrq_bucket_db=cfg["RSRQ_BUCKET_DB"],
+                    )
+                    if cfg.get("ENABLED")
+                    else None
+                )
+    return _cache
+
+
+def invalidate_locate_results(pks: Sequence[Any]) -> int:
+    """
+    Drop cached results that used any of the towers `pks`, and the towers themselves
+    from the shared tower cache; returns how many results were dropped.
+    """
+    if not pks:
+        return 0
+    evict_towers(pks)
+    cache = _cache
+    if cache is MISSING or cache is None:
+        return 0
+    return cache.invalidate_towers(pks)
+
+
+def invalidate_all_locate_results() -> None:
+    """Drop every cached result and shared-cache tower (after a full index reload or remap)."""
+    evict_all_towers()
+    cache = _cache
+    if cache is not MISSING and cache is not None:
+        cache.clear()
+
+
+@receiver(post_save, sender=CellTower)
+@receiver(post_delete, sender=CellTower)
+def _invalidate_on_tower_change(*, instance: CellTower, **kwargs: Any) -> None:
+    if instance.pk is not None:
+        invalidate_locate_results([instance.pk])
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    global _cache
+    if setting == "LOCATE_CACHE":
+        with _cache_lock:
+            _cache = MISSING
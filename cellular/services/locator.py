@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
+from cellular.services.locate_cache import get_locate_cache
 from cellular.services.tower_resolver import TowerResolver
 from cellular.utils.cleaners import clean_cells
 from cellular.utils.geometry import (
@@ -9,12 +10,37 @@ from cellular.utils.geometry import (
     calculate_new_coordinates,
     distance_from_ta,
     estimate_bearing,
-    trilaterate_three,
+    tower_path_loss,
+    trilaterate_linear,
+    trilaterate_nlls,
     trilaterate_two_towers,
     weighted_centroid,
 )
 
 
+def resolve_requests(
+    cells: List[Dict[str, Any]],
+    *,
+    allow_external_serving: bool = True,
+    allow_external_neighbors: bool = False,
+) -> List[Dict[str, Any]]:
+    """Map cleaned cells to `TowerResolver.resolve_many()` items (serving vs neighbor external policy)."""
+    return [
+        {
+            "radio_type": c.get("radio_type"),
+            "mcc": c.get("mcc"),
+            "mnc": c.get("mnc"),
+            "cell_id": c.get("cellId"),
+            "lac": c.get("lac"),
+            "pci": c.get("pci"),
+            "earfcn": c.get("earfcn"),
+            "signal_strength": c.get("signalStrength"),
+            "allow_external": bool(allow_external_serving if c.get("registered", True) else allow_external_neighbors),
+        }
+        for c in cells
+    ]
+
+
 def locate_cells(
     cells_data: List[Dict[str, Any]],
     *,
@@ -23,13 +49,18 @@ def locate_cells(
     resolver: TowerResolver | None = None,
     allow_external_neighbors: bool = False,
     allow_external_serving: bool = True,
+    initial: Tuple[float, float] | None = None,
 ) -> Dict[str, Any]:
     """
     Core locate algorithm.
 
     - Cleans input cells
     - Resolves towers (DB first; optionally external providers)
-    - Computes location based on 1 / 2 / 3+ towers
+    - Computes location based on 1 / 2 / 3+ towers, unless the same resolved towers
+      with similar signals were located recently (see `locate_cache`)
+
+    `initial` (lat, lon) warm-starts the 3+ tower solver, e.g. from a tracked
+    device's predicted position (see `tracking`).
     """
     cells = clean_cells(cells_data)
     if not cells:
@@ -38,25 +69,18 @@ def locate_cells(
     if resolver is None:
         resolver = TowerResolver(reference_lat=reference_lat, reference_lon=reference_lon)
 
-    def _allow_external(cell: Dict[str, Any]) -> bool:
-        return bool(allow_external_serving if cell.get("registered", True) else allow_external_neighbors)
-
     # Only keep cells that have a resolvable tower (no temporary fallback).
     resolved_cells: list[dict[str, Any]] = []
     resolved_towers: list[Any] = []
     resolved_sources: list[str] = []
-    for c in cells:
-        res = resolver.resolve(
-            radio_type=c.get("radio_type"),
-            mcc=c.get("mcc"),
-            mnc=c.get("mnc"),
-            cell_id=c.get("cellId"),
-            lac=c.get("lac"),
-            pci=c.get("pci"),
-            earfcn=c.get("earfcn"),
-            signal_strength=c.get("signalStrength"),
-            allow_external=_allow_external(c),
+    lookups = resolver.resolve_many(
+        resolve_requests(
+            cells,
+            allow_external_serving=allow_external_serving,
+            allow_external_neighbors=allow_external_neighbors,
         )
+    )
+    for c, res in zip(cells, lookups):
         if res.tower is None:
             continue
         resolved_cells.append(c)
@@ -66,6 +90,27 @@ def locate_cells(
     if not resolved_cells:
         raise ValueError("No towers found in database for provided cells")
 
+    result_cache = get_locate_cache()
+    key = result_cache.fingerprint(zip(resolved_cells, resolved_towers, resolved_sources)) if result_cache is not None else None
+    if key is None:
+        return _locate_resolved(resolved_cells, resolved_towers, resolved_sources, initial=initial)
+    cached = result_cache.lookup(key, resolved_cells)
+    if cached is not None:
+        return cached
+    epoch = result_cache.epoch
+    result = _locate_resolved(resolved_cells, resolved_towers, resolved_sources, initial=initial)
+    result_cache.store(key, result, epoch=epoch)
+    return result
+
+
+def _locate_resolved(
+    resolved_cells: List[Dict[str, Any]],
+    resolved_towers: List[Any],
+    resolved_sources: List[str],
+    *,
+    initial: Tuple[float, float] | None = None,
+) -> Dict[str, Any]:
+    """Solve a fix from cells that all resolved to a tower (1 / 2 / 3+ tower paths)."""
     # 1 tower
     if len(resolved_cells) == 1:
         c = resolved_cells[0]
@@ -97,7 +142,7 @@ def locate_cells(
                 radius = 100.0
                 confidence = "high"
             else:
-                radius = calculate_distance(rsrp, tx_power=getattr(tower_obj, "tx_power", None))
+                radius = calculate_distance(rsrp, *tower_path_loss(tower_obj))
                 bearing_used = (
                     float(getattr(tower_obj, "antenna_azimuth", 0.0))
                     if getattr(tower_obj, "antenna_azimuth", None) is not None
@@ -128,13 +173,14 @@ def locate_cells(
         towers_info = []
         for idx, c in enumerate(resolved_cells):
             t = resolved_towers[idx]
-            towers_info.append({"lat": t.lat, "lon": t.lon, "rsrp": c["signalStrength"]})
+            radius = calculate_distance(c["signalStrength"], *tower_path_loss(t))
+            towers_info.append({"lat": t.lat, "lon": t.lon, "rsrp": c["signalStrength"], "radius": radius})
 
         centroid = trilaterate_two_towers(towers_info[0], towers_info[1])
         if centroid is None:
             raise RuntimeError("Unable to compute centroid")
 
-        radius = max(50.0, round(min(calculate_distance(c["signalStrength"]) for c in resolved_cells), 2))
+        radius = max(50.0, round(min(t["radius"] for t in towers_info), 2))
         return {
             "location": {
                 "lat": round(centroid["lat"], 7),
@@ -145,35 +191,17 @@ def locate_cells(
             "debug": {"source": "COMPOSITE", "bearing_used": None, "signal": None},
         }
 
-    # 3+ towers
+    # 3+ towers: weighted NLLS over every resolved tower (strongest first; the
+    # closed-form solve of the three strongest is the fallback).
     sorted_idxs = sorted(range(len(resolved_cells)), key=lambda i: resolved_cells[i]["signalStrength"], reverse=True)
-    top3 = sorted_idxs[:3]
     tower_objs: List[Dict[str, Any]] = []
-    for i in top3:
+    for i in sorted_idxs:
         c = resolved_cells[i]
         t = resolved_towers[i]
-        radius = calculate_distance(c["signalStrength"], tx_power=getattr(t, "tx_power", None))
+        radius = calculate_distance(c["signalStrength"], *tower_path_loss(t))
         tower_objs.append({"lat": t.lat, "lon": t.lon, "radius": radius, "rsrp": c["signalStrength"], "rsrq": c.get("rsrq")})
 
-    if len(tower_objs) < 3:
-        towers_info = []
-        for idx, c in enumerate(resolved_cells):
-            t = resolved_towers[idx]
-            towers_info.append({"lat": t.lat, "lon": t.lon, "rsrp": c["signalStrength"]})
-        centroid = weighted_centroid(towers_info)
-        if centroid is None:
-            raise ValueError("No towers found in database for provided cells")
-        return {
-            "location": {
-                "lat": round(centroid["lat"], 7),
-                "lon": round(centroid["lon"], 7),
-                "google": f"{round(centroid['lat'], 7)},{round(centroid['lon'], 7)}",
-            },
-            "radius": round(max(calculate_distance(c["signalStrength"]) for c in resolved_cells), 2),
-            "debug": {"source": "FALLBACK_CENTROID", "bearing_used": None, "signal": None},
-        }
-
-    trilat = trilaterate_three(tower_objs[0], tower_objs[1], tower_objs[2])
+    trilat = trilaterate_nlls(tower_objs, initial=initial) or trilaterate_linear(*tower_objs[:3])
     if trilat:
         final_lat, final_lon = trilat
         radius = min(t["radius"] for t in tower_objs)
@@ -201,7 +229,10 @@ def locate_cells(
             "lon": round(centroid["lon"], 7),
             "google": f"{round(centroid['lat'], 7)},{round(centroid['lon'], 7)}",
         },
-        "radius": round(max(calculate_distance(c["signalStrength"]) for c in resolved_cells), 2),
+        "radius": round(
+            max(calculate_distance(c["signalStrength"], *tower_path_loss(t)) for c, t in zip(resolved_cells, resolved_towers)),
+            2,
+        ),
         "debug": {"source": "FALLBACK_CENTROID", "bearing_used": None, "signal": None},
     }
 
@@ -223,20 +254,17 @@ def build_anchor_markers(
     if resolver is None:
         resolver = TowerResolver(reference_lat=reference_lat, reference_lon=reference_lon)
 
-    anchors: List[Dict[str, Any]] = []
-    for idx, c in enumerate(cells[: max(0, int(limit))]):
-        allow_external = allow_external_serving if c.get("registered", True) else allow_external_neighbors
-        res = resolver.resolve(
-            radio_type=c.get("radio_type"),
-            mcc=c.get("mcc"),
-            mnc=c.get("mnc"),
-            cell_id=c.get("cellId"),
-            lac=c.get("lac"),
-            pci=c.get("pci"),
-            earfcn=c.get("earfcn"),
-            signal_strength=c.get("signalStrength"),
-            allow_external=bool(allow_external),
+    cells = cells[: max(0, int(limit))]
+    lookups = resolver.resolve_many(
+        resolve_requests(
+            cells,
+            allow_external_serving=allow_external_serving,
+            allow_external_neighbors=allow_external_neighbors,
         )
+    )
+
+    anchors: List[Dict[str, Any]] = []
+    for idx, (c, res) in enumerate(zip(cells, lookups)):
         if res.tower is None:
             continue
 
@@ -1,11 +1,36 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+import requests
 
 from cellular.choices import DatasetSource
 
 
+class LookupOutcome:
+    """Why an external lookup produced no tower (drives negative-cache TTLs)."""
+
+    NOT_FOUND = "NOT_FOUND"
+    HTTP_ERROR = "HTTP_ERROR"
+    TIMEOUT = "TIMEOUT"
+    # Skipped by the transport without a network call.
+    CIRCUIT_OPEN = "CIRCUIT_OPEN"
+    RATE_LIMITED = "RATE_LIMITED"
+    # Still running when the fan-out took another provider's answer; never negative-cached.
+    ABANDONED = "ABANDONED"
+
+
+class ProviderUnavailable(Exception):
+    """Raised by the provider transport when a call is rejected locally."""
+
+    def __init__(self, message: str, *, outcome: str):
+        super().__init__(message)
+        self.outcome = outcome
+
+
 @dataclass(frozen=True)
 class ProviderLookup:
     lat: float
@@ -21,6 +46,8 @@ class ExternalTowerProvider:
 
     name: str
     dataset_source: str
+    # Cells per `lookup_many` call. 1 means every cell needs its own request.
+    max_batch_size: int = 1
 
     def lookup(
         self,
@@ -35,6 +62,69 @@ class ExternalTowerProvider:
     ) -> Optional[ProviderLookup]:
         raise NotImplementedError
 
+    def lookup_many(self, cells: Sequence[Dict[str, Any]], *, timeout_s: float) -> List[Optional[ProviderLookup]]:
+        """
+        Look up several cells (each a dict of `lookup` kwargs, without timeout_s), at most
+        `max_batch_size` of them. Returns one result per cell, in order; raises if the
+        whole request failed. Providers with a per-cell batch API override this.
+        """
+        return [self.lookup(**cell, timeout_s=timeout_s) for cell in cells]
+
+    async def alookup(
+        self,
+        *,
+        mcc: int,
+        mnc: int,
+        lac: Optional[int],
+        cell_id: int,
+        radio_type: str,
+        signal_strength: Optional[int],
+        timeout_s: float,
+    ) -> Optional[ProviderLookup]:
+        """Async variant of `lookup`. Providers without a native client run `lookup` in a thread."""
+        return await asyncio.to_thread(
+            self.lookup,
+            mcc=mcc,
+            mnc=mnc,
+            lac=lac,
+            cell_id=cell_id,
+            radio_type=radio_type,
+            signal_strength=signal_strength,
+            timeout_s=timeout_s,
+        )
+
+
+def parse_geolocation_response(
+    data: Optional[Dict[str, Any]],
+    *,
+    request_url: str,
+    request_body: Optional[Dict[str, Any]],
+) -> Optional[ProviderLookup]:
+    """
+    Parse the Google-style geolocation answer shared by Combain and Google:
+        {"location": {"lat": 35.75, "lng": 51.41}, "accuracy": 1234}
+    """
+    location = (data or {}).get("location") or {}
+    lat = location.get("lat")
+    lng = location.get("lng")
+    if lat is None or lng is None:
+        return None
+
+    accuracy = data.get("accuracy")
+    try:
+        accuracy_f = float(accuracy) if accuracy is not None else None
+    except Exception:
+        accuracy_f = None
+
+    return ProviderLookup(
+        lat=float(lat),
+        lon=float(lng),
+        accuracy_m=accuracy_f,
+        raw=data,
+        request_url=request_url,
+        request_body=request_body,
+    )
+
 
 def normalize_radio_type(value: str) -> str:
     s = (value or "").strip().lower()
@@ -48,6 +138,19 @@ def normalize_radio_type(value: str) -> str:
     return "lte"
 
 
+def classify_lookup_error(exc: BaseException) -> str:
+    if isinstance(exc, ProviderUnavailable):
+        return exc.outcome
+    if isinstance(exc, (requests.Timeout, httpx.TimeoutException, asyncio.TimeoutError)):
+        return LookupOutcome.TIMEOUT
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)):
+        status_code = getattr(exc.response, "status_code", None)
+        # Google answers 404 `notFound` when it has no fix for the cell.
+        if status_code == 404:
+            return LookupOutcome.NOT_FOUND
+    return LookupOutcome.HTTP_ERROR
+
+
 def dataset_source_for(provider_name: str) -> str:
     mapping = {
         "COMBAIN": DatasetSource.COMBAIN,
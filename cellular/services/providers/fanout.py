@@ -0,0 +1,375 @@
+"""
+Execution strategies for querying several external tower providers for one cell.
+
+Modes (`TOWER_PROVIDER_FANOUT["MODE"]`):
+- sequential: try providers one after another (the historical behavior)
+- parallel:   start every provider at once
+- hedged:     start the first provider, then the next one each time `HEDGE_DELAY_S`
+              passes without an answer (or as soon as the running ones all failed)
+
+In the concurrent modes the result is either the first acceptable answer
+(`PICK="first"`) or the most accurate answer received before `DEADLINE_S`
+(`PICK="most_accurate"`). Providers still running at the end are abandoned
+(cancelled, for the async variant): once another provider answered they are
+reported as `ABANDONED` (no verdict, no negative-cache entry), otherwise as
+`TIMEOUT`. Provider calls here only do HTTP; logging and DB writes stay with the
+caller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from cellular.services.providers.base import (
+    ExternalTowerProvider,
+    LookupOutcome,
+    ProviderLookup,
+    classify_lookup_error,
+)
+
+DEFAULT_FANOUT = {
+    "MODE": "sequential",
+    "HEDGE_DELAY_S": 1.0,
+    "DEADLINE_S": 12.0,
+    "PICK": "first",
+    "TIMEOUT_S": 10.0,
+    "MAX_WORKERS": 16,
+    # Cells looked up at once by AsyncTowerResolver.aresolve_many.
+    "ASYNC_MAX_CONCURRENCY": 32,
+}
+
+
+@dataclass
+class ProviderAttempt:
+    provider: ExternalTowerProvider
+    lookup: Optional[ProviderLookup] = None
+    error: Optional[BaseException] = None
+    outcome: Optional[str] = None
+    elapsed_s: float = 0.0
+
+    @property
+    def provider_name(self) -> str:
+        return getattr(self.provider, "name", "PROVIDER")
+
+
+def fanout_config() -> Dict[str, Any]:
+    return {**DEFAULT_FANOUT, **(getattr(settings, "TOWER_PROVIDER_FANOUT", None) or {})}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _provider_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(fanout_config()["MAX_WORKERS"])),
+                    thread_name_prefix="tower-provider",
+                )
+    return _executor
+
+
+def call_provider(provider: ExternalTowerProvider, **lookup_kwargs: Any) -> ProviderAttempt:
+    """Run one provider lookup and capture its outcome instead of raising."""
+    started = time.monotonic()
+    try:
+        lookup = provider.lookup(**lookup_kwargs)
+    except Exception as exc:
+        return ProviderAttempt(
+            provider=provider,
+            error=exc,
+            outcome=classify_lookup_error(exc),
+            elapsed_s=time.monotonic() - started,
+        )
+    return ProviderAttempt(
+        provider=provider,
+        lookup=lookup,
+        outcome=None if lookup else LookupOutcome.NOT_FOUND,
+        elapsed_s=time.monotonic() - started,
+    )
+
+
+def _more_accurate(candidate: ProviderAttempt, best: ProviderAttempt) -> bool:
+    def accuracy(attempt: ProviderAttempt) -> float:
+        value = attempt.lookup.accuracy_m if attempt.lookup is not None else None
+        return float(value) if value is not None else float("inf")
+
+    return accuracy(candidate) < accuracy(best)
+
+
+def _abandoned_attempt(
+    provider: ExternalTowerProvider, best: Optional[ProviderAttempt], started: float
+) -> ProviderAttempt:
+    """A provider still running when the fan-out stopped."""
+    elapsed_s = time.monotonic() - started
+    if best is not None:
+        # Another provider answered: this one did not fail, it was just not needed.
+        return ProviderAttempt(provider=provider, outcome=LookupOutcome.ABANDONED, elapsed_s=elapsed_s)
+    return ProviderAttempt(
+        provider=provider,
+        error=TimeoutError("no answer before the fan-out deadline"),
+        outcome=LookupOutcome.TIMEOUT,
+        elapsed_s=elapsed_s,
+    )
+
+
+def query_providers(
+    providers: Sequence[ExternalTowerProvider],
+    lookup_kwargs: Dict[str, Any],
+    *,
+    config: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[ProviderAttempt], List[ProviderAttempt]]:
+    """
+    Query `providers` for one cell according to the configured mode.
+    Returns (chosen attempt or None, every attempt made in completion order).
+    """
+    cfg = config or fanout_config()
+    mode = str(cfg["MODE"]).lower()
+    kwargs = {**lookup_kwargs, "timeout_s": float(cfg["TIMEOUT_S"])}
+
+    if mode not in ("parallel", "hedged") or len(providers) < 2:
+        attempts: List[ProviderAttempt] = []
+        for provider in providers:
+            attempt = call_provider(provider, **kwargs)
+            attempts.append(attempt)
+            if attempt.lookup is not None:
+                return attempt, attempts
+        return None, attempts
+
+    hedge_delay_s = float(cfg["HEDGE_DELAY_S"]) if mode == "hedged" else 0.0
+    pick_first = str(cfg["PICK"]).lower() != "most_accurate"
+    executor = _provider_executor()
+
+    started = time.monotonic()
+    deadline = started + float(cfg["DEADLINE_S"])
+    queue = list(providers)
+    pending: Dict[Future, ExternalTowerProvider] = {}
+    attempts = []
+    best: Optional[ProviderAttempt] = None
+    next_launch = started
+
+    while True:
+        now = time.monotonic()
+        # Launch the next provider once its hedge delay has passed or nothing is in flight.
+        while queue and (now >= next_launch or not pending):
+            provider = queue.pop(0)
+            pending[executor.submit(call_provider, provider, **kwargs)] = provider
+            next_launch = now + hedge_delay_s
+        if not pending:
+            break
+
+        wait_until = min(deadline, next_launch) if queue else deadline
+        done, _ = wait(list(pending), timeout=max(0.0, wait_until - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.pop(future)
+            attempt = future.result()
+            attempts.append(attempt)
+            if attempt.lookup is not None and (best is None or _more_accurate(attempt, best)):
+                best = attempt
+
+        if best is not None and pick_first:
+            break
+        if time.monotonic() >= deadline:
+            break
+
+    for future, provider in pending.items():
+        future.cancel()
+        attempts.append(_abandoned_attempt(provider, best, started))
+    return best, attempts
+
+
+def _call_provider_batch(
+    provider: ExternalTowerProvider, cells: Sequence[Dict[str, Any]], timeout_s: float
+) -> List[ProviderAttempt]:
+    started = time.monotonic()
+    try:
+        lookups = provider.lookup_many(cells, timeout_s=timeout_s)
+    except Exception as exc:
+        outcome = classify_lookup_error(exc)
+        elapsed_s = time.monotonic() - started
+        return [ProviderAttempt(provider=provider, error=exc, outcome=outcome, elapsed_s=elapsed_s) for _ in cells]
+    elapsed_s = time.monotonic() - started
+    return [
+        ProviderAttempt(
+            provider=provider,
+            lookup=lookup,
+            outcome=None if lookup else LookupOutcome.NOT_FOUND,
+            elapsed_s=elapsed_s,
+        )
+        for lookup in lookups
+    ]
+
+
+def call_provider_many(
+    provider: ExternalTowerProvider, cells: Sequence[Dict[str, Any]], *, timeout_s: float
+) -> List[ProviderAttempt]:
+    """
+    Look up `cells` with one provider using as few calls as its `max_batch_size`
+    allows; the calls run concurrently. Returns one attempt per cell, in order.
+    """
+    if len(cells) == 1:
+        return [call_provider(provider, **cells[0], timeout_s=timeout_s)]
+
+    size = max(1, int(getattr(provider, "max_batch_size", 1)))
+    executor = _provider_executor()
+    if size == 1:
+        futures = [executor.submit(call_provider, provider, **cell, timeout_s=timeout_s) for cell in cells]
+        return [future.result() for future in futures]
+
+    futures = [
+        executor.submit(_call_provider_batch, provider, cells[start:start + size], timeout_s)
+        for start in range(0, len(cells), size)
+    ]
+    return [attempt for future in futures for attempt in future.result()]
+
+
+_cell_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _cells_executor() -> ThreadPoolExecutor:
+    # Separate from the provider pool: its tasks wait on provider futures themselves.
+    global _cell_executor
+    if _cell_executor is None:
+        with _executor_lock:
+            if _cell_executor is None:
+                _cell_executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(fanout_config()["MAX_WORKERS"])),
+                    thread_name_prefix="tower-provider-cell",
+                )
+    return _cell_executor
+
+
+def query_providers_many(
+    providers: Sequence[ExternalTowerProvider],
+    lookup_kwargs_list: Sequence[Dict[str, Any]],
+    *,
+    config: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[Optional[ProviderAttempt], List[ProviderAttempt]]]:
+    """
+    `query_providers` for several cells at once; returns one (chosen, attempts) per cell.
+
+    Sequential mode queries provider by provider: every cell goes to the first
+    provider in one `call_provider_many`, the cells it could not resolve go to the
+    next one. Parallel/hedged modes run the per-cell fan-out for all cells concurrently.
+    """
+    cfg = config or fanout_config()
+    if not lookup_kwargs_list:
+        return []
+    if len(lookup_kwargs_list) == 1:
+        return [query_providers(providers, lookup_kwargs_list[0], config=cfg)]
+
+    mode = str(cfg["MODE"]).lower()
+    if mode in ("parallel", "hedged") and len(providers) >= 2:
+        executor = _cells_executor()
+        futures = [executor.submit(query_providers, providers, kwargs, config=cfg) for kwargs in lookup_kwargs_list]
+        return [future.result() for future in futures]
+
+    timeout_s = float(cfg["TIMEOUT_S"])
+    best: List[Optional[ProviderAttempt]] = [None] * len(lookup_kwargs_list)
+    attempts: List[List[ProviderAttempt]] = [[] for _ in lookup_kwargs_list]
+    remaining = list(range(len(lookup_kwargs_list)))
+    for provider in providers:
+        if not remaining:
+            break
+        tier = call_provider_many(provider, [lookup_kwargs_list[i] for i in remaining], timeout_s=timeout_s)
+        for idx, attempt in zip(remaining, tier):
+            attempts[idx].append(attempt)
+            if attempt.lookup is not None:
+                best[idx] = attempt
+        remaining = [idx for idx in remaining if best[idx] is None]
+    return list(zip(best, attempts))
+
+
+async def acall_provider(provider: ExternalTowerProvider, **lookup_kwargs: Any) -> ProviderAttempt:
+    """Async `call_provider` using the provider's native `alookup`."""
+    started = time.monotonic()
+    try:
+        lookup = await provider.alookup(**lookup_kwargs)
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        return ProviderAttempt(
+            provider=provider,
+            error=exc,
+            outcome=classify_lookup_error(exc),
+            elapsed_s=time.monotonic() - started,
+        )
+    return ProviderAttempt(
+        provider=provider,
+        lookup=lookup,
+        outcome=None if lookup else LookupOutcome.NOT_FOUND,
+        elapsed_s=time.monotonic() - started,
+    )
+
+
+async def aquery_providers(
+    providers: Sequence[ExternalTowerProvider],
+    lookup_kwargs: Dict[str, Any],
+    *,
+    config: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[ProviderAttempt], List[ProviderAttempt]]:
+    """Async `query_providers`; abandoned provider calls are cancelled."""
+    cfg = config or fanout_config()
+    mode = str(cfg["MODE"]).lower()
+    kwargs = {**lookup_kwargs, "timeout_s": float(cfg["TIMEOUT_S"])}
+
+    if mode not in ("parallel", "hedged") or len(providers) < 2:
+        attempts: List[ProviderAttempt] = []
+        for provider in providers:
+            attempt = await acall_provider(provider, **kwargs)
+            attempts.append(attempt)
+            if attempt.lookup is not None:
+                return attempt, attempts
+        return None, attempts
+
+    hedge_delay_s = float(cfg["HEDGE_DELAY_S"]) if mode == "hedged" else 0.0
+    pick_first = str(cfg["PICK"]).lower() != "most_accurate"
+
+    started = time.monotonic()
+    deadline = started + float(cfg["DEADLINE_S"])
+    queue = list(providers)
+    pending: Dict[asyncio.Task, ExternalTowerProvider] = {}
+    attempts = []
+    best: Optional[ProviderAttempt] = None
+    next_launch = started
+
+    try:
+        while True:
+            now = time.monotonic()
+            while queue and (now >= next_launch or not pending):
+                provider = queue.pop(0)
+                pending[asyncio.ensure_future(acall_provider(provider, **kwargs))] = provider
+                next_launch = now + hedge_delay_s
+            if not pending:
+                break
+
+            wait_until = min(deadline, next_launch) if queue else deadline
+            done, _ = await asyncio.wait(
+                list(pending), timeout=max(0.0, wait_until - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                pending.pop(task)
+                attempt = task.result()
+                attempts.append(attempt)
+                if attempt.lookup is not None and (best is None or _more_accurate(attempt, best)):
+                    best = attempt
+
+            if best is not None and pick_first:
+                break
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        for task, provider in pending.items():
+            task.cancel()
+            attempts.append(_abandoned_attempt(provider, best, started))
+    return best, attempts
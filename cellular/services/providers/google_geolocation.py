@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import requests
 
-from cellular.services.providers.base import ExternalTowerProvider, ProviderLookup, normalize_radio_type
+from cellular.services.providers.base import (
+    ExternalTowerProvider,
+    ProviderLookup,
+    normalize_radio_type,
+    parse_geolocation_response,
+)
+from cellular.services.providers.transport import get_transport
 
 
 @dataclass(frozen=True)
@@ -80,7 +86,12 @@ class GoogleGeolocationProvider(ExternalTowerProvider):
     def __init__(self, *, api_key: str):
         self.api_key = api_key
 
-    def lookup(
+    # The Google Geolocation API fuses every entry of `cellTowers` into one device position, so
+    # packing several unknown cells into one request would not locate each of them.
+    max_batch_size = 1
+    request_url = "https://www.googleapis.com/geolocation/v1/geolocate"
+
+    def _build_request(
         self,
         *,
         mcc: int,
@@ -89,9 +100,7 @@ class GoogleGeolocationProvider(ExternalTowerProvider):
         cell_id: int,
         radio_type: str,
         signal_strength: Optional[int],
-        timeout_s: float,
-    ) -> Optional[ProviderLookup]:
-        request_url = "https://www.googleapis.com/geolocation/v1/geolocate"
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
         params = {"key": self.api_key}
 
         tower: Dict[str, Any] = {
@@ -109,28 +118,40 @@ class GoogleGeolocationProvider(ExternalTowerProvider):
             "considerIp": False,
             "cellTowers": [tower],
         }
+        return params, request_body
 
-        resp = requests.post(request_url, params=params, json=request_body, timeout=timeout_s)
+    def lookup(
+        self,
+        *,
+        mcc: int,
+        mnc: int,
+        lac: Optional[int],
+        cell_id: int,
+        radio_type: str,
+        signal_strength: Optional[int],
+        timeout_s: float,
+    ) -> Optional[ProviderLookup]:
+        params, request_body = self._build_request(
+            mcc=mcc, mnc=mnc, lac=lac, cell_id=cell_id, radio_type=radio_type, signal_strength=signal_strength
+        )
+        resp = get_transport(self.name).post(self.request_url, params=params, json=request_body, timeout=timeout_s)
         resp.raise_for_status()
-        data = resp.json()
-
-        location = (data or {}).get("location") or {}
-        lat = location.get("lat")
-        lng = location.get("lng")
-        if lat is None or lng is None:
-            return None
-
-        accuracy = data.get("accuracy")
-        try:
-            accuracy_f = float(accuracy) if accuracy is not None else None
-        except Exception:
-            accuracy_f = None
-
-        return ProviderLookup(
-            lat=float(lat),
-            lon=float(lng),
-            accuracy_m=accuracy_f,
-            raw=data,
-            request_url=request_url,
-            request_body=request_body,
+        return parse_geolocation_response(resp.json(), request_url=self.request_url, request_body=request_body)
+
+    async def alookup(
+        self,
+        *,
+        mcc: int,
+        mnc: int,
+        lac: Optional[int],
+        cell_id: int,
+        radio_type: str,
+        signal_strength: Optional[int],
+        timeout_s: float,
+    ) -> Optional[ProviderLookup]:
+        params, request_body = self._build_request(
+            mcc=mcc, mnc=mnc, lac=lac, cell_id=cell_id, radio_type=radio_type, signal_strength=signal_strength
         )
+        resp = await get_transport(self.name).apost(self.request_url, params=params, json=request_body, timeout=timeout_s)
+        resp.raise_for_status()
+        return parse_geolocation_response(resp.json(), request_url=self.request_url, request_body=request_body)
@@ -0,0 +1,314 @@
+"""
+Shared HTTP transport for external tower providers.
+
+Every provider gets one `ProviderTransport` per worker (see `get_transport`):
+- a pooled keep-alive `requests.Session` (and a per-event-loop `httpx.AsyncClient`
+  for the async path), so calls reuse TCP/TLS connections;
+- a token bucket capping the provider's request rate (`RATE_PER_S`, `BURST`);
+  callers wait up to `MAX_WAIT_S` for a token before giving up;
+- a circuit breaker over the last `BREAKER_WINDOW` calls: when at least
+  `BREAKER_MIN_CALLS` were made and the share of failures (errors, 5xx/429, or calls
+  slower than `BREAKER_SLOW_CALL_S`) reaches `BREAKER_ERROR_RATE`, the provider is
+  skipped for `BREAKER_OPEN_S`; then a single half-open probe decides whether it
+  closes again.
+
+Rejected calls raise `ProviderUnavailable` without touching the network.
+Configured by `TOWER_PROVIDER_TRANSPORT` (defaults plus per-provider overrides
+under "PROVIDERS"); state is exposed by `transport_stats()`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+from cellular.services.providers.base import LookupOutcome, ProviderUnavailable
+
+DEFAULT_TRANSPORT = {
+    "POOL_MAXSIZE": 32,
+    # Requests per second per provider; 0 disables rate limiting.
+    "RATE_PER_S": 20.0,
+    "BURST": 40,
+    "MAX_WAIT_S": 2.0,
+    "BREAKER_WINDOW": 20,
+    "BREAKER_MIN_CALLS": 10,
+    "BREAKER_ERROR_RATE": 0.5,
+    "BREAKER_SLOW_CALL_S": 5.0,
+    "BREAKER_OPEN_S": 30.0,
+    # Per-provider overrides, e.g. {"GOOGLE": {"RATE_PER_S": 5}}.
+    "PROVIDERS": {},
+}
+
+
+def transport_config(name: str) -> Dict[str, Any]:
+    cfg = {**DEFAULT_TRANSPORT, **(getattr(settings, "TOWER_PROVIDER_TRANSPORT", None) or {})}
+    overrides = (cfg.pop("PROVIDERS", None) or {}).get(name.upper()) or {}
+    return {**cfg, **overrides}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `rate_per_s <= 0` never limits."""
+
+    def __init__(self, *, rate_per_s: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_s = float(rate_per_s)
+        self.burst = max(1.0, float(burst))
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _reserve(self) -> float:
+        """Take a token if one is available; otherwise return seconds until one is."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate_per_s
+
+    def acquire(self, *, max_wait_s: float) -> bool:
+        if self.rate_per_s <= 0:
+            return True
+        deadline = self._clock() + max_wait_s
+        while True:
+            wait_s = self._reserve()
+            if wait_s == 0.0:
+                return True
+            if self._clock() + wait_s > deadline:
+                self.rejected += 1
+                return False
+            time.sleep(wait_s)
+
+    async def aacquire(self, *, max_wait_s: float) -> bool:
+        if self.rate_per_s <= 0:
+            return True
+        deadline = self._clock() + max_wait_s
+        while True:
+            wait_s = self._reserve()
+            if wait_s == 0.0:
+                return True
+            if self._clock() + wait_s > deadline:
+                self.rejected += 1
+                return False
+            await asyncio.sleep(wait_s)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rate_per_s": self.rate_per_s, "burst": self.burst, "tokens": round(self._tokens, 2), "rejected": self.rejected}
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        *,
+        window: int,
+        min_calls: int,
+        error_rate: float,
+        slow_call_s: float,
+        open_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_calls = max(1, int(min_calls))
+        self.error_rate = float(error_rate)
+        self.slow_call_s = float(slow_call_s)
+        self.open_s = float(open_s)
+        self._clock = clock
+        self._results: Deque[bool] = deque(maxlen=max(1, int(window)))
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_s:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, *, ok: bool, elapsed_s: float) -> None:
+        failed = not ok or elapsed_s > self.slow_call_s
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if failed:
+                    self._trip()
+                else:
+                    self._state = self.CLOSED
+                    self._results.clear()
+                return
+            self._results.append(failed)
+            if len(self._results) >= self.min_calls and sum(self._results) / len(self._results) >= self.error_rate:
+                self._trip()
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without a verdict (call never made or abandoned)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _trip(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self._results.clear()
+        self.trips += 1
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            calls = len(self._results)
+            return {
+                "state": state,
+                "window_calls": calls,
+                "window_error_rate": (sum(self._results) / calls) if calls else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+def _is_failure_status(status_code: int) -> bool:
+    # 4xx other than 429 mean the provider is healthy and answered the question.
+    return status_code >= 500 or status_code == 429
+
+
+class ProviderTransport:
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.config = config
+        self.bucket = TokenBucket(rate_per_s=config["RATE_PER_S"], burst=config["BURST"])
+        self.breaker = CircuitBreaker(
+            window=config["BREAKER_WINDOW"],
+            min_calls=config["BREAKER_MIN_CALLS"],
+            error_rate=config["BREAKER_ERROR_RATE"],
+            slow_call_s=config["BREAKER_SLOW_CALL_S"],
+            open_s=config["BREAKER_OPEN_S"],
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(config["POOL_MAXSIZE"]))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.calls = 0
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} circuit is open", outcome=LookupOutcome.CIRCUIT_OPEN)
+
+    def _rate_limited(self) -> ProviderUnavailable:
+        self.breaker.release()
+        return ProviderUnavailable(f"{self.name} rate limit exceeded", outcome=LookupOutcome.RATE_LIMITED)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        self._admit()
+        if not self.bucket.acquire(max_wait_s=float(self.config["MAX_WAIT_S"])):
+            raise self._rate_limited()
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            resp = self.session.post(url, **kwargs)
+        except Exception:
+            self.breaker.record(ok=False, elapsed_s=time.monotonic() - started)
+            raise
+        self.breaker.record(ok=not _is_failure_status(resp.status_code), elapsed_s=time.monotonic() - started)
+        return resp
+
+    def async_client(self) -> httpx.AsyncClient:
+        """Pooled keep-alive client for the running event loop (one per loop)."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            max_size = int(self.config["POOL_MAXSIZE"])
+            client = httpx.AsyncClient(limits=httpx.Limits(max_connections=max_size, max_keepalive_connections=max_size))
+            self._async_clients[loop] = client
+        return client
+
+    async def apost(self, url: str, **kwargs: Any) -> httpx.Response:
+        self._admit()
+        if not await self.bucket.aacquire(max_wait_s=float(self.config["MAX_WAIT_S"])):
+            raise self._rate_limited()
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            resp = await self.async_client().post(url, **kwargs)
+        except asyncio.CancelledError:
+            # Abandoned by the fan-out: no verdict on the provider's health.
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(ok=False, elapsed_s=time.monotonic() - started)
+            raise
+        self.breaker.record(ok=not _is_failure_status(resp.status_code), elapsed_s=time.monotonic() - started)
+        return resp
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "circuit": self.breaker.stats(),
+            "rate_limit": self.bucket.stats(),
+            "pool_maxsize": int(self.config["POOL_MAXSIZE"]),
+        }
+
+
+_transports: Dict[str, ProviderTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(name: str) -> ProviderTransport:
+    """Worker-wide transport for provider `name` (e.g. "COMBAIN", "GOOGLE")."""
+    key = name.upper()
+    transport = _transports.get(key)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(key)
+            if transport is None:
+                transport = _transports[key] = ProviderTransport(key, transport_config(key))
+    return transport
+
+
+def transport_stats() -> Dict[str, Dict[str, Any]]:
+    with _transports_lock:
+        transports = dict(_transports)
+    return {name: transport.stats() for name, transport in sorted(transports.items())}
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    if setting == "TOWER_PROVIDER_TRANSPORT":
+        with _transports_lock:
+            _transports.clear()
@@ -0,0 +1,311 @@
+"""
+Single-flight coalescing for external tower lookups.
+
+When many requests miss the DB for the same new cell at once, only one of them
+calls the paid providers; the others wait and share its result.
+
+- In-process: one leader per key, followers block on the leader's result.
+- Across processes (`TOWER_SINGLE_FLIGHT["DISTRIBUTED"]`): the leader also takes a
+  lock in the configured Django cache backend (`cache.add`). A process that cannot
+  get the lock waits for it to go away and then calls `on_remote_done` (typically a
+  DB re-read of the tower the other process upserted) instead of calling providers.
+  If the lock is still held after `WAIT_S`, the lookup runs anyway.
+
+The cross-process lock is only as shared as the cache backend: use Redis/Memcached
+(or the DB cache) for multi-host deployments; LocMemCache only covers one process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SINGLE_FLIGHT = {
+    "ENABLED": True,
+    "DISTRIBUTED": False,
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "tower-lookup-lock",
+    # Lock lifetime in the cache; must exceed the provider fan-out deadline.
+    "LOCK_TTL_S": 30.0,
+    # How long a follower waits before running the lookup itself.
+    "WAIT_S": 15.0,
+    "POLL_S": 0.1,
+}
+
+
+def single_flight_config() -> Dict[str, Any]:
+    return {**DEFAULT_SINGLE_FLIGHT, **(getattr(settings, "TOWER_SINGLE_FLIGHT", None) or {})}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls per key; see module docstring."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**DEFAULT_SINGLE_FLIGHT, **(config or {})}
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # One map per event loop: a future can only be awaited on the loop that created it.
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future[Any]]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.coalesced = 0
+
+    def _lock_key(self, key: Hashable) -> str:
+        return f"{self.config['KEY_PREFIX']}:" + ":".join("" if part is None else str(part) for part in key)
+
+    def _cache(self):
+        return caches[self.config["CACHE_ALIAS"]]
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        *,
+        on_remote_done: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """Run `fn` once per in-flight `key`; concurrent callers get the same result."""
+        if not self.config["ENABLED"]:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_distributed(key, fn, on_remote_done)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def do_many(
+        self,
+        keys: Sequence[Hashable],
+        fn_many: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        *,
+        on_remote_done: Optional[Callable[[Hashable], Any]] = None,
+    ) -> Dict[Hashable, Any]:
+        """
+        Batch `do`: keys nobody is working on are led by this caller with a single
+        `fn_many(keys)` call; keys already in flight wait for their leader.
+        """
+        if not self.config["ENABLED"]:
+            return fn_many(list(keys))
+
+        led: Dict[Hashable, _Call] = {}
+        followed: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    led[key] = self._calls[key] = _Call()
+                else:
+                    followed[key] = call
+                    self.coalesced += 1
+
+        results: Dict[Hashable, Any] = {}
+        try:
+            if led:
+                results.update(self._run_distributed_many(list(led), fn_many, on_remote_done))
+        except BaseException as exc:
+            for call in led.values():
+                call.error = exc
+            raise
+        finally:
+            with self._lock:
+                for key in led:
+                    self._calls.pop(key, None)
+            for key, call in led.items():
+                call.result = results.get(key)
+                call.done.set()
+
+        for key, call in followed.items():
+            call.done.wait()
+            results[key] = call.result if call.error is None else None
+        return results
+
+    def _run_distributed_many(
+        self,
+        keys: List[Hashable],
+        fn_many: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        on_remote_done: Optional[Callable[[Hashable], Any]],
+    ) -> Dict[Hashable, Any]:
+        if not self.config["DISTRIBUTED"]:
+            return fn_many(keys)
+
+        # Lead the keys whose lock this process gets. The others are polled together
+        # under one `WAIT_S` deadline: a key whose lock goes away is handed to
+        # `on_remote_done` (or led here, without it), the rest are looked up at the deadline.
+        cache = self._cache()
+        token = uuid.uuid4().hex
+        ttl = float(self.config["LOCK_TTL_S"])
+        deadline = time.monotonic() + float(self.config["WAIT_S"])
+        pending = list(keys)
+        results: Dict[Hashable, Any] = {}
+        while True:
+            locked = {key for key in pending if cache.add(self._lock_key(key), token, timeout=ttl)}
+            try:
+                if locked:
+                    results.update(fn_many([key for key in pending if key in locked]))
+            finally:
+                for key in locked:
+                    if cache.get(self._lock_key(key)) == token:
+                        cache.delete(self._lock_key(key))
+            pending = [key for key in pending if key not in locked]
+            if not pending:
+                return results
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    "%d lookup locks still held after %.1fs; looking up anyway", len(pending), self.config["WAIT_S"]
+                )
+                results.update(fn_many(pending))
+                return results
+            time.sleep(float(self.config["POLL_S"]))
+            if on_remote_done is not None:
+                held = cache.get_many([self._lock_key(key) for key in pending])
+                for key in [key for key in pending if self._lock_key(key) not in held]:
+                    results[key] = on_remote_done(key)
+                    pending.remove(key)
+
+    def _run_distributed(self, key: Hashable, fn: Callable[[], Any], on_remote_done: Optional[Callable[[], Any]]) -> Any:
+        if not self.config["DISTRIBUTED"]:
+            return fn()
+
+        cache = self._cache()
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + float(self.config["WAIT_S"])
+        while not cache.add(lock_key, token, timeout=float(self.config["LOCK_TTL_S"])):
+            if time.monotonic() >= deadline:
+                logger.warning("Lookup lock %s still held after %.1fs; looking up anyway", lock_key, self.config["WAIT_S"])
+                return fn()
+            time.sleep(float(self.config["POLL_S"]))
+            if cache.get(lock_key) is None and on_remote_done is not None:
+                return on_remote_done()
+
+        try:
+            return fn()
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    async def ado(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        *,
+        on_remote_done: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """Async `do`; coroutines coalesce with others on the same event loop."""
+        if not self.config["ENABLED"]:
+            return await fn()
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+        future = calls.get(key)
+        if future is not None and not future.done():
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = calls[key] = loop.create_future()
+        try:
+            result = await self._arun_distributed(key, fn, on_remote_done)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if calls.get(key) is future:
+                del calls[key]
+
+    async def _arun_distributed(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]], on_remote_done: Optional[Callable[[], Awaitable[Any]]]
+    ) -> Any:
+        if not self.config["DISTRIBUTED"]:
+            return await fn()
+
+        cache = self._cache()
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + float(self.config["WAIT_S"])
+        while not await cache.aadd(lock_key, token, timeout=float(self.config["LOCK_TTL_S"])):
+            if time.monotonic() >= deadline:
+                logger.warning("Lookup lock %s still held after %.1fs; looking up anyway", lock_key, self.config["WAIT_S"])
+                return await fn()
+            await asyncio.sleep(float(self.config["POLL_S"]))
+            if await cache.aget(lock_key) is None and on_remote_done is not None:
+                return await on_remote_done()
+
+        try:
+            return await fn()
+        finally:
+            if await cache.aget(lock_key) == token:
+                await cache.adelete(lock_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls) + sum(len(calls) for calls in list(self._async_calls.values())),
+            "coalesced": self.coalesced,
+            "distributed": bool(self.config["DISTRIBUTED"]),
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Worker-wide `SingleFlight` built from `TOWER_SINGLE_FLIGHT`."""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(single_flight_config())
+    return _single_flight
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    global _single_flight
+    if setting == "TOWER_SINGLE_FLIGHT":
+        with _single_flight_lock:
+            _single_flight = None
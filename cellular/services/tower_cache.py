@@ -0,0 +1,294 @@
+"""
+Process-wide caches shared by every `TowerResolver` in a worker.
+
+`TowerResolver._cache` only lives for one request; the shared tower cache keeps
+LOCAL_DB hits across requests, keyed on tower identity (mcc, mnc, cell_id, lac)
+rather than on the full per-request key (which includes signal strength).
+
+Entries are evicted as soon as their tower changes: `CellTower` saves/deletes
+(signals below) and the bulk paths that bypass signals (imports, write-behind
+flushes, index refreshes, via `invalidate_locate_results`) call `evict_towers()`;
+full index reloads empty the cache.
+
+The negative cache remembers cells that no external provider could resolve, with a
+TTL per failure outcome, so phantom/mis-decoded cell IDs do not trigger the same paid
+lookups on every request.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+MISSING = object()
+
+DEFAULT_TOWER_CACHE = {
+    "ENABLED": True,
+    "MAX_ENTRIES": 50000,
+    "TTL_S": 600.0,
+}
+
+DEFAULT_NEGATIVE_CACHE = {
+    "ENABLED": True,
+    "MAX_ENTRIES": 20000,
+    # Seconds to remember a failed external lookup, per outcome.
+    "TTL_S": {
+        "NOT_FOUND": 6 * 3600.0,
+        "HTTP_ERROR": 300.0,
+        "TIMEOUT": 60.0,
+        # The provider was skipped locally (open circuit / rate limit); retry soon.
+        "CIRCUIT_OPEN": 30.0,
+        "RATE_LIMITED": 5.0,
+    },
+}
+
+
+class LruTtlCache:
+    """
+    Thread-safe bounded mapping with LRU eviction and per-entry expiry.
+    Keeps hit/miss/eviction counters for diagnostics.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_s: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Reentrant so subclasses can compose get/set/delete under one lock.
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._discard(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        ttl = self.ttl_s if ttl_s is None else float(ttl_s)
+        if ttl <= 0:
+            return
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                evicted, _ = self._data.popitem(last=False)
+                self._discard(evicted)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._discard(key)
+
+    def _discard(self, key: Hashable) -> None:
+        """Hook for subclasses: `key` left the cache (called with the lock held)."""
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class TowerCache(LruTtlCache):
+    """`LruTtlCache` of towers by identity key that can evict every key holding a given tower."""
+
+    def __init__(self, *, max_entries: int, ttl_s: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(max_entries=max_entries, ttl_s=ttl_s, clock=clock)
+        self._pk_of: Dict[Hashable, int] = {}
+        self._keys_by_pk: Dict[int, set] = {}
+
+    def set(self, key: Hashable, value: Any, ttl_s: Optional[float] = None) -> None:
+        with self._lock:
+            self._discard(key)
+            super().set(key, value, ttl_s)
+            pk = getattr(value, "pk", None)
+            if pk is not None and key in self._data:
+                self._pk_of[key] = int(pk)
+                self._keys_by_pk.setdefault(int(pk), set()).add(key)
+
+    def evict_towers(self, pks: Iterable[Any]) -> int:
+        """Drop every entry holding one of the towers `pks` (under any key); returns how many."""
+        with self._lock:
+            keys: set = set()
+            for pk in pks:
+                keys |= self._keys_by_pk.get(int(pk), set())
+            for key in keys:
+                self.delete(key)
+        return len(keys)
+
+    def _discard(self, key: Hashable) -> None:
+        pk = self._pk_of.pop(key, None)
+        if pk is not None:
+            keys = self._keys_by_pk.get(pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_pk[pk]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pk_of.clear()
+            self._keys_by_pk.clear()
+            super().clear()
+
+
+_shared_lock = threading.Lock()
+_tower_cache: Any = MISSING
+_negative_cache: Any = MISSING
+
+
+def _cache_config(name: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    return {**defaults, **(getattr(settings, name, None) or {})}
+
+
+def get_shared_tower_cache() -> Optional[TowerCache]:
+    """Worker-wide cache of LOCAL_DB hits, or None when `TOWER_CACHE["ENABLED"]` is off."""
+    global _tower_cache
+    if _tower_cache is MISSING:
+        with _shared_lock:
+            if _tower_cache is MISSING:
+                cfg = _cache_config("TOWER_CACHE", DEFAULT_TOWER_CACHE)
+                _tower_cache = (
+                    TowerCache(max_entries=cfg["MAX_ENTRIES"], ttl_s=cfg["TTL_S"]) if cfg.get("ENABLED") else None
+                )
+    return _tower_cache
+
+
+class NegativeLookupCache:
+    """Remembers external lookup failures per tower identity with an outcome-specific TTL."""
+
+    def __init__(self, *, max_entries: int, ttl_by_outcome: Dict[str, float]):
+        self.ttl_by_outcome = {str(k).upper(): float(v) for k, v in ttl_by_outcome.items()}
+        self._cache = LruTtlCache(max_entries=max_entries, ttl_s=max(self.ttl_by_outcome.values(), default=0.0))
+
+    def ttl_for(self, outcome: str) -> float:
+        return self.ttl_by_outcome.get(str(outcome).upper(), 0.0)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Cached failure outcome for `key`, or None."""
+        outcome = self._cache.get(key)
+        return None if outcome is MISSING else outcome
+
+    def record(self, key: Hashable, outcomes: Iterable[str]) -> Optional[str]:
+        """
+        Record a failed lookup. With several providers failing differently, the outcome
+        with the shortest TTL wins so transient errors are retried soonest.
+        """
+        known = [o for o in outcomes if self.ttl_for(o) > 0]
+        if not known:
+            return None
+        outcome = min(known, key=self.ttl_for)
+        self._cache.set(key, outcome, ttl_s=self.ttl_for(outcome))
+        return outcome
+
+    def delete(self, key: Hashable) -> None:
+        self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "ttl_s": dict(self.ttl_by_outcome)}
+
+
+def get_negative_lookup_cache() -> Optional[NegativeLookupCache]:
+    """Worker-wide cache of failed external lookups, or None when disabled."""
+    global _negative_cache
+    if _negative_cache is MISSING:
+        with _shared_lock:
+            if _negative_cache is MISSING:
+                cfg = _cache_config("TOWER_NEGATIVE_CACHE", DEFAULT_NEGATIVE_CACHE)
+                ttl = {**DEFAULT_NEGATIVE_CACHE["TTL_S"], **(cfg.get("TTL_S") or {})}
+                _negative_cache = (
+                    NegativeLookupCache(max_entries=cfg["MAX_ENTRIES"], ttl_by_outcome=ttl) if cfg.get("ENABLED") else None
+                )
+    return _negative_cache
+
+
+def reset_shared_caches() -> None:
+    """Drop the shared caches so they are rebuilt from current settings on next use."""
+    global _tower_cache, _negative_cache
+    with _shared_lock:
+        _tower_cache = MISSING
+        _negative_cache = MISSING
+
+
+def evict_towers(pks: Iterable[Any] = (), keys: Iterable[Hashable] = ()) -> None:
+    """
+    Forget changed towers: shared-cache entries holding any of `pks`, plus the
+    identity `keys` in both the shared and the negative cache (a tower saved under
+    a key is no longer a failed lookup). No-op for caches not built yet.
+    """
+    keys = list(keys)
+    tower_cache = _tower_cache
+    if tower_cache is not MISSING and tower_cache is not None:
+        tower_cache.evict_towers(pks)
+        for key in keys:
+            tower_cache.delete(key)
+    negative_cache = _negative_cache
+    if negative_cache is not MISSING and negative_cache is not None:
+        for key in keys:
+            negative_cache.delete(key)
+
+
+def evict_all_towers() -> None:
+    """Empty the shared tower cache (no-op if it is not built yet), e.g. after a full index reload."""
+    tower_cache = _tower_cache
+    if tower_cache is not MISSING and tower_cache is not None:
+        tower_cache.clear()
+
+
+@receiver(post_save, sender="cellular.CellTower")
+@receiver(post_delete, sender="cellular.CellTower")
+def _evict_on_tower_change(*, instance: Any, **kwargs: Any) -> None:
+    evict_towers(
+        [instance.pk] if instance.pk is not None else [],
+        [(instance.mcc, instance.mnc, instance.cell_id, instance.lac)],
+    )
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    if setting in ("TOWER_CACHE", "TOWER_NEGATIVE_CACHE"):
+        reset_shared_caches()
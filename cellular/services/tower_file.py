@@ -0,0 +1,255 @@
+"""
+Memory-mapped tower file: one read-only copy of the tower table shared by every
+worker process through the OS page cache, and usable without a database.
+
+Layout (little-endian):
+
+    header (64 B)   magic "CTOWERS\\0", format version, record size, record count,
+                    data version (newest updated_at, ms), created_at, offsets
+    records         fixed-width RECORD_DTYPE rows sorted by (key, lac, pk) where
+                    key = packed (mcc, mnc, cell_id); all LACs of a cell are adjacent
+    signature keys  uint64 packed (mcc, mnc, pci), sorted
+    signature rows  uint32 record numbers in the same order, newest first per key
+
+Exact lookups binary-search `key` (the no-LAC fallback is the same contiguous run);
+signature lookups binary-search the signature keys. Arrays are zero-copy
+`np.frombuffer` views of the mapping.
+
+`export_tower_file()` writes to a temp file next to the target and `os.replace`s it,
+so readers see either the old or the new file, never a partial one. `TowerFile.refresh()`
+notices the replaced inode and remaps; `TOWER_INDEX["BACKEND"] = "mmap"` makes it the
+worker index (see `tower_index.warm_tower_index`).
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from cellular.models import CellTower
+from cellular.services.locate_cache import invalidate_all_locate_results
+from cellular.services.tower_index import NULL, IndexedTower, indexed_tower, load_tower_columns, select_signature_row
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CTOWERS\0"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sHHIQQdQQ")
+HEADER_SIZE = 64
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("key", "<u8"),
+        ("pk", "<i8"),
+        ("cell_id", "<i8"),
+        ("lac", "<i8"),
+        ("lat", "<f8"),
+        ("lon", "<f8"),
+        ("updated_at", "<f8"),
+        ("mcc", "<u2"),
+        ("mnc", "<u2"),
+        ("pci", "<i4"),
+        ("earfcn", "<i4"),
+        ("range_m", "<i4"),
+        ("ref_loss_db", "<f4"),
+        ("path_loss_n", "<f4"),
+        ("tx_power", "<i2"),
+        ("antenna_azimuth", "<i2"),
+    ]
+)
+
+
+def _pack_keys(mcc: np.ndarray, mnc: np.ndarray, cell_id: np.ndarray) -> np.ndarray:
+    # Same packing as the in-memory index: (mcc * 1000 + mnc) << 40 | cell_id.
+    return ((mcc.astype(np.uint64) * np.uint64(1000) + mnc.astype(np.uint64)) << np.uint64(40)) | cell_id.astype(np.uint64)
+
+
+def _pack_signature(mcc: Any, mnc: Any, pci: Any) -> Any:
+    return ((np.uint64(mcc) * np.uint64(1000) + np.uint64(mnc)) << np.uint64(16)) | np.uint64(pci)
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def export_tower_file(path: str, qs=None) -> Dict[str, Any]:
+    """Write the tower table (or `qs`) to `path` atomically; returns header info."""
+    cols = load_tower_columns(qs if qs is not None else CellTower.objects.all())
+    count = len(cols["pk"])
+
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    for name in RECORD_DTYPE.names:
+        if name != "key":
+            records[name] = cols[name]
+    records["key"] = _pack_keys(cols["mcc"], cols["mnc"], cols["cell_id"])
+    records = records[np.lexsort((records["pk"], records["lac"], records["key"]))]
+
+    has_pci = np.flatnonzero(records["pci"] != NULL)
+    sig_keys = _pack_signature(records["mcc"][has_pci], records["mnc"][has_pci], records["pci"][has_pci].astype(np.uint64))
+    order = np.lexsort((-records["updated_at"][has_pci], sig_keys))
+    sig_keys = sig_keys[order].astype("<u8")
+    sig_rows = has_pci[order].astype("<u4")
+
+    records_offset = HEADER_SIZE
+    sig_keys_offset = _align8(records_offset + records.nbytes)
+    sig_rows_offset = sig_keys_offset + sig_keys.nbytes
+    data_version = int(records["updated_at"].max() * 1000) if count else 0
+    created_at = time.time()
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, RECORD_DTYPE.itemsize, count, data_version, created_at, sig_keys_offset, len(sig_keys)
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".towers-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header.ljust(HEADER_SIZE, b"\0"))
+            fh.write(records.tobytes())
+            fh.write(b"\0" * (sig_keys_offset - records_offset - records.nbytes))
+            fh.write(sig_keys.tobytes())
+            fh.write(sig_rows.tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return {
+        "path": path,
+        "towers": count,
+        "signatures": len(sig_keys),
+        "bytes": sig_rows_offset + sig_rows.nbytes,
+        "data_version": data_version,
+    }
+
+
+class _Mapping:
+    """One open, validated tower file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            stat = os.fstat(fh.fileno())
+            self.identity: Tuple[int, int] = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _reserved, record_size, count, data_version, created_at, sig_offset, sig_count = _HEADER.unpack_from(
+            self._mmap, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a tower file")
+        if version != FORMAT_VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} has tower file format {version} (record size {record_size}); expected {FORMAT_VERSION}")
+        self.count = count
+        self.data_version = data_version
+        self.created_at = created_at
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+        self.sig_keys = np.frombuffer(self._mmap, dtype="<u8", count=sig_count, offset=sig_offset)
+        self.sig_rows = np.frombuffer(self._mmap, dtype="<u4", count=sig_count, offset=sig_offset + 8 * sig_count)
+
+
+class TowerFile:
+    """Read-only lookups over a memory-mapped tower file; same interface as `TowerIndex`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map: Optional[_Mapping] = None
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return self._map.count if self._map is not None else 0
+
+    def load(self) -> "TowerFile":
+        mapping = _Mapping(self.path)
+        with self._lock:
+            # The previous mapping is released once no lookup references its arrays.
+            self._map = mapping
+            self.loaded_at = self.refreshed_at = time.time()
+        logger.info("Tower file %s mapped: %d towers, data version %d", self.path, mapping.count, mapping.data_version)
+        return self
+
+    def refresh(self) -> int:
+        """Remap if the file was replaced since it was mapped; returns the new tower count or 0."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        self.refreshed_at = time.time()
+        if self._map is not None and (stat.st_ino, stat.st_mtime_ns) == self._map.identity:
+            return 0
+        count = len(self.load())
+        # Any tower may have changed or gone: results and cached towers are stale.
+        invalidate_all_locate_results()
+        return count
+
+    def exact(self, mcc: int, mnc: int, cell_id: int, lac: Optional[int]) -> Optional[IndexedTower]:
+        mapping = self._map
+        if mapping is None:
+            return None
+        key = _pack_keys(np.array([mcc]), np.array([mnc]), np.array([cell_id]))[0]
+        keys = mapping.records["key"]
+        lo = int(np.searchsorted(keys, key, side="left"))
+        hi = int(np.searchsorted(keys, key, side="right"))
+        if lo == hi:
+            return None
+        row = lo if hi - lo == 1 else None
+        if row is None:
+            # Several LACs for this cell: the matching one, else the first by pk (like the DB path).
+            run = mapping.records[lo:hi]
+            if lac is not None:
+                matches = np.flatnonzero(run["lac"] == int(lac))
+                if len(matches):
+                    row = lo + int(matches[0])
+            if row is None:
+                row = lo + int(np.argmin(run["pk"]))
+        return indexed_tower(mapping.records, row)
+
+    def signature(
+        self,
+        mcc: int,
+        mnc: int,
+        pci: int,
+        earfcn: Optional[int],
+        lac: Optional[int],
+        *,
+        reference_lat: Optional[float] = None,
+        reference_lon: Optional[float] = None,
+    ) -> Optional[IndexedTower]:
+        mapping = self._map
+        if mapping is None:
+            return None
+        key = _pack_signature(mcc, mnc, pci)
+        lo = int(np.searchsorted(mapping.sig_keys, key, side="left"))
+        hi = int(np.searchsorted(mapping.sig_keys, key, side="right"))
+        if lo == hi:
+            return None
+        row = select_signature_row(
+            mapping.records,
+            mapping.sig_rows[lo:hi].astype(np.int64),
+            earfcn=earfcn,
+            lac=lac,
+            reference_lat=reference_lat,
+            reference_lon=reference_lon,
+        )
+        return indexed_tower(mapping.records, row) if row is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        mapping = self._map
+        return {
+            "backend": "mmap",
+            "path": self.path,
+            "towers": len(self),
+            "data_version": mapping.data_version if mapping is not None else None,
+            "created_at": mapping.created_at if mapping is not None else None,
+            "loaded_at": self.loaded_at,
+            "refreshed_at": self.refreshed_at,
+        }
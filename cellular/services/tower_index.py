@@ -0,0 +1,521 @@
+"""
+Worker-resident columnar index of `CellTower` for DB-free local resolution.
+
+The table is held as NumPy columns (one array per field, row i = one tower) plus
+two hash maps:
+
+- `_by_cell`: packed (mcc, mnc, cell_id) -> first row by pk; cells present with
+  several LACs also get a {lac: row} entry in `_by_cell_lac`;
+- `_by_signature`: (mcc, mnc, pci) -> int32 array of rows, newest first.
+
+`TowerResolver` answers exact and PCI-signature lookups from it and returns
+`IndexedTower` records (plain slotted objects, no ORM hydration). External
+lookups and upserts still go to the DB.
+
+Loading/refresh:
+- `warm_tower_index()` loads it at worker start (towercell/wsgi.py, asgi.py);
+- a daemon thread re-reads rows with `updated_at >= last seen - REFRESH_OVERLAP_S`
+  every `REFRESH_INTERVAL_S` and patches the ones it does not hold yet in place
+  (new pks are appended);
+- deletions cannot be seen through `updated_at`, so the whole index is rebuilt
+  every `FULL_RELOAD_S`.
+
+With `BACKEND = "mmap"` the worker maps the exported tower file instead
+(cellular/services/tower_file.py), so all workers share one page-cache copy and
+"refresh" means remapping once the file has been replaced.
+
+Memory budget (64-bit CPython, NumPy 2):
+- columns: 8 (pk) + 4 mcc + 4 mnc + 8 lac + 8 cell_id + 4 pci + 4 earfcn + 8 lat +
+  8 lon + 2 tx_power + 2 azimuth + 4 range_m + 4 ref_loss_db + 4 path_loss_n +
+  8 updated_at = 80 B/tower;
+- `_by_cell`: ~95 B/tower (dict slot + packed int key + row int);
+- `_by_signature`: ~4 B/tower (row ids) plus a few KB per (mcc, mnc, pci) bucket.
+That is ~180 B/tower (tracemalloc on 20k synthetic rows: 176 B before the two
+path-loss columns), i.e. ~90 MB for 500k towers and ~180 MB for 1M, per worker. A hydrated `CellTower` instance measured
+the same way costs 430 B even with every value shared between rows, and more in
+practice (distinct datetimes/floats per row), so the index is 2.5-4x smaller than
+caching model instances. The full Iran dataset (openCellIdIranDatabase.csv.gz,
+90,797 towers) therefore needs ~17 MB per worker; even a 10x larger table stays
+under 200 MB.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from cellular.models import CellTower
+from cellular.services.locate_cache import invalidate_all_locate_results, invalidate_locate_results
+from cellular.utils.geometry import LocalProjector
+
+if TYPE_CHECKING:
+    from cellular.services.tower_file import TowerFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOWER_INDEX = {
+    "ENABLED": False,
+    # "memory" (columns loaded from the DB) or "mmap" (shared exported tower file).
+    "BACKEND": "memory",
+    "PATH": "",
+    "REFRESH_INTERVAL_S": 60.0,
+    "FULL_RELOAD_S": 3600.0,
+    # How far before the watermark each refresh re-reads, for saves that committed late.
+    "REFRESH_OVERLAP_S": 5.0,
+}
+
+NULL = -1
+_LOAD_CHUNK = 20000
+
+_FIELDS = (
+    "pk", "mcc", "mnc", "lac", "cell_id", "pci", "earfcn",
+    "lat", "lon", "tx_power", "antenna_azimuth", "range_m", "ref_loss_db", "path_loss_n", "updated_at",
+)
+# (array typecode, numpy dtype) per column; nullable integer columns use NULL, nullable floats NaN.
+_COLUMNS = {
+    "pk": ("q", np.int64),
+    "mcc": ("i", np.int32),
+    "mnc": ("i", np.int32),
+    "lac": ("q", np.int64),
+    "cell_id": ("q", np.int64),
+    "pci": ("i", np.int32),
+    "earfcn": ("i", np.int32),
+    "lat": ("d", np.float64),
+    "lon": ("d", np.float64),
+    "tx_power": ("h", np.int16),
+    "antenna_azimuth": ("h", np.int16),
+    "range_m": ("i", np.int32),
+    "ref_loss_db": ("f", np.float32),
+    "path_loss_n": ("f", np.float32),
+    "updated_at": ("d", np.float64),
+}
+
+
+def tower_index_config() -> Dict[str, Any]:
+    return {**DEFAULT_TOWER_INDEX, **(getattr(settings, "TOWER_INDEX", None) or {})}
+
+
+def _pack_cell(mcc: int, mnc: int, cell_id: int) -> int:
+    # mcc/mnc < 1000, cell_id < 2**40 (NR cell identities are 36 bits): fits in 60 bits.
+    return ((mcc * 1000 + mnc) << 40) | cell_id
+
+
+def _nullable(value: Any) -> int:
+    return NULL if value is None else int(value)
+
+
+def _nullable_float(value: Any) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    # USE_TZ is on, so values are aware and convert unambiguously.
+    return value.timestamp() if value is not None else 0.0
+
+
+def load_tower_columns(qs) -> Dict[str, np.ndarray]:
+    """Stream `qs` (pk order) into one NumPy array per indexed field, without model instances."""
+    buffers = {name: array(code) for name, (code, _) in _COLUMNS.items()}
+    appenders = [buffers[name].append for name in _FIELDS]
+    for row in qs.order_by("pk").values_list(*_FIELDS).iterator(chunk_size=_LOAD_CHUNK):
+        if row[4] is None:  # no cell_id: not addressable
+            continue
+        pk, mcc, mnc, lac, cell_id, pci, earfcn, lat, lon, tx_power, azimuth, range_m, ref_loss, n, updated_at = row
+        values = (
+            pk, mcc, mnc, _nullable(lac), cell_id, _nullable(pci), _nullable(earfcn), lat, lon,
+            tx_power if tx_power is not None else 0, _nullable(azimuth), _nullable(range_m),
+            _nullable_float(ref_loss), _nullable_float(n), _timestamp(updated_at),
+        )
+        for append, value in zip(appenders, values):
+            append(value)
+    return {name: np.frombuffer(buffers[name], dtype=_COLUMNS[name][1]).copy() for name in _FIELDS}
+
+
+@dataclass(frozen=True, slots=True)
+class IndexedTower:
+    """Read-only tower record served from the index; mirrors the `CellTower` fields the locator uses."""
+
+    pk: int
+    mcc: int
+    mnc: int
+    lac: Optional[int]
+    cell_id: int
+    pci: Optional[int]
+    earfcn: Optional[int]
+    lat: float
+    lon: float
+    tx_power: int
+    antenna_azimuth: Optional[int]
+    range_m: Optional[int]
+    ref_loss_db: Optional[float]
+    path_loss_n: Optional[float]
+
+    @property
+    def id(self) -> int:
+        return self.pk
+
+
+def indexed_tower(cols: Any, row: int) -> IndexedTower:
+    """Build the record for `row` from per-field arrays (a dict of columns or a structured array)."""
+
+    def opt(name: str) -> Optional[int]:
+        value = int(cols[name][row])
+        return None if value == NULL else value
+
+    def opt_float(name: str) -> Optional[float]:
+        value = float(cols[name][row])
+        return None if math.isnan(value) else round(value, 4)
+
+    return IndexedTower(
+        pk=int(cols["pk"][row]),
+        mcc=int(cols["mcc"][row]),
+        mnc=int(cols["mnc"][row]),
+        lac=opt("lac"),
+        cell_id=int(cols["cell_id"][row]),
+        pci=opt("pci"),
+        earfcn=opt("earfcn"),
+        lat=float(cols["lat"][row]),
+        lon=float(cols["lon"][row]),
+        tx_power=int(cols["tx_power"][row]),
+        antenna_azimuth=opt("antenna_azimuth"),
+        range_m=opt("range_m"),
+        ref_loss_db=opt_float("ref_loss_db"),
+        path_loss_n=opt_float("path_loss_n"),
+    )
+
+
+def select_signature_row(
+    cols: Any,
+    members: np.ndarray,
+    *,
+    earfcn: Optional[int],
+    lac: Optional[int],
+    reference_lat: Optional[float],
+    reference_lon: Optional[float],
+) -> Optional[int]:
+    """
+    Pick among signature candidates (`members`, newest first): filter on EARFCN/LAC
+    when given, then the newest one, or the closest one to the reference point.
+    """
+    if earfcn is not None:
+        members = members[cols["earfcn"][members] == earfcn]
+    if lac is not None:
+        members = members[cols["lac"][members] == lac]
+    if not len(members):
+        return None
+    if reference_lat is None or reference_lon is None:
+        return int(members[0])
+    # Equirectangular distance is enough to rank candidates around one point.
+    dx, dy = LocalProjector(reference_lat, reference_lon).project(cols["lat"][members], cols["lon"][members])
+    return int(members[int(np.argmin(dx * dx + dy * dy))])
+
+
+class TowerIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cols: Dict[str, np.ndarray] = {name: np.empty(0, dtype=dtype) for name, (_, dtype) in _COLUMNS.items()}
+        self._by_cell: Dict[int, int] = {}
+        self._by_cell_lac: Dict[int, Dict[int, int]] = {}
+        self._by_signature: Dict[Tuple[int, int, int], np.ndarray] = {}
+        self.last_updated_at = 0.0
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._cols["pk"])
+
+    # --- loading -------------------------------------------------------------
+
+    def load(self) -> "TowerIndex":
+        """Full (re)load from the DB; replaces the current contents atomically."""
+        started = time.monotonic()
+        cols = load_tower_columns(CellTower.objects.all())
+        by_cell, by_cell_lac = self._build_cell_maps(cols, range(len(cols["pk"])))
+        by_signature = self._build_signature_map(cols)
+        with self._lock:
+            self._cols, self._by_cell, self._by_cell_lac, self._by_signature = cols, by_cell, by_cell_lac, by_signature
+            self.last_updated_at = float(cols["updated_at"].max()) if len(cols["pk"]) else 0.0
+            self.loaded_at = self.refreshed_at = time.time()
+        logger.info("Tower index loaded: %d towers in %.1fs", len(self), time.monotonic() - started)
+        return self
+
+    @staticmethod
+    def _build_cell_maps(cols: Dict[str, np.ndarray], rows: Iterable[int]) -> Tuple[Dict[int, int], Dict[int, Dict[int, int]]]:
+        by_cell: Dict[int, int] = {}
+        by_cell_lac: Dict[int, Dict[int, int]] = {}
+        mcc, mnc, cell_id, lac = (cols[name].tolist() for name in ("mcc", "mnc", "cell_id", "lac"))
+        for row in rows:
+            key = _pack_cell(mcc[row], mnc[row], cell_id[row])
+            first = by_cell.setdefault(key, row)
+            if first != row:
+                lacs = by_cell_lac.setdefault(key, {lac[first]: first})
+                lacs.setdefault(lac[row], row)
+        return by_cell, by_cell_lac
+
+    @staticmethod
+    def _build_signature_map(cols: Dict[str, np.ndarray]) -> Dict[Tuple[int, int, int], np.ndarray]:
+        has_pci = np.flatnonzero(cols["pci"] != NULL)
+        if not len(has_pci):
+            return {}
+        # Group rows by (mcc, mnc, pci), newest first inside each group.
+        order = has_pci[np.lexsort((-cols["updated_at"][has_pci], cols["pci"][has_pci], cols["mnc"][has_pci], cols["mcc"][has_pci]))]
+        keys = np.stack([cols["mcc"][order], cols["mnc"][order], cols["pci"][order]], axis=1)
+        starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        return {
+            tuple(int(v) for v in keys[group[0]]): order[group].astype(np.int32)
+            for group in np.split(np.arange(len(order)), starts)
+        }
+
+    def refresh(self) -> int:
+        """
+        Apply rows changed since the last load/refresh; returns how many were applied.
+
+        The watermark is the newest `updated_at` among the rows already read. Writers
+        stamp `updated_at` before they commit, so a save can become visible after a
+        newer one; the query therefore reaches `REFRESH_OVERLAP_S` further back, and
+        re-read rows the index already holds in that version are dropped by id.
+        """
+        qs = CellTower.objects.all()
+        if self.last_updated_at:
+            overlap_s = max(0.0, float(tower_index_config()["REFRESH_OVERLAP_S"]))
+            qs = qs.filter(updated_at__gte=datetime.fromtimestamp(self.last_updated_at - overlap_s, tz=dt_timezone.utc))
+        changed = load_tower_columns(qs)
+        with self._lock:
+            changed = self._drop_seen(changed)
+            count = len(changed["pk"])
+            if count:
+                self._apply(changed)
+        if count:
+            # Picks up tower changes made by other processes, too.
+            invalidate_locate_results(changed["pk"].tolist())
+        self.refreshed_at = time.time()
+        return count
+
+    def _drop_seen(self, changed: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """`changed` without the rows the index already holds with the same `updated_at`."""
+        pk = self._cols["pk"]
+        if not len(pk):
+            return changed
+        positions = np.minimum(np.searchsorted(pk, changed["pk"]), len(pk) - 1)
+        seen = (pk[positions] == changed["pk"]) & (self._cols["updated_at"][positions] == changed["updated_at"])
+        return {name: values[~seen] for name, values in changed.items()} if seen.any() else changed
+
+    def _apply(self, changed: Dict[str, np.ndarray]) -> None:
+        cols = self._cols
+        positions = np.searchsorted(cols["pk"], changed["pk"])
+        in_range = positions < len(cols["pk"])
+        existing = np.zeros(len(positions), dtype=bool)
+        existing[in_range] = cols["pk"][positions[in_range]] == changed["pk"][in_range]
+
+        # Rows whose identity changed must leave their old map entries.
+        touched_rows = positions[existing]
+        if len(touched_rows):
+            self._forget_rows(touched_rows.tolist())
+            for name in _FIELDS:
+                cols[name][touched_rows] = changed[name][existing]
+
+        new_mask = ~existing
+        new_rows: List[int] = []
+        if new_mask.any():
+            start = len(cols["pk"])
+            merged = {name: np.concatenate([cols[name], changed[name][new_mask]]) for name in _FIELDS}
+            order = np.argsort(merged["pk"], kind="stable")
+            if np.any(order != np.arange(len(order))):
+                # pks arrived out of order (e.g. explicit ids): rebuild rather than patch.
+                self._cols = {name: merged[name][order] for name in _FIELDS}
+                self._by_cell, self._by_cell_lac = self._build_cell_maps(self._cols, range(len(order)))
+                self._by_signature = self._build_signature_map(self._cols)
+                self.last_updated_at = max(self.last_updated_at, float(changed["updated_at"].max()))
+                return
+            self._cols = cols = merged
+            new_rows = list(range(start, len(cols["pk"])))
+
+        self._remember_rows(touched_rows.tolist() + new_rows)
+        self.last_updated_at = max(self.last_updated_at, float(changed["updated_at"].max()))
+
+    def _forget_rows(self, rows: List[int]) -> None:
+        """Drop map entries of `rows`; must run before their columns are overwritten."""
+        cols = self._cols
+        pk = cols["pk"]
+        rows_set = set(rows)
+        signature_keys = set()
+        for row in rows:
+            key = _pack_cell(int(cols["mcc"][row]), int(cols["mnc"][row]), int(cols["cell_id"][row]))
+            lacs = self._by_cell_lac.get(key)
+            if lacs is not None:
+                for lac, member in list(lacs.items()):
+                    if member in rows_set:
+                        del lacs[lac]
+                if len(lacs) <= 1:
+                    del self._by_cell_lac[key]
+            if self._by_cell.get(key) in rows_set:
+                others = [r for r in (lacs or {}).values() if r not in rows_set]
+                if others:
+                    self._by_cell[key] = min(others, key=lambda r: pk[r])
+                else:
+                    del self._by_cell[key]
+            if cols["pci"][row] != NULL:
+                signature_keys.add((int(cols["mcc"][row]), int(cols["mnc"][row]), int(cols["pci"][row])))
+        for key in signature_keys:
+            members = self._by_signature.get(key)
+            if members is None:
+                continue
+            kept = members[~np.isin(members, rows)]
+            if len(kept):
+                self._by_signature[key] = kept
+            else:
+                del self._by_signature[key]
+
+    def _remember_rows(self, rows: List[int]) -> None:
+        cols = self._cols
+        pk = cols["pk"]
+        for row in rows:
+            key = _pack_cell(int(cols["mcc"][row]), int(cols["mnc"][row]), int(cols["cell_id"][row]))
+            lac = int(cols["lac"][row])
+            first = self._by_cell.get(key)
+            if first is None:
+                self._by_cell[key] = row
+                continue
+            lacs = self._by_cell_lac.setdefault(key, {int(cols["lac"][first]): first})
+            if lac not in lacs or pk[row] < pk[lacs[lac]]:
+                lacs[lac] = row
+            if pk[row] < pk[first]:
+                self._by_cell[key] = row
+            if len(lacs) <= 1:
+                del self._by_cell_lac[key]
+
+        for row in rows:
+            pci = int(cols["pci"][row])
+            if pci == NULL:
+                continue
+            key3 = (int(cols["mcc"][row]), int(cols["mnc"][row]), pci)
+            members = np.append(self._by_signature.get(key3, np.empty(0, dtype=np.int32)), np.int32(row))
+            self._by_signature[key3] = members[np.argsort(-cols["updated_at"][members], kind="stable")]
+
+    # --- lookups -------------------------------------------------------------
+
+    def exact(self, mcc: int, mnc: int, cell_id: int, lac: Optional[int]) -> Optional[IndexedTower]:
+        """Same rule as the DB lookup: the (cell, lac) row if present, else the cell's first row by pk."""
+        with self._lock:
+            key = _pack_cell(mcc, mnc, cell_id)
+            row = self._by_cell.get(key)
+            if row is None:
+                return None
+            if lac is not None:
+                row = (self._by_cell_lac.get(key) or {}).get(int(lac), row)
+            return indexed_tower(self._cols, row)
+
+    def signature(
+        self,
+        mcc: int,
+        mnc: int,
+        pci: int,
+        earfcn: Optional[int],
+        lac: Optional[int],
+        *,
+        reference_lat: Optional[float] = None,
+        reference_lon: Optional[float] = None,
+    ) -> Optional[IndexedTower]:
+        """Newest matching tower, or the closest one to the reference point when given."""
+        with self._lock:
+            members = self._by_signature.get((mcc, mnc, pci))
+            if members is None:
+                return None
+            row = select_signature_row(
+                self._cols, members, earfcn=earfcn, lac=lac, reference_lat=reference_lat, reference_lon=reference_lon
+            )
+            return indexed_tower(self._cols, row) if row is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "towers": len(self),
+                "column_bytes": int(sum(col.nbytes for col in self._cols.values())),
+                "signature_buckets": len(self._by_signature),
+                "multi_lac_cells": len(self._by_cell_lac),
+                "last_updated_at": self.last_updated_at,
+                "loaded_at": self.loaded_at,
+                "refreshed_at": self.refreshed_at,
+            }
+
+
+_index: Optional[TowerIndex] = None
+_index_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+
+
+def get_tower_index() -> Optional["TowerIndex | TowerFile"]:
+    """The loaded worker index, or None when disabled or not warmed yet."""
+    return _index
+
+
+def warm_tower_index(*, start_refresher: bool = True) -> Optional["TowerIndex | TowerFile"]:
+    """
+    Load the index if `TOWER_INDEX["ENABLED"]`; call once per worker at startup.
+    BACKEND "memory" loads the table from the DB, "mmap" maps the exported tower file at PATH.
+    """
+    global _index, _refresher
+    cfg = tower_index_config()
+    if not cfg.get("ENABLED"):
+        return None
+    with _index_lock:
+        if _index is None:
+            try:
+                if cfg["BACKEND"] == "mmap":
+                    from cellular.services.tower_file import TowerFile
+
+                    _index = TowerFile(cfg["PATH"]).load()
+                else:
+                    _index = TowerIndex().load()
+            except Exception as exc:
+                logger.exception("Tower index load failed; resolving from the DB: %s", exc)
+                return None
+        if start_refresher and _refresher is None and float(cfg["REFRESH_INTERVAL_S"]) > 0:
+            _refresher = threading.Thread(target=_refresh_loop, args=(_index,), name="tower-index", daemon=True)
+            _refresher.start()
+    return _index
+
+
+def _refresh_loop(index: "TowerIndex | TowerFile") -> None:
+    while _index is index:
+        cfg = tower_index_config()
+        time.sleep(float(cfg["REFRESH_INTERVAL_S"]))
+        if _index is not index:
+            break
+        close_old_connections()
+        try:
+            if time.time() - index.loaded_at >= float(cfg["FULL_RELOAD_S"]):
+                index.load()
+                # Also the only way deleted towers leave the index: forget everything cached.
+                invalidate_all_locate_results()
+            else:
+                index.refresh()
+        except Exception as exc:
+            logger.exception("Tower index refresh failed: %s", exc)
+        finally:
+            close_old_connections()
+
+
+def reset_tower_index() -> None:
+    global _index, _refresher
+    with _index_lock:
+        _index = None
+        _refresher = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    if setting == "TOWER_INDEX":
+        reset_tower_index()
@@ -1,42 +1,247 @@
 from __future__ import annotations
 
 import logging
+import math
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value, Window
+from django.db.models.functions import RowNumber
 
 from cellular.choices import DatasetSource
 from cellular.models import CellTower, TowerLookupLog
-from cellular.services.providers.base import normalize_radio_type
+from cellular.services.providers.base import LookupOutcome, normalize_radio_type
 from cellular.services.providers.combain import CombainProvider
+from cellular.services.providers.fanout import ProviderAttempt, query_providers, query_providers_many
 from cellular.services.providers.google_geolocation import GoogleGeolocationProvider
+from cellular.services.singleflight import get_single_flight
+from cellular.services.tower_cache import MISSING, get_negative_lookup_cache, get_shared_tower_cache
+from cellular.services.tower_file import TowerFile
+from cellular.services.tower_index import IndexedTower, TowerIndex, get_tower_index
+from cellular.services.write_behind import BUFFERED_FIELDS, get_write_buffer
 from cellular.utils.cleaners import SENTINEL_CI, SENTINEL_INT_MAX, SENTINEL_TAC
-from cellular.utils.geometry import haversine_distance
+from cellular.utils.geometry import haversine_many
 
 logger = logging.getLogger(__name__)
 
 
+ExactKey = Tuple[int, int, int, Optional[int]]
+SignatureKey = Tuple[int, int, int, Optional[int], Optional[int]]
+
+SIGNATURE_CANDIDATE_LIMIT = 200
+METERS_PER_DEGREE_LAT = 111320.0
+
+DEFAULT_SIGNATURE_LOOKUP = {
+    # Rank PCI candidates in the DB; disable for backends without window functions.
+    "SQL_RANKING": True,
+    # Batch lookups first search this radius around the reference point.
+    "BBOX_RADIUS_M": 30000.0,
+}
+
+_SIGNATURE_ROW_FIELDS = ("pk", "mcc", "mnc", "pci", "earfcn", "lac", "lat", "lon")
+# SQL ranking keeps the nearest row of each of these groups.
+_SIGNATURE_GROUP_FIELDS = ("mcc", "mnc", "pci", "earfcn", "lac")
+
+
 def _is_sentinel(value: Any) -> bool:
     return value in (None, SENTINEL_INT_MAX, SENTINEL_TAC, SENTINEL_CI)
 
 
+def _optional_int(value: Any) -> Optional[int]:
+    return None if value is None or _is_sentinel(value) else int(value)
+
+
+def _exact_key(mcc: Any, mnc: Any, cell_id: Any, lac: Any) -> Optional[ExactKey]:
+    """(mcc, mnc, cell_id, lac) identity used for exact DB matches, or None if unusable."""
+    if _is_sentinel(mcc) or _is_sentinel(mnc) or _is_sentinel(cell_id):
+        return None
+    return int(mcc), int(mnc), int(cell_id), _optional_int(lac)
+
+
+def _signature_lookup_config() -> Dict[str, Any]:
+    return {**DEFAULT_SIGNATURE_LOOKUP, **(getattr(settings, "TOWER_SIGNATURE_LOOKUP", None) or {})}
+
+
+def _planar_distance_sq(ref_lat: float, ref_lon: float) -> ExpressionWrapper:
+    """
+    Squared equirectangular distance (in degrees^2 of latitude) from the reference point.
+    Monotonic with true distance over a few hundred km, which is all ranking needs.
+    """
+    lon_scale = math.cos(math.radians(ref_lat))
+    dlat = F("lat") - Value(float(ref_lat))
+    dlon = (F("lon") - Value(float(ref_lon))) * Value(lon_scale)
+    return ExpressionWrapper(dlat * dlat + dlon * dlon, output_field=FloatField())
+
+
+def _exact_condition(keys: Iterable[ExactKey]) -> Q:
+    cell_ids_by_operator: Dict[Tuple[int, int], set] = {}
+    for mcc, mnc, cell_id, _lac in keys:
+        cell_ids_by_operator.setdefault((mcc, mnc), set()).add(cell_id)
+    condition = Q()
+    for (mcc, mnc), cell_ids in cell_ids_by_operator.items():
+        condition |= Q(mcc=mcc, mnc=mnc, cell_id__in=sorted(cell_ids))
+    return condition
+
+
+def _signature_condition(keys: Iterable[SignatureKey]) -> Q:
+    pcis_by_operator: Dict[Tuple[int, int], set] = {}
+    for mcc, mnc, pci, _earfcn, _lac in keys:
+        pcis_by_operator.setdefault((mcc, mnc), set()).add(pci)
+    condition = Q()
+    for (mcc, mnc), pcis in pcis_by_operator.items():
+        condition |= Q(mcc=mcc, mnc=mnc, pci__in=sorted(pcis))
+    return condition
+
+
+def _bucket_signature_rows(rows: Iterable[Tuple[Any, ...]], wanted: set, *, limit: int) -> Dict[SignatureKey, List[Tuple[int, float, float]]]:
+    """Distribute ordered (pk, mcc, mnc, pci, earfcn, lac, lat, lon) rows over the signatures they satisfy."""
+    buckets: Dict[SignatureKey, List[Tuple[int, float, float]]] = {key: [] for key in wanted}
+    for pk, mcc, mnc, pci, earfcn, lac, lat, lon in rows:
+        for key in {
+            (mcc, mnc, pci, None, None),
+            (mcc, mnc, pci, earfcn, None),
+            (mcc, mnc, pci, None, lac),
+            (mcc, mnc, pci, earfcn, lac),
+        }:
+            bucket = buckets.get(key)
+            if bucket is not None and len(bucket) < limit:
+                bucket.append((pk, lat, lon))
+    return buckets
+
+
+def _signature_key(mcc: Any, mnc: Any, pci: Any, earfcn: Any, lac: Any) -> Optional[SignatureKey]:
+    """(mcc, mnc, pci, earfcn, lac) neighbor-style signature, or None if unusable."""
+    if _is_sentinel(mcc) or _is_sentinel(mnc) or _is_sentinel(pci):
+        return None
+    return int(mcc), int(mnc), int(pci), _optional_int(earfcn), _optional_int(lac)
+
+
+def _pending_exact_keys(pending: Dict[Tuple[Any, ...], Dict[str, Any]]) -> Dict[Tuple[Any, ...], Optional[ExactKey]]:
+    return {
+        cache_key: _exact_key(cell.get("mcc"), cell.get("mnc"), cell.get("cell_id"), cell.get("lac"))
+        for cache_key, cell in pending.items()
+    }
+
+
+def _pending_signature_keys(
+    pending: Dict[Tuple[Any, ...], Dict[str, Any]], *, skip: Iterable[Tuple[Any, ...]] = ()
+) -> Dict[Tuple[Any, ...], Optional[SignatureKey]]:
+    skip = set(skip)
+    return {
+        cache_key: _signature_key(cell.get("mcc"), cell.get("mnc"), cell.get("pci"), cell.get("earfcn"), cell.get("lac"))
+        for cache_key, cell in pending.items()
+        if cache_key not in skip
+    }
+
+
+def _lookup_log_fields(attempt: ProviderAttempt, ids: Dict[str, Any]) -> Dict[str, Any]:
+    """`TowerLookupLog` fields for one provider attempt."""
+    lookup = attempt.lookup
+    if lookup is None:
+        return {
+            "provider": attempt.provider_name,
+            "success": False,
+            "error": str(attempt.error) if attempt.error is not None else attempt.outcome,
+            **ids,
+        }
+    return {
+        "provider": attempt.provider_name,
+        "success": True,
+        "lat": float(lookup.lat),
+        "lon": float(lookup.lon),
+        "accuracy_m": float(lookup.accuracy_m) if lookup.accuracy_m is not None else None,
+        "request_url": lookup.request_url,
+        "request_body": lookup.request_body,
+        "response_body": lookup.raw,
+        **ids,
+    }
+
+
+def _new_tower_defaults(attempt: ProviderAttempt, *, radio_type: str, pci: Optional[int], earfcn: Optional[int]) -> Dict[str, Any]:
+    lookup = attempt.lookup
+    accuracy_m = lookup.accuracy_m
+    return {
+        "radio_type": radio_type,
+        "pci": pci,
+        "earfcn": earfcn,
+        "range_m": int(accuracy_m) if accuracy_m is not None else None,
+        "is_approximate": True,
+        "samples": None,
+        "lat": float(lookup.lat),
+        "lon": float(lookup.lon),
+        "tx_power": CellTower._meta.get_field("tx_power").default,
+        "antenna_azimuth": None,
+        "source": getattr(attempt.provider, "dataset_source", DatasetSource.OTHER),
+        "checked_count": 1,
+        "verified_count": 0,
+    }
+
+
+def _merge_lookup(tower: CellTower, attempt: ProviderAttempt) -> List[str]:
+    """Apply a provider fix to an existing tower in memory; returns the fields to save."""
+    lookup = attempt.lookup
+    lat, lon, accuracy_m = float(lookup.lat), float(lookup.lon), lookup.accuracy_m
+    updated = False
+    if tower.source != DatasetSource.MANUAL:
+        if tower.lat != lat or tower.lon != lon:
+            tower.lat = lat
+            tower.lon = lon
+            updated = True
+    if tower.range_m is None and accuracy_m is not None:
+        tower.range_m = int(accuracy_m)
+        updated = True
+    tower.checked_count = (tower.checked_count or 0) + 1
+    if not updated:
+        return ["checked_count", "updated_at"]
+    tower.source = getattr(attempt.provider, "dataset_source", DatasetSource.OTHER)
+    tower.is_approximate = True
+    return ["lat", "lon", "range_m", "source", "is_approximate", "checked_count", "updated_at"]
+
+
+def _buffer_update(tower: CellTower, update_fields: List[str]) -> bool:
+    """Hand a merged tower to the write-behind buffer; False if it must be saved now."""
+    buffer = get_write_buffer()
+    if buffer is None:
+        return False
+    buffer.record(
+        tower.pk,
+        checked=1 if "checked_count" in update_fields else 0,
+        fields={name: getattr(tower, name) for name in update_fields if name in BUFFERED_FIELDS},
+    )
+    return True
+
+
 @dataclass(frozen=True)
 class ResolveResult:
-    tower: Optional[CellTower]
+    # `IndexedTower` when answered from the worker-resident index (TOWER_INDEX).
+    tower: Optional[CellTower | IndexedTower]
     source: str
 
 
 class TowerResolver:
     """
     Resolve a tower from local DB first, optionally falling back to paid providers.
-    Includes a small in-memory cache to avoid repeated queries/calls per request.
+    Includes a small in-memory cache to avoid repeated queries/calls per request, and
+    serves exact LOCAL_DB hits from the worker-wide tower cache across requests.
     """
 
-    def __init__(self, *, reference_lat: float | None = None, reference_lon: float | None = None):
+    def __init__(
+        self,
+        *,
+        reference_lat: float | None = None,
+        reference_lon: float | None = None,
+        index: Optional[TowerIndex | TowerFile] = None,
+    ):
+        """`index` overrides the worker tower index (e.g. a `TowerFile` for offline use)."""
         self.reference_lat = reference_lat
         self.reference_lon = reference_lon
         self._cache: Dict[Tuple[Any, ...], ResolveResult] = {}
+        self._shared_cache = get_shared_tower_cache()
+        self._negative_cache = get_negative_lookup_cache()
+        self._index = index if index is not None else get_tower_index()
         self._providers = []
 
         combain_key = (getattr(settings, "COMBAIN_API_KEY", "") or "").strip()
@@ -59,7 +264,17 @@ class TowerResolver:
         signal_strength: int | None = None,
         allow_external: bool = False,
     ) -> ResolveResult:
-        cache_key = (radio_type, mcc, mnc, cell_id, lac, pci, earfcn, signal_strength, bool(allow_external))
+        cache_key = self._cache_key(
+            radio_type=radio_type,
+            mcc=mcc,
+            mnc=mnc,
+            cell_id=cell_id,
+            lac=lac,
+            pci=pci,
+            earfcn=earfcn,
+            signal_strength=signal_strength,
+            allow_external=allow_external,
+        )
         if cache_key in self._cache:
             return self._cache[cache_key]
 
@@ -77,6 +292,99 @@ class TowerResolver:
         self._cache[cache_key] = result
         return result
 
+    def resolve_many(self, cells: Sequence[Dict[str, Any]]) -> List[ResolveResult]:
+        """
+        Batched variant of `resolve()`; each item holds the same keyword arguments.
+
+        All exact (mcc, mnc, cell_id, lac) keys are matched with one query and all
+        PCI signatures left over with one ranking query (+ one to load the winners),
+        so DB round trips stay flat regardless of cell count. Only cells still missing
+        after that fall through to external providers. Results keep input order.
+        """
+        results, pending, pending_idxs = self._split_cached(cells)
+        if pending:
+            self._merge_resolved(results, pending_idxs, self._resolve_uncached_many(pending))
+        return [r if r is not None else ResolveResult(tower=None, source="NOT_FOUND") for r in results]
+
+    def _split_cached(
+        self, cells: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[Optional[ResolveResult]], Dict[Tuple[Any, ...], Dict[str, Any]], Dict[Tuple[Any, ...], List[int]]]:
+        """Answer what the per-request cache knows; group the rest by cache key."""
+        results: List[Optional[ResolveResult]] = [None] * len(cells)
+        pending: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        pending_idxs: Dict[Tuple[Any, ...], List[int]] = {}
+        for idx, cell in enumerate(cells):
+            cache_key = self._cache_key(**cell)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                results[idx] = cached
+                continue
+            pending.setdefault(cache_key, cell)
+            pending_idxs.setdefault(cache_key, []).append(idx)
+        return results, pending, pending_idxs
+
+    def _merge_resolved(
+        self,
+        results: List[Optional[ResolveResult]],
+        pending_idxs: Dict[Tuple[Any, ...], List[int]],
+        resolved: Dict[Tuple[Any, ...], ResolveResult],
+    ) -> None:
+        for cache_key, result in resolved.items():
+            self._cache[cache_key] = result
+            for idx in pending_idxs[cache_key]:
+                results[idx] = result
+
+    @staticmethod
+    def _cache_key(
+        *,
+        radio_type: str | None = None,
+        mcc: int | None,
+        mnc: int | None,
+        cell_id: int | None,
+        lac: int | None,
+        pci: int | None = None,
+        earfcn: int | None = None,
+        signal_strength: int | None = None,
+        allow_external: bool = False,
+    ) -> Tuple[Any, ...]:
+        return (radio_type, mcc, mnc, cell_id, lac, pci, earfcn, signal_strength, bool(allow_external))
+
+    def _resolve_uncached_many(self, pending: Dict[Tuple[Any, ...], Dict[str, Any]]) -> Dict[Tuple[Any, ...], ResolveResult]:
+        results: Dict[Tuple[Any, ...], ResolveResult] = {}
+
+        # 1) Local DB exact match for every key in one query
+        exact_keys = _pending_exact_keys(pending)
+        exact_hits = self._lookup_local_exact_many(k for k in exact_keys.values() if k is not None)
+        for cache_key, key in exact_keys.items():
+            tower = exact_hits.get(key) if key is not None else None
+            if tower is not None:
+                results[cache_key] = ResolveResult(tower=tower, source="LOCAL_DB")
+
+        # 2) Local DB signature lookup for the leftovers
+        signature_keys = _pending_signature_keys(pending, skip=results)
+        signature_hits = self._lookup_local_signature_many(k for k in signature_keys.values() if k is not None)
+        for cache_key, key in signature_keys.items():
+            tower = signature_hits.get(key) if key is not None else None
+            if tower is not None:
+                results[cache_key] = ResolveResult(tower=tower, source="LOCAL_DB_SIGNATURE")
+
+        # 3) Paid providers for every remaining cell at once, unless recently failed
+        external = {
+            cache_key: cell
+            for cache_key, cell in pending.items()
+            if cache_key not in results
+            and cell.get("allow_external")
+            and not self._recently_failed(
+                mcc=cell.get("mcc"), mnc=cell.get("mnc"), cell_id=cell.get("cell_id"), lac=cell.get("lac")
+            )
+        }
+        if external:
+            results.update(self._lookup_external_many(external))
+
+        for cache_key in pending:
+            results.setdefault(cache_key, ResolveResult(tower=None, source="NOT_FOUND"))
+        return results
+
     def _resolve_uncached(
         self,
         *,
@@ -100,8 +408,8 @@ class TowerResolver:
         if tower is not None:
             return ResolveResult(tower=tower, source="LOCAL_DB_SIGNATURE")
 
-        # 3) Paid providers (Combain/Google) -> upsert into DB
-        if allow_external:
+        # 3) Paid providers (Combain/Google) -> upsert into DB, unless recently failed
+        if allow_external and not self._recently_failed(mcc=mcc, mnc=mnc, cell_id=cell_id, lac=lac):
             external = self._lookup_external_and_upsert(
                 radio_type=radio_type,
                 mcc=mcc,
@@ -117,20 +425,218 @@ class TowerResolver:
 
         return ResolveResult(tower=None, source="NOT_FOUND")
 
+    def _recently_failed(self, *, mcc: Any, mnc: Any, cell_id: Any, lac: Any) -> bool:
+        """True if every provider failed for this cell within its negative-cache TTL."""
+        if self._negative_cache is None:
+            return False
+        key = _exact_key(mcc, mnc, cell_id, lac)
+        return key is not None and self._negative_cache.get(key) is not None
+
     def _lookup_local_exact(self, *, mcc: int | None, mnc: int | None, cell_id: int | None, lac: int | None) -> Optional[CellTower]:
-        if _is_sentinel(mcc) or _is_sentinel(mnc) or _is_sentinel(cell_id):
+        key = _exact_key(mcc, mnc, cell_id, lac)
+        if key is None:
             return None
+        if self._index is not None:
+            return self._index_exact_many([key]).get(key)
+        if self._shared_cache is not None:
+            cached = self._shared_cache.get(key)
+            if cached is not MISSING:
+                return cached
+
+        tower = self._query_local_exact(key)
+        if tower is not None and self._shared_cache is not None:
+            self._shared_cache.set(key, tower)
+        return tower
+
+    def _query_local_exact(self, key: ExactKey) -> Optional[CellTower]:
+        mcc, mnc, cell_id, lac = key
         try:
-            if lac is not None and not _is_sentinel(lac):
+            if lac is not None:
                 try:
-                    return CellTower.objects.get(mcc=int(mcc), mnc=int(mnc), cell_id=int(cell_id), lac=int(lac))
+                    return CellTower.objects.get(mcc=mcc, mnc=mnc, cell_id=cell_id, lac=lac)
                 except CellTower.DoesNotExist:
                     pass
-            return CellTower.objects.filter(mcc=int(mcc), mnc=int(mnc), cell_id=int(cell_id)).first()
+            return CellTower.objects.filter(mcc=mcc, mnc=mnc, cell_id=cell_id).first()
         except Exception as exc:
             logger.exception("Local DB lookup failed: %s", exc)
             return None
 
+    def _lookup_local_exact_many(self, keys: Iterable[ExactKey]) -> Dict[ExactKey, CellTower]:
+        """Match many exact keys with a single query (same precedence as `_lookup_local_exact`)."""
+        if self._index is not None:
+            return self._index_exact_many(keys)
+        found, wanted = self._shared_cache_lookup(keys)
+        if not wanted:
+            return found
+
+        try:
+            towers = list(CellTower.objects.filter(_exact_condition(wanted)).order_by("pk"))
+        except Exception as exc:
+            logger.exception("Local DB batch lookup failed: %s", exc)
+            return found
+
+        found.update(self._match_exact(wanted, towers))
+        return found
+
+    def _index_exact_many(self, keys: Iterable[ExactKey]) -> Dict[ExactKey, CellTower | IndexedTower]:
+        """Answer from the worker index; towers upserted here since its last refresh come from the shared cache."""
+        found: Dict[ExactKey, CellTower | IndexedTower] = {}
+        for key in set(keys):
+            tower = self._index.exact(*key)
+            if tower is None and self._shared_cache is not None:
+                cached = self._shared_cache.get(key)
+                tower = None if cached is MISSING else cached
+            if tower is not None:
+                found[key] = tower
+        return found
+
+    def _index_signature_many(self, keys: Iterable[SignatureKey]) -> Dict[SignatureKey, IndexedTower]:
+        found: Dict[SignatureKey, IndexedTower] = {}
+        for key in set(keys):
+            tower = self._index.signature(*key, reference_lat=self.reference_lat, reference_lon=self.reference_lon)
+            if tower is not None:
+                found[key] = tower
+        return found
+
+    def _shared_cache_lookup(self, keys: Iterable[ExactKey]) -> Tuple[Dict[ExactKey, CellTower], set]:
+        """Split keys into shared-cache hits and keys that still need the DB."""
+        found: Dict[ExactKey, CellTower] = {}
+        wanted = set(keys)
+        if self._shared_cache is not None:
+            for key in list(wanted):
+                cached = self._shared_cache.get(key)
+                if cached is not MISSING:
+                    found[key] = cached
+                    wanted.discard(key)
+        return found, wanted
+
+    def _match_exact(self, wanted: set, towers: Sequence[CellTower]) -> Dict[ExactKey, CellTower]:
+        """Pick the tower for each key from pk-ordered rows and remember hits in the shared cache."""
+        by_key: Dict[ExactKey, CellTower] = {}
+        by_cell: Dict[Tuple[int, int, int], CellTower] = {}
+        for tower in towers:
+            by_key.setdefault((tower.mcc, tower.mnc, tower.cell_id, tower.lac), tower)
+            by_cell.setdefault((tower.mcc, tower.mnc, tower.cell_id), tower)
+
+        found: Dict[ExactKey, CellTower] = {}
+        for key in wanted:
+            mcc, mnc, cell_id, lac = key
+            tower = by_key.get(key) if lac is not None else None
+            if tower is None:
+                tower = by_cell.get((mcc, mnc, cell_id))
+            if tower is not None:
+                found[key] = tower
+                if self._shared_cache is not None:
+                    self._shared_cache.set(key, tower)
+        return found
+
+    def _lookup_local_signature_many(self, keys: Iterable[SignatureKey]) -> Dict[SignatureKey, CellTower]:
+        """
+        Resolve many PCI signatures at once: rank lightweight rows for every signature
+        (in SQL when a reference point is known), then hydrate only the winning towers.
+        """
+        if self._index is not None:
+            return self._index_signature_many(keys)
+        wanted = set(keys)
+        if not wanted:
+            return {}
+
+        try:
+            winners: Dict[SignatureKey, int] = {}
+            if self._has_reference() and _signature_lookup_config()["SQL_RANKING"]:
+                try:
+                    winners = self._rank_signatures_sql(wanted)
+                except DatabaseError as exc:
+                    logger.warning("SQL signature ranking unavailable, falling back to Python: %s", exc)
+                    winners = self._rank_signatures_python(wanted)
+            else:
+                winners = self._rank_signatures_python(wanted)
+
+            towers = CellTower.objects.in_bulk(set(winners.values())) if winners else {}
+        except Exception as exc:
+            logger.exception("Signature batch lookup failed: %s", exc)
+            return {}
+
+        return {key: towers[pk] for key, pk in winners.items() if pk in towers}
+
+    def _has_reference(self) -> bool:
+        return self.reference_lat is not None and self.reference_lon is not None
+
+    def _rank_signatures_sql(self, wanted: set) -> Dict[SignatureKey, int]:
+        """
+        Nearest candidate per signature, ranked by the DB on a planar distance expression.
+        A bounding box around the reference point is tried first; signatures with no
+        candidate inside it are ranked again without the box.
+        """
+        winners: Dict[SignatureKey, int] = {}
+        remaining = set(wanted)
+        for bbox in (self._reference_bbox(), None):
+            if not remaining:
+                break
+            rows = self._ranked_signature_rows(remaining, bbox)
+            for key, bucket in _bucket_signature_rows(rows, remaining, limit=1).items():
+                if bucket:
+                    winners[key] = bucket[0][0]
+            remaining.difference_update(winners)
+        return winners
+
+    def _ranked_signature_rows(self, keys: set, bbox: Optional[Tuple[float, float, float, float]]):
+        """
+        The nearest row of every (mcc, mnc, pci, earfcn, lac) group, nearest first. A
+        signature covers one or more such groups (EARFCN and LAC are optional), so its
+        nearest tower is among these rows and the DB never returns the other candidates.
+        """
+        qs = CellTower.objects.filter(_signature_condition(keys))
+        if bbox is not None:
+            min_lat, max_lat, min_lon, max_lon = bbox
+            qs = qs.filter(lat__gte=min_lat, lat__lte=max_lat, lon__gte=min_lon, lon__lte=max_lon)
+        order = [F("_ref_dist2").asc(), F("updated_at").desc()]
+        return (
+            qs.annotate(_ref_dist2=_planar_distance_sq(self.reference_lat, self.reference_lon))
+            .annotate(
+                _group_rank=Window(RowNumber(), partition_by=[F(name) for name in _SIGNATURE_GROUP_FIELDS], order_by=order)
+            )
+            .filter(_group_rank=1)
+            .order_by(*order)
+            .values_list(*_SIGNATURE_ROW_FIELDS)
+        )
+
+    def _rank_signatures_python(self, wanted: set) -> Dict[SignatureKey, int]:
+        rows = (
+            CellTower.objects.filter(_signature_condition(wanted))
+            .order_by("-updated_at")
+            .values_list(*_SIGNATURE_ROW_FIELDS)
+        )
+        return self._pick_nearest(_bucket_signature_rows(rows, wanted, limit=SIGNATURE_CANDIDATE_LIMIT))
+
+    def _pick_nearest(self, buckets: Dict[SignatureKey, List[Tuple[int, float, float]]]) -> Dict[SignatureKey, int]:
+        """Newest candidate without a reference point, else the closest by haversine."""
+        winners: Dict[SignatureKey, int] = {}
+        for key, bucket in buckets.items():
+            if not bucket:
+                continue
+            if not self._has_reference():
+                winners[key] = bucket[0][0]
+                continue
+            distances = haversine_many(
+                self.reference_lat, self.reference_lon, [c[1] for c in bucket], [c[2] for c in bucket]
+            )
+            winners[key] = bucket[int(np.argmin(distances))][0]
+        return winners
+
+    def _reference_bbox(self) -> Optional[Tuple[float, float, float, float]]:
+        radius_m = float(_signature_lookup_config()["BBOX_RADIUS_M"] or 0)
+        if radius_m <= 0 or not self._has_reference():
+            return None
+        dlat = radius_m / METERS_PER_DEGREE_LAT
+        dlon = radius_m / (METERS_PER_DEGREE_LAT * max(0.01, math.cos(math.radians(self.reference_lat))))
+        return (
+            self.reference_lat - dlat,
+            self.reference_lat + dlat,
+            self.reference_lon - dlon,
+            self.reference_lon + dlon,
+        )
+
     def _lookup_local_signature(
         self,
         *,
@@ -140,8 +646,11 @@ class TowerResolver:
         earfcn: int | None,
         lac: int | None,
     ) -> Optional[CellTower]:
-        if _is_sentinel(mcc) or _is_sentinel(mnc) or _is_sentinel(pci):
+        key = _signature_key(mcc, mnc, pci, earfcn, lac)
+        if key is None:
             return None
+        if self._index is not None:
+            return self._index.signature(*key, reference_lat=self.reference_lat, reference_lon=self.reference_lon)
         try:
             qs = CellTower.objects.filter(mcc=int(mcc), mnc=int(mnc), pci=int(pci))
             if earfcn is not None and not _is_sentinel(earfcn):
@@ -149,21 +658,26 @@ class TowerResolver:
             if lac is not None and not _is_sentinel(lac):
                 qs = qs.filter(lac=int(lac))
 
-            candidates = list(qs.order_by("-updated_at")[:200])
+            if not self._has_reference():
+                return qs.order_by("-updated_at").first()
+
+            if _signature_lookup_config()["SQL_RANKING"]:
+                try:
+                    return (
+                        qs.annotate(_ref_dist2=_planar_distance_sq(self.reference_lat, self.reference_lon))
+                        .order_by("_ref_dist2", "-updated_at")
+                        .first()
+                    )
+                except DatabaseError as exc:
+                    logger.warning("SQL signature ranking unavailable, falling back to Python: %s", exc)
+
+            candidates = list(qs.order_by("-updated_at")[:SIGNATURE_CANDIDATE_LIMIT])
             if not candidates:
                 return None
-
-            if self.reference_lat is None or self.reference_lon is None:
-                return candidates[0]
-
-            best: Optional[CellTower] = None
-            best_d: Optional[float] = None
-            for t in candidates:
-                d = haversine_distance(self.reference_lat, self.reference_lon, t.lat, t.lon)
-                if best_d is None or d < best_d:
-                    best = t
-                    best_d = d
-            return best
+            distances = haversine_many(
+                self.reference_lat, self.reference_lon, [t.lat for t in candidates], [t.lon for t in candidates]
+            )
+            return candidates[int(np.argmin(distances))]
         except Exception as exc:
             logger.exception("Signature lookup failed: %s", exc)
             return None
@@ -180,135 +694,179 @@ class TowerResolver:
         earfcn: int | None,
         signal_strength: int | None,
     ) -> Optional[ResolveResult]:
-        if _is_sentinel(mcc) or _is_sentinel(mnc) or _is_sentinel(cell_id):
+        request = self._external_request(
+            radio_type=radio_type, mcc=mcc, mnc=mnc, cell_id=cell_id, lac=lac, pci=pci, earfcn=earfcn,
+            signal_strength=signal_strength,
+        )
+        if request is None:
             return None
+        ids = request[1]
+        return get_single_flight().do(
+            (ids["mcc"], ids["mnc"], ids["lac"], ids["cell_id"]),
+            lambda: self._query_providers_and_upsert(*request),
+            on_remote_done=lambda: self._after_remote_lookup(ids),
+        )
 
-        mcc_i = int(mcc)
-        mnc_i = int(mnc)
-        cell_id_i = int(cell_id)
-        lac_i = None if lac is None or _is_sentinel(lac) else int(lac)
-        pci_i = None if pci is None or _is_sentinel(pci) else int(pci)
-        earfcn_i = None if earfcn is None or _is_sentinel(earfcn) else int(earfcn)
+    def _lookup_external_many(self, cells: Dict[Tuple[Any, ...], Dict[str, Any]]) -> Dict[Tuple[Any, ...], ResolveResult]:
+        """External lookup of several cells with batched provider calls, coalesced per cell."""
+        requests: Dict[Tuple[Any, ...], Tuple[str, Dict[str, Any], Dict[str, Any]]] = {}
+        cache_keys: Dict[Tuple[Any, ...], List[Tuple[Any, ...]]] = {}
+        for cache_key, cell in cells.items():
+            request = self._external_request(
+                radio_type=cell.get("radio_type"),
+                mcc=cell.get("mcc"),
+                mnc=cell.get("mnc"),
+                cell_id=cell.get("cell_id"),
+                lac=cell.get("lac"),
+                pci=cell.get("pci"),
+                earfcn=cell.get("earfcn"),
+                signal_strength=cell.get("signal_strength"),
+            )
+            if request is None:
+                continue
+            ids = request[1]
+            flight_key = (ids["mcc"], ids["mnc"], ids["lac"], ids["cell_id"])
+            requests.setdefault(flight_key, request)
+            cache_keys.setdefault(flight_key, []).append(cache_key)
+        if not requests:
+            return {}
+
+        answers = get_single_flight().do_many(
+            list(requests),
+            lambda keys: self._query_providers_and_upsert_many({key: requests[key] for key in keys}),
+            on_remote_done=lambda key: self._after_remote_lookup(requests[key][1]),
+        )
+        return {
+            cache_key: answer
+            for flight_key, answer in answers.items()
+            if answer is not None
+            for cache_key in cache_keys[flight_key]
+        }
+
+    def _query_providers_and_upsert_many(
+        self, requests: Dict[Tuple[Any, ...], Tuple[str, Dict[str, Any], Dict[str, Any]]]
+    ) -> Dict[Tuple[Any, ...], Optional[ResolveResult]]:
+        outcomes = query_providers_many(self._providers, [lookup_kwargs for _, _, lookup_kwargs in requests.values()])
+        return {
+            key: self._finish_external(rt, ids, chosen, attempts)
+            for (key, (rt, ids, _)), (chosen, attempts) in zip(requests.items(), outcomes)
+        }
+
+    def _query_providers_and_upsert(
+        self, rt: str, ids: Dict[str, Any], lookup_kwargs: Dict[str, Any]
+    ) -> Optional[ResolveResult]:
+        chosen, attempts = query_providers(self._providers, lookup_kwargs)
+        return self._finish_external(rt, ids, chosen, attempts)
+
+    def _finish_external(
+        self, rt: str, ids: Dict[str, Any], chosen: Optional[ProviderAttempt], attempts: Sequence[ProviderAttempt]
+    ) -> Optional[ResolveResult]:
+        for attempt in attempts:
+            self._log_attempt(attempt, ids)
+        if not self._note_attempts(chosen, attempts, ids):
+            return None
 
+        try:
+            tower = self._upsert_from_lookup(chosen, radio_type=rt, **ids)
+        except Exception as exc:
+            logger.exception("%s upsert failed: %s", chosen.provider_name, exc)
+            return None
+        return self._external_result(chosen, tower, ids)
+
+    def _external_request(
+        self,
+        *,
+        radio_type: str | None,
+        mcc: Any,
+        mnc: Any,
+        cell_id: Any,
+        lac: Any,
+        pci: Any,
+        earfcn: Any,
+        signal_strength: int | None,
+    ) -> Optional[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+        """Normalized (radio_type, log ids, provider kwargs), or None when the cell can't be looked up."""
+        if _is_sentinel(mcc) or _is_sentinel(mnc) or _is_sentinel(cell_id):
+            return None
         if not self._providers:
             return None
 
         rt = normalize_radio_type(radio_type or "lte")
+        ids = {
+            "mcc": int(mcc),
+            "mnc": int(mnc),
+            "lac": _optional_int(lac),
+            "cell_id": int(cell_id),
+            "pci": _optional_int(pci),
+            "earfcn": _optional_int(earfcn),
+        }
+        lookup_kwargs = {
+            "mcc": ids["mcc"],
+            "mnc": ids["mnc"],
+            "lac": ids["lac"],
+            "cell_id": ids["cell_id"],
+            "radio_type": rt,
+            "signal_strength": signal_strength,
+        }
+        return rt, ids, lookup_kwargs
+
+    def _note_attempts(
+        self, chosen: Optional[ProviderAttempt], attempts: Sequence[ProviderAttempt], ids: Dict[str, Any]
+    ) -> bool:
+        """Log provider errors and remember total failures; True if a provider answered."""
+        for attempt in attempts:
+            if attempt.error is not None and attempt.outcome != LookupOutcome.TIMEOUT:
+                logger.error("%s lookup failed: %s", attempt.provider_name, attempt.error, exc_info=attempt.error)
+        if chosen is not None:
+            return True
+        if self._negative_cache is not None:
+            key = (ids["mcc"], ids["mnc"], ids["cell_id"], ids["lac"])
+            self._negative_cache.record(key, [a.outcome for a in attempts if a.outcome])
+        return False
+
+    def _after_remote_lookup(self, ids: Dict[str, Any]) -> Optional[ResolveResult]:
+        """Another process just looked this cell up; use whatever it stored."""
+        key = (ids["mcc"], ids["mnc"], ids["cell_id"], ids["lac"])
+        tower = self._query_local_exact(key)
+        if tower is None:
+            return None
+        if self._shared_cache is not None:
+            self._shared_cache.set(key, tower)
+        return ResolveResult(tower=tower, source="LOCAL_DB")
 
-        for provider in self._providers:
-            provider_name = getattr(provider, "name", "PROVIDER")
-            request_url = ""
-            request_body: Optional[Dict[str, Any]] = None
-            response_body: Optional[Dict[str, Any]] = None
-            try:
-                lookup = provider.lookup(
-                    mcc=mcc_i,
-                    mnc=mnc_i,
-                    lac=lac_i,
-                    cell_id=cell_id_i,
-                    radio_type=rt,
-                    signal_strength=signal_strength,
-                    timeout_s=10.0,
-                )
-                if not lookup:
-                    continue
-
-                lat, lon, accuracy_m = float(lookup.lat), float(lookup.lon), lookup.accuracy_m
-                request_url = lookup.request_url
-                request_body = lookup.request_body
-                response_body = lookup.raw
-                src = getattr(provider, "dataset_source", DatasetSource.OTHER)
-                src_label = provider_name
+    def _external_result(self, chosen: ProviderAttempt, tower: CellTower, ids: Dict[str, Any]) -> ResolveResult:
+        if self._shared_cache is not None:
+            self._shared_cache.set((ids["mcc"], ids["mnc"], ids["cell_id"], ids["lac"]), tower)
+        return ResolveResult(tower=tower, source=chosen.provider_name)
 
-                try:
-                    TowerLookupLog.objects.create(
-                        provider=provider_name,
-                        mcc=mcc_i,
-                        mnc=mnc_i,
-                        lac=lac_i,
-                        cell_id=cell_id_i,
-                        pci=pci_i,
-                        earfcn=earfcn_i,
-                        success=True,
-                        lat=lat,
-                        lon=lon,
-                        accuracy_m=float(accuracy_m) if accuracy_m is not None else None,
-                        request_url=request_url,
-                        request_body=request_body,
-                        response_body=response_body,
-                    )
-                except Exception:
-                    pass
-
-                tower, created = CellTower.objects.get_or_create(
-                    mcc=mcc_i,
-                    mnc=mnc_i,
-                    cell_id=cell_id_i,
-                    lac=lac_i,
-                    defaults={
-                        "radio_type": rt,
-                        "pci": pci_i,
-                        "earfcn": earfcn_i,
-                        "range_m": int(accuracy_m) if accuracy_m is not None else None,
-                        "is_approximate": True,
-                        "samples": None,
-                        "lat": lat,
-                        "lon": lon,
-                        "tx_power": CellTower._meta.get_field("tx_power").default,
-                        "antenna_azimuth": None,
-                        "source": src,
-                        "checked_count": 1,
-                        "verified_count": 0,
-                    },
-                )
-                if not created:
-                    updated = False
-                    if tower.source != DatasetSource.MANUAL:
-                        if tower.lat != lat or tower.lon != lon:
-                            tower.lat = lat
-                            tower.lon = lon
-                            updated = True
-                    if tower.range_m is None and accuracy_m is not None:
-                        tower.range_m = int(accuracy_m)
-                        updated = True
-                    tower.checked_count = (tower.checked_count or 0) + 1
-                    if updated:
-                        tower.source = src
-                        tower.is_approximate = True
-                        tower.save(
-                            update_fields=[
-                                "lat",
-                                "lon",
-                                "range_m",
-                                "source",
-                                "is_approximate",
-                                "checked_count",
-                                "updated_at",
-                            ]
-                        )
-                    else:
-                        tower.save(update_fields=["checked_count", "updated_at"])
-
-                return ResolveResult(tower=tower, source=src_label)
-            except Exception as exc:
-                logger.exception("%s lookup failed: %s", provider_name, exc)
-                try:
-                    TowerLookupLog.objects.create(
-                        provider=provider_name,
-                        mcc=mcc_i,
-                        mnc=mnc_i,
-                        lac=lac_i,
-                        cell_id=cell_id_i,
-                        pci=pci_i,
-                        earfcn=earfcn_i,
-                        success=False,
-                        request_url=request_url,
-                        request_body=request_body,
-                        response_body=response_body,
-                        error=str(exc),
-                    )
-                except Exception:
-                    pass
-                continue
+    @staticmethod
+    def _log_attempt(attempt: ProviderAttempt, ids: Dict[str, Any]) -> None:
+        try:
+            TowerLookupLog.objects.create(**_lookup_log_fields(attempt, ids))
+        except Exception:
+            pass
 
-        return None
+    @staticmethod
+    def _upsert_from_lookup(
+        attempt: ProviderAttempt,
+        *,
+        radio_type: str,
+        mcc: int,
+        mnc: int,
+        lac: Optional[int],
+        cell_id: int,
+        pci: Optional[int],
+        earfcn: Optional[int],
+    ) -> CellTower:
+        tower, created = CellTower.objects.get_or_create(
+            mcc=mcc,
+            mnc=mnc,
+            cell_id=cell_id,
+            lac=lac,
+            defaults=_new_tower_defaults(attempt, radio_type=radio_type, pci=pci, earfcn=earfcn),
+        )
+        if not created:
+            update_fields = _merge_lookup(tower, attempt)
+            if not _buffer_update(tower, update_fields):
+                tower.save(update_fields=update_fields)
+        return tower
@@ -0,0 +1,282 @@
+"""
+Per-device tracking: warm-started fixes fused with a constant-velocity Kalman filter.
+
+Fleet devices report every few seconds from nearly the same place. When a client
+sends a `device_id`, the worker keeps a small track for that device in a bounded
+LRU/TTL cache: position and velocity in metres on a local tangent plane around the
+track origin, plus their covariance. Each report then:
+
+1. predicts the track forward to the report time,
+2. locates the cells with the 3+ tower solver warm-started from the prediction
+   (it starts next to the answer, so it needs fewer iterations),
+3. fuses that fix with a Kalman update, using the fix radius as its noise.
+
+A fix outside the innovation gate is treated as an outlier and the prediction is
+returned instead. The track restarts from the new fix after `MAX_MISSES`
+consecutive outliers, or when reports are more than `MAX_GAP_S` apart. Tracks are
+per process; route a device's requests to one worker (or accept one track per
+worker).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from cellular.services.locator import locate_cells
+from cellular.services.tower_cache import MISSING, LruTtlCache
+from cellular.utils.geometry import LocalProjector
+
+DEFAULT_TRACKING = {
+    "ENABLED": True,
+    "MAX_DEVICES": 10000,
+    # Idle tracks are dropped after this long.
+    "TTL_S": 900.0,
+    # Restart instead of predicting across longer gaps between reports.
+    "MAX_GAP_S": 300.0,
+    # Process noise: random acceleration (m/s^2, 1 sigma).
+    "ACCEL_STD_MPS2": 1.5,
+    "INITIAL_SPEED_STD_MPS": 15.0,
+    # Floor for a fix's standard deviation (its radius), in metres.
+    "MIN_FIX_STD_M": 20.0,
+    # Mahalanobis gate on the innovation (chi-square, 2 DOF; 13.8 ~ 99.9%).
+    "GATE_CHI2": 13.8,
+    "MAX_MISSES": 2,
+}
+
+_H = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+
+
+def tracking_config() -> Dict[str, Any]:
+    return {**DEFAULT_TRACKING, **(getattr(settings, "TRACKING", None) or {})}
+
+
+@dataclass
+class DeviceTrack:
+    """Filter state of one device: x = [east, north, v_east, v_north] (m, m/s) around the origin."""
+
+    origin_lat: float
+    origin_lon: float
+    x: np.ndarray
+    P: np.ndarray
+    t: float
+    updates: int = 1
+    misses: int = 0
+    frame: LocalProjector = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.frame = LocalProjector(self.origin_lat, self.origin_lon)
+
+    def to_local(self, lat: float, lon: float) -> np.ndarray:
+        return np.array(self.frame.project(lat, lon))
+
+    def to_latlon(self, east: float, north: float) -> Tuple[float, float]:
+        lat, lon = self.frame.unproject(float(east), float(north))
+        return lat, lon
+
+
+class DeviceTracker:
+    """Bounded set of `DeviceTrack`s with predict / update steps."""
+
+    def __init__(
+        self,
+        *,
+        max_devices: int,
+        ttl_s: float,
+        max_gap_s: float,
+        accel_std_mps2: float,
+        initial_speed_std_mps: float,
+        min_fix_std_m: float,
+        gate_chi2: float,
+        max_misses: int,
+    ):
+        self._tracks = LruTtlCache(max_entries=max_devices, ttl_s=ttl_s)
+        self._lock = threading.Lock()
+        self.max_gap_s = float(max_gap_s)
+        self.accel_var = float(accel_std_mps2) ** 2
+        self.initial_speed_var = float(initial_speed_std_mps) ** 2
+        self.min_fix_std_m = float(min_fix_std_m)
+        self.gate_chi2 = float(gate_chi2)
+        self.max_misses = int(max_misses)
+        self.outliers = 0
+        self.restarts = 0
+
+    def _live_track(self, device_id: str, t: float) -> Optional[DeviceTrack]:
+        track = self._tracks.get(device_id)
+        if track is MISSING or t - track.t > self.max_gap_s:
+            return None
+        return track
+
+    def _predict(self, track: DeviceTrack, t: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Late (out-of-order) reports are treated as simultaneous.
+        dt = max(0.0, t - track.t)
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        q = self.accel_var
+        Q = np.zeros((4, 4))
+        Q[0, 0] = Q[1, 1] = q * dt**4 / 4.0
+        Q[0, 2] = Q[2, 0] = Q[1, 3] = Q[3, 1] = q * dt**3 / 2.0
+        Q[2, 2] = Q[3, 3] = q * dt**2
+        return F @ track.x, F @ track.P @ F.T + Q
+
+    def predict(self, device_id: str, t: float) -> Optional[Tuple[float, float]]:
+        """Predicted (lat, lon) of `device_id` at `t`, or None without a live track."""
+        with self._lock:
+            track = self._live_track(device_id, t)
+            if track is None:
+                return None
+            x, _P = self._predict(track, t)
+            return track.to_latlon(x[0], x[1])
+
+    def _start(self, device_id: str, lat: float, lon: float, fix_var: float, t: float) -> DeviceTrack:
+        track = DeviceTrack(
+            origin_lat=lat,
+            origin_lon=lon,
+            x=np.zeros(4),
+            P=np.diag([fix_var, fix_var, self.initial_speed_var, self.initial_speed_var]),
+            t=t,
+        )
+        self._tracks.set(device_id, track)
+        return track
+
+    def update(self, device_id: str, lat: float, lon: float, radius: float, t: float) -> Dict[str, Any]:
+        """Fuse a fix into the device's track; returns the filtered state."""
+        fix_var = max(self.min_fix_std_m, float(radius)) ** 2
+        with self._lock:
+            track = self._live_track(device_id, t)
+            if track is None:
+                track = self._start(device_id, lat, lon, fix_var, t)
+                return self._state(track, "started")
+
+            x, P = self._predict(track, t)
+            innovation = track.to_local(lat, lon) - _H @ x
+            S = _H @ P @ _H.T + np.eye(2) * fix_var
+            S_inv = np.linalg.inv(S)
+            if float(innovation @ S_inv @ innovation) > self.gate_chi2:
+                if track.misses < self.max_misses:
+                    self.outliers += 1
+                    track.x, track.P, track.t = x, P, max(t, track.t)
+                    track.misses += 1
+                    self._tracks.set(device_id, track)
+                    return self._state(track, "outlier")
+                self.restarts += 1
+                track = self._start(device_id, lat, lon, fix_var, t)
+                return self._state(track, "restarted")
+
+            K = P @ _H.T @ S_inv
+            track.x = x + K @ innovation
+            track.P = (np.eye(4) - K @ _H) @ P
+            track.t = max(t, track.t)
+            track.updates += 1
+            track.misses = 0
+            self._tracks.set(device_id, track)
+            return self._state(track, "updated")
+
+    @staticmethod
+    def _state(track: DeviceTrack, status: str) -> Dict[str, Any]:
+        lat, lon = track.to_latlon(track.x[0], track.x[1])
+        # 1-sigma radius along the major axis of the position covariance.
+        a, b, c = track.P[0, 0], track.P[0, 1], track.P[1, 1]
+        major_var = (a + c) / 2.0 + math.sqrt(((a - c) / 2.0) ** 2 + b * b)
+        v_east, v_north = float(track.x[2]), float(track.x[3])
+        return {
+            "lat": lat,
+            "lon": lon,
+            "radius": math.sqrt(major_var),
+            "speed_mps": math.hypot(v_east, v_north),
+            "heading": math.degrees(math.atan2(v_east, v_north)) % 360.0,
+            "updates": track.updates,
+            "status": status,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tracks.clear()
+            self.outliers = self.restarts = 0
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._tracks.stats(), "outliers": self.outliers, "restarts": self.restarts}
+
+
+_tracker: Any = MISSING
+_tracker_lock = threading.Lock()
+
+
+def get_device_tracker() -> Optional[DeviceTracker]:
+    """Worker-wide device tracker, or None when `TRACKING["ENABLED"]` is off."""
+    global _tracker
+    if _tracker is MISSING:
+        with _tracker_lock:
+            if _tracker is MISSING:
+                cfg = tracking_config()
+                _tracker = (
+                    DeviceTracker(
+                        max_devices=cfg["MAX_DEVICES"],
+                        ttl_s=cfg["TTL_S"],
+                        max_gap_s=cfg["MAX_GAP_S"],
+                        accel_std_mps2=cfg["ACCEL_STD_MPS2"],
+                        initial_speed_std_mps=cfg["INITIAL_SPEED_STD_MPS"],
+                        min_fix_std_m=cfg["MIN_FIX_STD_M"],
+                        gate_chi2=cfg["GATE_CHI2"],
+                        max_misses=cfg["MAX_MISSES"],
+                    )
+                    if cfg.get("ENABLED")
+                    else None
+                )
+    return _tracker
+
+
+def locate_tracked(
+    cells_data: List[Dict[str, Any]],
+    *,
+    device_id: str,
+    timestamp: float | None = None,
+    **locate_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    `locate_cells` for a tracked device: warm-started from the device's predicted
+    position, with the fix fused into its track. The returned location/radius are
+    the filtered ones; `tracking` carries the raw fix and the track state.
+    """
+    tracker = get_device_tracker()
+    if tracker is None:
+        return locate_cells(cells_data, **locate_kwargs)
+
+    t = time.time() if timestamp is None else float(timestamp)
+    result = locate_cells(cells_data, initial=tracker.predict(device_id, t), **locate_kwargs)
+    raw = result["location"]
+    state = tracker.update(device_id, raw["lat"], raw["lon"], result["radius"], t)
+    lat, lon = round(state["lat"], 7), round(state["lon"], 7)
+    return {
+        **result,
+        "location": {"lat": lat, "lon": lon, "google": f"{lat},{lon}"},
+        "radius": round(state["radius"], 2),
+        "tracking": {
+            "device_id": device_id,
+            "status": state["status"],
+            "updates": state["updates"],
+            "speed_mps": round(state["speed_mps"], 2),
+            "heading": round(state["heading"], 1),
+            "raw_location": {"lat": raw["lat"], "lon": raw["lon"]},
+            "raw_radius": result["radius"],
+        },
+    }
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    global _tracker
+    if setting == "TRACKING":
+        with _tracker_lock:
+            _tracker = MISSING
@@ -0,0 +1,215 @@
+"""
+Write-behind buffer for updates to towers that already exist.
+
+External resolutions of known towers used to `save()` the row in the request path
+(checked_count bump + provider-derived lat/lon/range), turning popular towers into
+hot rows. Instead the resolver records the change here and a background thread
+flushes everything pending as one `UPDATE ... CASE` per chunk:
+
+- `checked_count` increments are summed per tower and applied with `F()`, so
+  concurrent workers never overwrite each other's counts;
+- provider-derived fields (lat/lon/range_m/source/is_approximate) are last-write-wins,
+  except on rows that are `MANUAL` by flush time: an edit made after the lookup was
+  buffered keeps its values, and only the count is applied.
+
+Flushes happen every `FLUSH_INTERVAL_S`, as soon as `MAX_PENDING` towers are
+waiting, and at interpreter exit. A crash loses at most one interval of counters;
+new towers are still created synchronously. Off by default (`ENABLED`): the
+resolver then saves known towers in the request path.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.dispatch import receiver
+from django.utils import timezone
+
+from cellular.choices import DatasetSource
+from cellular.models import CellTower
+from cellular.services.locate_cache import invalidate_locate_results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITE_BEHIND = {
+    "ENABLED": False,
+    "FLUSH_INTERVAL_S": 5.0,
+    "MAX_PENDING": 500,
+    # Towers per UPDATE statement.
+    "CHUNK_SIZE": 200,
+}
+
+# Fields the resolver may change on an existing tower.
+BUFFERED_FIELDS = ("lat", "lon", "range_m", "source", "is_approximate")
+
+
+def write_behind_config() -> Dict[str, Any]:
+    return {**DEFAULT_WRITE_BEHIND, **(getattr(settings, "TOWER_WRITE_BEHIND", None) or {})}
+
+
+class TowerWriteBuffer:
+    def __init__(self, *, flush_interval_s: float, max_pending: int, chunk_size: int = 200):
+        self.flush_interval_s = float(flush_interval_s)
+        self.max_pending = max(1, int(max_pending))
+        self.chunk_size = max(1, int(chunk_size))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._increments: Dict[int, int] = {}
+        self._fields: Dict[int, Dict[str, Any]] = {}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def record(self, tower_pk: int, *, checked: int = 0, fields: Optional[Dict[str, Any]] = None) -> None:
+        """Queue a `checked_count` increment and/or field values for an existing tower."""
+        with self._lock:
+            if checked:
+                self._increments[tower_pk] = self._increments.get(tower_pk, 0) + int(checked)
+            if fields:
+                self._fields.setdefault(tower_pk, {}).update(
+                    {k: v for k, v in fields.items() if k in BUFFERED_FIELDS}
+                )
+            pending = len(self._increments.keys() | self._fields.keys())
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._increments.keys() | self._fields.keys())
+
+    def flush(self) -> int:
+        """Write everything pending; returns the number of towers updated."""
+        with self._flush_lock:
+            with self._lock:
+                increments, self._increments = self._increments, {}
+                fields, self._fields = self._fields, {}
+            pks = sorted(increments.keys() | fields.keys())
+            if not pks:
+                return 0
+
+            written = 0
+            try:
+                for start in range(0, len(pks), self.chunk_size):
+                    chunk = pks[start:start + self.chunk_size]
+                    written += CellTower.objects.filter(pk__in=chunk).update(**_update_kwargs(chunk, increments, fields))
+            except Exception as exc:
+                self.failures += 1
+                logger.exception("Tower write-behind flush failed, re-queueing %d towers: %s", len(pks), exc)
+                with self._lock:
+                    for pk, n in increments.items():
+                        self._increments[pk] = self._increments.get(pk, 0) + n
+                    for pk, values in fields.items():
+                        self._fields[pk] = {**values, **self._fields.get(pk, {})}
+                return written
+
+            self.flushes += 1
+            self.flushed_rows += written
+            invalidate_locate_results(pks)
+            return written
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None or self.flush_interval_s <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tower-write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending(),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures,
+            "flush_interval_s": self.flush_interval_s,
+            "max_pending": self.max_pending,
+        }
+
+
+def _update_kwargs(chunk: Iterable[int], increments: Dict[int, int], fields: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    chunk = list(chunk)
+    kwargs: Dict[str, Any] = {"updated_at": timezone.now()}
+    counted = [pk for pk in chunk if increments.get(pk)]
+    if counted:
+        kwargs["checked_count"] = F("checked_count") + Case(
+            *[When(pk=pk, then=Value(increments[pk])) for pk in counted],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    # SET expressions see the row as it was, so `source` here is the pre-flush value.
+    not_manual = ~Q(source=DatasetSource.MANUAL)
+    for name in BUFFERED_FIELDS:
+        whens: List[When] = [
+            When(Q(pk=pk) & not_manual, then=Value(fields[pk][name])) for pk in chunk if name in fields.get(pk, {})
+        ]
+        if whens:
+            kwargs[name] = Case(*whens, default=F(name), output_field=CellTower._meta.get_field(name))
+    return kwargs
+
+
+_buffer: Optional[TowerWriteBuffer] = None
+_buffer_loaded = False
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer() -> Optional[TowerWriteBuffer]:
+    """Worker-wide write-behind buffer, or None when `TOWER_WRITE_BEHIND["ENABLED"]` is off."""
+    global _buffer, _buffer_loaded
+    if not _buffer_loaded:
+        with _buffer_lock:
+            if not _buffer_loaded:
+                cfg = write_behind_config()
+                _buffer = (
+                    TowerWriteBuffer(
+                        flush_interval_s=cfg["FLUSH_INTERVAL_S"],
+                        max_pending=cfg["MAX_PENDING"],
+                        chunk_size=cfg["CHUNK_SIZE"],
+                    )
+                    if cfg.get("ENABLED")
+                    else None
+                )
+                _buffer_loaded = True
+    return _buffer
+
+
+@atexit.register
+def flush_write_buffer() -> int:
+    buffer = _buffer
+    return buffer.flush() if buffer is not None else 0
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    global _buffer, _buffer_loaded
+    if setting == "TOWER_WRITE_BEHIND":
+        with _buffer_lock:
+            if _buffer is not None:
+                _buffer.stop()
+            _buffer, _buffer_loaded = None, False
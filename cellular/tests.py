@@ -1,6 +1,70 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-from cellular.serializers import LocateUserResponseSerializer
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from cellular.choices import DatasetSource
+from cellular.models import CellTower, TowerLookupLog
+from cellular.services.async_tower_resolver import AsyncTowerResolver
+from cellular.services.batch_locator import locate_batch
+from cellular.services.locate_cache import get_locate_cache, invalidate_locate_results
+from cellular.services.locator import locate_cells
+from cellular.services.providers.base import LookupOutcome, ProviderLookup, ProviderUnavailable, classify_lookup_error
+from cellular.services.providers.fanout import ProviderAttempt, query_providers
+from cellular.services.providers.transport import CircuitBreaker, TokenBucket, get_transport
+from cellular.serializers import CellTowerSerializer, LocateUserResponseSerializer
+from cellular.services.singleflight import SingleFlight
+from cellular.services.tower_cache import LruTtlCache, get_negative_lookup_cache, get_shared_tower_cache
+from cellular.services.tower_file import TowerFile, export_tower_file
+from cellular.services.tower_index import TowerIndex, reset_tower_index, warm_tower_index
+from cellular.services.tower_resolver import TowerResolver
+from cellular.services.tracking import get_device_tracker
+from cellular.services.write_behind import get_write_buffer
+from cellular.utils.geometry import (
+    LocalProjector,
+    band_ref_loss,
+    bearing_many,
+    calculate_bearing_between_coords,
+    calculate_distance,
+    calculate_distance_many,
+    calculate_new_coordinates,
+    destination_many,
+    distance_from_ta,
+    distance_from_ta_many,
+    estimate_bearing,
+    estimate_bearing_many,
+    find_circle_intersections,
+    find_circle_intersections_many,
+    haversine_distance,
+    haversine_many,
+    rsrp_weight_many,
+    tower_path_loss,
+    tower_weight,
+    tower_weight_many,
+    trilaterate_nlls,
+    trilaterate_nlls_many,
+    trilaterate_two_many,
+    trilaterate_two_towers,
+    weighted_centroid,
+    weighted_centroid_many,
+)
+from cellular.utils.import_jobs import create_job, get_job
+from cellular.utils.importers import _fetch_existing_lookup, import_towers_from_csv
 
 
 class LocateUserResponseSerializationTests(TestCase):
@@ -12,3 +76,1237 @@ class LocateUserResponseSerializationTests(TestCase):
         }
         ser = LocateUserResponseSerializer(data=payload)
         self.assertTrue(ser.is_valid(), ser.errors)
+
+
+class TowerResolverBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.exact = CellTower.objects.create(mcc=432, mnc=35, lac=100, cell_id=1001, pci=7, earfcn=1850, lat=35.70, lon=51.40)
+        cls.no_lac = CellTower.objects.create(mcc=432, mnc=35, lac=None, cell_id=1002, pci=8, lat=35.71, lon=51.41)
+        cls.near = CellTower.objects.create(mcc=432, mnc=35, lac=200, cell_id=2001, pci=9, earfcn=1850, lat=35.72, lon=51.42)
+        cls.far = CellTower.objects.create(mcc=432, mnc=35, lac=200, cell_id=2002, pci=9, earfcn=1850, lat=36.50, lon=52.50)
+
+    def setUp(self):
+        get_shared_tower_cache().clear()
+        get_locate_cache().clear()
+
+    def _cells(self):
+        return [
+            {"mcc": 432, "mnc": 35, "cell_id": 1001, "lac": 100, "signal_strength": -80},
+            {"mcc": 432, "mnc": 35, "cell_id": 1002, "lac": 999, "signal_strength": -85},
+            {"mcc": 432, "mnc": 35, "cell_id": 9999, "lac": 200, "pci": 9, "earfcn": 1850, "signal_strength": -90},
+            {"mcc": 432, "mnc": 35, "cell_id": 8888, "lac": None, "signal_strength": -95},
+            {"mcc": 432, "mnc": 35, "cell_id": 1001, "lac": 100, "signal_strength": -80},
+        ]
+
+    def test_resolve_many_matches_single_resolve_in_input_order(self):
+        cells = self._cells()
+        batch = TowerResolver(reference_lat=35.72, reference_lon=51.42).resolve_many(cells)
+        single = [TowerResolver(reference_lat=35.72, reference_lon=51.42).resolve(**c) for c in cells]
+
+        self.assertEqual([(r.tower, r.source) for r in batch], [(r.tower, r.source) for r in single])
+        self.assertEqual(
+            [r.tower for r in batch],
+            [self.exact, self.no_lac, self.near, None, self.exact],
+        )
+
+    def test_tower_changes_evict_the_shared_cache(self):
+        ids = {"mcc": 432, "mnc": 35, "cell_id": 1001, "lac": 100}
+        self.assertEqual(TowerResolver().resolve(**ids).tower.lat, 35.70)
+        get_negative_lookup_cache().record((432, 35, 1001, 100), ["NOT_FOUND"])
+
+        tower = CellTower.objects.get(pk=self.exact.pk)
+        tower.lat, tower.lon = 35.80, 51.50
+        tower.save()
+        self.assertIsNone(get_negative_lookup_cache().get((432, 35, 1001, 100)))
+        with self.assertNumQueries(1):  # re-read from the DB, not the shared cache
+            resolved = TowerResolver().resolve(**ids).tower
+        self.assertEqual((resolved.lat, resolved.lon), (35.80, 51.50))
+
+        # Even under a changed identity key, the old entry goes.
+        tower.cell_id = 1003
+        tower.save()
+        self.assertIsNone(TowerResolver().resolve(**ids).tower)
+        self.assertEqual(TowerResolver().resolve(**{**ids, "cell_id": 1003}).tower.pk, tower.pk)
+        tower.delete()
+        self.assertIsNone(TowerResolver().resolve(**{**ids, "cell_id": 1003}).tower)
+
+    def test_resolve_many_query_count_is_flat(self):
+        resolver = TowerResolver(reference_lat=35.72, reference_lon=51.42)
+        with self.assertNumQueries(3):
+            resolver.resolve_many(self._cells())
+        with self.assertNumQueries(0):
+            resolver.resolve_many(self._cells())
+
+    def test_signature_ranking_in_sql_matches_python_fallback(self):
+        cell = {"mcc": 432, "mnc": 35, "cell_id": 9999, "lac": 200, "pci": 9, "earfcn": 1850}
+        for ref_lat, ref_lon, expected in ((35.72, 51.42, self.near), (36.49, 52.49, self.far)):
+            for sql_ranking in (True, False):
+                with self.subTest(ref=(ref_lat, ref_lon), sql_ranking=sql_ranking), override_settings(
+                    TOWER_SIGNATURE_LOOKUP={"SQL_RANKING": sql_ranking, "BBOX_RADIUS_M": 5000}
+                ):
+                    single = TowerResolver(reference_lat=ref_lat, reference_lon=ref_lon).resolve(**cell)
+                    batch = TowerResolver(reference_lat=ref_lat, reference_lon=ref_lon).resolve_many([cell])
+                    self.assertEqual(single.tower, expected)
+                    self.assertEqual(batch[0].tower, expected)
+
+    def test_sql_ranking_returns_one_row_per_signature_group(self):
+        for k in range(20):
+            CellTower.objects.create(mcc=432, mnc=35, lac=200, cell_id=3000 + k, pci=9, earfcn=1850, lat=36.0 + k / 100, lon=52.0)
+        other_band = CellTower.objects.create(mcc=432, mnc=35, lac=200, cell_id=4000, pci=9, earfcn=300, lat=35.73, lon=51.43)
+        resolver = TowerResolver(reference_lat=35.72, reference_lon=51.42)
+        rows = list(resolver._ranked_signature_rows({(432, 35, 9, None, None)}, None))
+        self.assertEqual([row[0] for row in rows], [self.near.pk, other_band.pk])
+        self.assertEqual(resolver._rank_signatures_sql({(432, 35, 9, 300, 200)}), {(432, 35, 9, 300, 200): other_band.pk})
+
+    def test_shared_cache_serves_exact_hits_across_resolvers(self):
+        cell = {"mcc": 432, "mnc": 35, "cell_id": 1001, "lac": 100}
+        TowerResolver().resolve(signal_strength=-80, **cell)
+        with self.assertNumQueries(0):
+            res = TowerResolver().resolve(signal_strength=-97, **cell)
+        self.assertEqual((res.tower, res.source), (self.exact, "LOCAL_DB"))
+        self.assertEqual(get_shared_tower_cache().stats()["hits"], 1)
+
+    @override_settings(TOWER_INDEX={"ENABLED": True, "REFRESH_INTERVAL_S": 0})
+    def test_tower_index_answers_like_the_db_without_queries(self):
+        expected = TowerResolver(reference_lat=35.72, reference_lon=51.42).resolve_many(self._cells())
+        warm_tower_index(start_refresher=False)
+        self.addCleanup(reset_tower_index)
+        with self.assertNumQueries(0):
+            indexed = TowerResolver(reference_lat=35.72, reference_lon=51.42).resolve_many(self._cells())
+        self.assertEqual(
+            [(r.tower.pk if r.tower else None, r.source) for r in indexed],
+            [(r.tower.pk if r.tower else None, r.source) for r in expected],
+        )
+        far = TowerResolver(reference_lat=36.49, reference_lon=52.49).resolve(mcc=432, mnc=35, cell_id=1, lac=200, pci=9)
+        self.assertEqual((far.tower.pk, far.tower.lat), (self.far.pk, 36.50))
+
+    def test_tower_index_refresh_applies_changed_and_new_rows(self):
+        index = TowerIndex().load()
+        self.near.lat, self.near.pci = 35.80, 11
+        self.near.save()
+        added = CellTower.objects.create(mcc=432, mnc=35, lac=300, cell_id=3001, pci=9, earfcn=1850, lat=35.60, lon=51.30)
+        self.assertEqual(index.refresh(), 2)
+        # The overlap re-reads both rows; the index already holds them.
+        self.assertEqual(index.refresh(), 0)
+
+        # Committed after the refresh above but stamped before its watermark.
+        late = timezone.now() - timedelta(seconds=1)
+        CellTower.objects.filter(pk=self.far.pk).update(lat=36.40, updated_at=late)
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index.exact(432, 35, 2002, 200).lat, 36.40)
+
+        self.assertEqual(index.exact(432, 35, 2001, 200).lat, 35.80)
+        self.assertEqual(index.exact(432, 35, 3001, None).pk, added.pk)
+        self.assertEqual(index.signature(432, 35, 11, None, None).pk, self.near.pk)
+        self.assertEqual(index.signature(432, 35, 9, 1850, None, reference_lat=35.6, reference_lon=51.3).pk, added.pk)
+        self.assertEqual(index.exact(432, 35, 1002, 999).pk, self.no_lac.pk)
+
+    def test_tower_file_matches_db_and_remaps_after_reexport(self):
+        path = os.path.join(tempfile.mkdtemp(), "towers.bin")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        export_tower_file(path)
+        towers = TowerFile(path).load()
+
+        expected = TowerResolver(reference_lat=35.72, reference_lon=51.42).resolve_many(self._cells())
+        with self.assertNumQueries(0):
+            mapped = TowerResolver(reference_lat=35.72, reference_lon=51.42, index=towers).resolve_many(self._cells())
+        self.assertEqual(
+            [(r.tower.pk if r.tower else None, r.source) for r in mapped],
+            [(r.tower.pk if r.tower else None, r.source) for r in expected],
+        )
+        self.assertEqual(towers.signature(432, 35, 9, 1850, None, reference_lat=36.49, reference_lon=52.49).pk, self.far.pk)
+        self.assertEqual(towers.refresh(), 0)
+
+        CellTower.objects.create(mcc=432, mnc=35, lac=300, cell_id=3001, lat=35.60, lon=51.30)
+        export_tower_file(path)
+        get_locate_cache().store(((self.far.pk, "LOCAL_DB", None, None, None),), {"x": 1}, epoch=get_locate_cache().epoch)
+        self.assertEqual(towers.refresh(), 5)
+        self.assertEqual(len(get_locate_cache()), 0)  # a remap drops every cached result
+        self.assertEqual(towers.exact(432, 35, 3001, None).lat, 35.60)
+
+        out = io.StringIO()
+        with mock.patch("sys.stdin", io.StringIO(json.dumps({"cells": [{"mcc": 432, "mnc": 35, "cellId": 1001, "lac": 100, "signalStrength": -60}]}))), self.assertNumQueries(0):
+            call_command("locate_offline", path, stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["location"]["lat"], 35.70)
+
+    async def test_async_resolver_matches_sync_resolve_many(self):
+        batch = await AsyncTowerResolver(reference_lat=35.72, reference_lon=51.42).aresolve_many(self._cells())
+        self.assertEqual(
+            [(r.tower, r.source) for r in batch],
+            [
+                (self.exact, "LOCAL_DB"),
+                (self.no_lac, "LOCAL_DB"),
+                (self.near, "LOCAL_DB_SIGNATURE"),
+                (None, "NOT_FOUND"),
+                (self.exact, "LOCAL_DB"),
+            ],
+        )
+
+
+class LocateBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for cell_id, lat, lon, azimuth in (
+            (1, 35.7000, 51.4000, 90),
+            (2, 35.7100, 51.4000, None),
+            (3, 35.7000, 51.4150, None),
+            (4, 35.7120, 51.4180, None),
+            (5, 36.2000, 52.0000, None),
+        ):
+            CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=cell_id, lat=lat, lon=lon, antenna_azimuth=azimuth)
+
+    def setUp(self):
+        get_shared_tower_cache().clear()
+        get_locate_cache().clear()
+
+    @staticmethod
+    def _cell(cell_id, rsrp, **extra):
+        return {"mcc": 432, "mnc": 11, "lac": 10, "cellId": cell_id, "signalStrength": rsrp, **extra}
+
+    def _reports(self):
+        c = self._cell
+        return [
+            [c(1, -95, timingAdvance=7)],
+            [c(2, -60)],
+            [c(1, -105)],
+            [c(3, -101)],
+            [c(1, -114), c(2, -116)],
+            [c(1, -70), c(5, -75)],
+            [c(1, -90, rsrq=-10), c(2, -97), c(3, -99, rsrq=-14)],
+            [c(1, -90), c(2, -95), c(3, -100), c(4, -91), c(777, -80)],
+            [{"mcc": 432, "mnc": 11, "cellId": 1}],
+            [c(999, -80)],
+        ]
+
+    @override_settings(LOCATE_CACHE={"ENABLED": False})
+    def test_batch_matches_locate_cells_per_report(self):
+        reports = self._reports()
+        with self.assertNumQueries(1):
+            batch = locate_batch(reports, allow_external_serving=False)
+
+        self.assertEqual(len(batch), len(reports))
+        for report, got in zip(reports, batch):
+            with self.subTest(report=report):
+                try:
+                    expected = locate_cells(report, allow_external_serving=False)
+                except ValueError as exc:
+                    self.assertEqual(got, {"error": str(exc)})
+                    continue
+                self.assertEqual(got["debug"], expected["debug"])
+                self.assertAlmostEqual(got["radius"], expected["radius"], places=2)
+                self.assertAlmostEqual(got["location"]["lat"], expected["location"]["lat"], places=6)
+                self.assertAlmostEqual(got["location"]["lon"], expected["location"]["lon"], places=6)
+
+    def test_endpoint_reports_per_item_errors_in_order(self):
+        body = {
+            "allow_external": False,
+            "reports": [{"cells": self._reports()[4]}, {"cells": "nope"}, {"cells": [self._cell(999, -80)]}, 1],
+        }
+        resp = self.client.post("/api/v1/locate/batch/", body, content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()["results"]
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3])
+        self.assertEqual(results[0]["result"]["debug"]["source"], "COMPOSITE")
+        self.assertIn("cells", results[1]["details"])
+        self.assertEqual(results[2]["error"], "No towers found in database for provided cells")
+        self.assertEqual(results[3]["error"], "Invalid request format")
+
+        with override_settings(LOCATE_BATCH={"MAX_REPORTS": 2}):
+            with mock.patch("cellular.api.v1.views.positioning.LocateUserRequestSerializer") as per_item:
+                resp = self.client.post("/api/v1/locate/batch/", body, content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("reports", resp.json())
+        per_item.assert_not_called()
+        for bad in ({"reports": "nope"}, {}, {"reports": [], "allow_external": "maybe"}):
+            with self.subTest(body=bad):
+                resp = self.client.post("/api/v1/locate/batch/", bad, content_type="application/json")
+                self.assertEqual(resp.status_code, 400)
+
+    def test_endpoint_skips_external_lookups_unless_asked(self):
+        body = {"reports": [{"cells": [self._cell(999, -80)]}]}
+        with mock.patch("cellular.api.v1.views.positioning.locate_batch", return_value=[{"error": "x"}]) as batch:
+            self.client.post("/api/v1/locate/batch/", body, content_type="application/json")
+            self.client.post("/api/v1/locate/batch/", {**body, "allow_external": True}, content_type="application/json")
+        self.assertEqual([c.kwargs["allow_external_serving"] for c in batch.call_args_list], [False, True])
+
+    def test_locate_jsonl_command_keeps_input_order(self):
+        reports = self._reports()
+        lines = [json.dumps({"id": "a", "cells": reports[6]}), json.dumps(reports[0]), "", "not json", json.dumps({"cells": reports[9]})]
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, "reports.jsonl")
+        with open(path, "w") as fh:
+            fh.write("\n".join(lines) + "\n")
+
+        err = io.StringIO()
+        out_path = os.path.join(tmp, "out.jsonl")
+        call_command("locate_jsonl", path, "-o", out_path, "--workers", "0", "--chunk-size", "2", stderr=err)
+        with open(out_path) as fh:
+            items = [json.loads(line) for line in fh]
+        self.assertEqual([item["line"] for item in items], [1, 2, 4, 5])
+        self.assertEqual(items[0]["id"], "a")
+        self.assertEqual(items[0]["result"], locate_cells(reports[6], allow_external_serving=False))
+        self.assertEqual(items[1]["result"]["debug"]["source"], "LOCAL_DB")
+        self.assertIn("error", items[2])
+        self.assertEqual(items[3]["error"], "No towers found in database for provided cells")
+        self.assertIn("4 reports (2 located, 2 errors)", err.getvalue())
+
+        out = io.StringIO()
+        call_command("locate_jsonl", path, "--format", "csv", "--workers", "0", stdout=out, stderr=io.StringIO())
+        rows = out.getvalue().splitlines()
+        self.assertEqual(rows[0], "line,id,lat,lon,radius,source,confidence,error")
+        self.assertEqual(len(rows), 5)
+
+
+class PathLossConstantsTests(TestCase):
+    def setUp(self):
+        get_shared_tower_cache().clear()
+        get_locate_cache().clear()
+
+    def test_ref_loss_follows_earfcn_unless_calibrated(self):
+        tower = CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=1, lat=35.7, lon=51.4, earfcn=1800)
+        self.assertEqual(tower.ref_loss_db, band_ref_loss(1800))
+        tower.earfcn = 2600
+        tower.save(update_fields=["earfcn"])
+        tower.refresh_from_db()
+        self.assertEqual(tower.ref_loss_db, band_ref_loss(2600))
+
+        # A value sent through the API is calibrated and survives EARFCN changes.
+        serializer = CellTowerSerializer(tower, data={"ref_loss_db": 61.5}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        tower.earfcn = 1800
+        tower.save()
+        tower.refresh_from_db()
+        self.assertEqual((tower.ref_loss_db, tower.ref_loss_calibrated), (61.5, True))
+
+        CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=3, lat=35.7, lon=51.4, earfcn=1800, samples=1)
+        csv_text = (
+            "mcc,mnc,lac,cell_id,lat,lon,earfcn,samples\n"
+            "432,11,10,1,35.7,51.4,900,5\n432,11,10,2,35.7,51.4,,1\n432,11,10,3,35.7,51.4,900,5\n"
+        )
+        import_towers_from_csv(io.StringIO(csv_text))
+        self.assertEqual(
+            dict(CellTower.objects.values_list("cell_id", "ref_loss_db")), {1: 61.5, 2: None, 3: band_ref_loss(900)}
+        )
+
+    @override_settings(PATH_LOSS={**settings.PATH_LOSS, "BAND_REF_LOSS": True}, LOCATE_CACHE={"ENABLED": False})
+    def test_locate_uses_per_tower_constants(self):
+        near = CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=1, lat=35.7, lon=51.4, earfcn=1800, path_loss_n=3.1)
+        plain = CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=2, lat=35.71, lon=51.4)
+        for tower in (near, plain):
+            with self.subTest(tower=tower.cell_id):
+                cells = [{"mcc": 432, "mnc": 11, "lac": 10, "cellId": tower.cell_id, "signalStrength": -105}]
+                # Towers without stored constants fall back to the PATH_LOSS defaults.
+                expected = round(calculate_distance(-105, tower.tx_power, tower.path_loss_n, tower.ref_loss_db), 2)
+                self.assertEqual(locate_cells(cells, allow_external_serving=False)["radius"], expected)
+                self.assertEqual(locate_batch([cells], allow_external_serving=False)[0]["radius"], expected)
+
+        # Two towers: the same per-tower distances, whatever the number of neighbours.
+        cells = [
+            {"mcc": 432, "mnc": 11, "lac": 10, "cellId": tower.cell_id, "signalStrength": -105} for tower in (near, plain)
+        ]
+        expected = max(
+            50.0, round(min(calculate_distance(-105, *tower_path_loss(tower)) for tower in (near, plain)), 2)
+        )
+        self.assertEqual(locate_cells(cells, allow_external_serving=False)["radius"], expected)
+        self.assertEqual(locate_batch([cells], allow_external_serving=False)[0]["radius"], expected)
+
+        self.assertNotEqual(tower_path_loss(near)[1:], tower_path_loss(plain)[1:])
+        # The tower index carries the same constants.
+        index = TowerIndex().load()
+        self.assertEqual(tower_path_loss(index.exact(432, 11, 1, 10)), tower_path_loss(near))
+
+    @override_settings(IMPORT_API_KEY="secret")
+    def test_calibration_stores_path_loss_n_on_the_tower(self):
+        tower = CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=1, lat=35.7, lon=51.4, earfcn=1800)
+        user = calculate_new_coordinates(35.7, 51.4, 800, 45)
+        body = {"tower_id": tower.pk, "rsrp": -100, "user_lat": user["lat"], "user_lon": user["lon"]}
+        self.assertEqual(self.client.post("/api/v1/calibrate/", body, content_type="application/json").status_code, 403)
+
+        self.client.defaults["HTTP_X_API_KEY"] = "secret"
+        resp = self.client.post("/api/v1/calibrate/", body, content_type="application/json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        n = resp.json()["n_effective"]
+        tower.refresh_from_db()
+        self.assertAlmostEqual(tower.path_loss_n, n)
+        self.assertEqual(resp.json()["details"]["path_loss_n_saved"], "true")
+        # The solvers now invert the same model back to the sampled distance.
+        self.assertAlmostEqual(calculate_distance(-100, *tower_path_loss(tower)), 800, delta=1)
+
+        self.assertEqual(resp.json()["details"]["path_loss_n"], f"{n:.4f}")
+
+        resp = self.client.post("/api/v1/calibrate/", {**body, "rsrp": 0}, content_type="application/json")
+        self.assertEqual(resp.json()["details"]["path_loss_n_saved"], "false")
+        tower.refresh_from_db()
+        self.assertAlmostEqual(tower.path_loss_n, n)
+
+        # An implausible sample is clamped to 6 and only moves the stored exponent a quarter of the way.
+        resp = self.client.post("/api/v1/calibrate/", {**body, "tx": 150, "rsrp": -150}, content_type="application/json")
+        self.assertGreater(resp.json()["n_effective"], 6)
+        tower.refresh_from_db()
+        self.assertAlmostEqual(tower.path_loss_n, n + 0.25 * (6.0 - n))
+        self.assertEqual(resp.json()["details"]["path_loss_n"], f"{tower.path_loss_n:.4f}")
+
+        missing = {k: v for k, v in body.items() if k != "tower_id"}
+        self.assertEqual(self.client.post("/api/v1/calibrate/", missing, content_type="application/json").status_code, 400)
+
+
+class TowerImportTests(TestCase):
+    def setUp(self):
+        get_shared_tower_cache().clear()
+        get_locate_cache().clear()
+
+    def test_streaming_import_merges_across_chunks(self):
+        CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=1, lat=35.7, lon=51.4, samples=5)
+        CellTower.objects.create(mcc=432, mnc=11, lac=None, cell_id=2, lat=35.7, lon=51.4, samples=5)
+        csv_file = io.BytesIO(
+            b"mcc,mnc,lac,cell_id,lat,lon,samples\n"
+            b"432,11,10,1,35.71,51.41,5\n"  # verified
+            b"432,11,,2,35.72,51.42,9\n"  # updated_samples (NULL lac)
+            b"432,11,10,3,35.73,51.43,1\n"  # created
+            b"bad,11,10,4,35.7,51.4,1\n"
+            b"432,11,10,3,35.74,51.44,7\n"  # duplicate of a row created in an earlier chunk
+            b"432,11,10,1,35.71,51.41,2"  # skipped (fewer samples); no trailing newline
+        )
+        job_id = create_job()
+        result = import_towers_from_csv(csv_file, job_id=job_id, chunk_size=2)
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["updated"], 3)
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertTrue(result["errors"][0].startswith("خط 5:"))
+        towers = {t.cell_id: t for t in CellTower.objects.all()}
+        self.assertEqual(len(towers), 3)
+        self.assertEqual((towers[1].checked_count, towers[1].verified_count, towers[1].samples), (2, 1, 5))
+        self.assertEqual((towers[2].lat, towers[2].samples, towers[2].lac), (35.72, 9, None))
+        self.assertEqual((towers[3].lat, towers[3].checked_count), (35.73, 1))
+        job = get_job(job_id)
+        self.assertEqual((job["status"], job["processed_rows"], job["total_rows"]), ("SUCCESS", 6, 6))
+
+
+    def test_existing_lookup_matches_keys_exactly(self):
+        null_lac = CellTower.objects.create(mcc=432, mnc=11, lac=None, cell_id=5, lat=35.7, lon=51.4)
+        with_lac = CellTower.objects.create(mcc=432, mnc=11, lac=7, cell_id=5, lat=35.7, lon=51.4)
+        CellTower.objects.create(mcc=432, mnc=20, lac=7, cell_id=6, lat=35.7, lon=51.4)
+        rows = [
+            {"mcc": 432, "mnc": 11, "cell_id": 5, "lac": None},
+            {"mcc": 432, "mnc": 11, "cell_id": 5, "lac": 7},
+            {"mcc": 432, "mnc": 11, "cell_id": 5, "lac": 8},
+            {"mcc": 432, "mnc": 11, "cell_id": 6, "lac": 7},  # other network's cell
+        ]
+        lookup = _fetch_existing_lookup(rows)
+        self.assertEqual(
+            {key: tower.pk for key, tower in lookup.items()},
+            {(432, 11, 5, None): null_lac.pk, (432, 11, 5, 7): with_lac.pk},
+        )
+
+    def test_compressed_opencellid_dumps_with_filters(self):
+        import bz2
+        import gzip
+        import zipfile
+
+        dump = (
+            b"LTE,432,11,100,1001,12,51.41,35.71,1000,5,1,1459807904,1756266725,0\n"
+            b"GSM,432,11,100,1002,0,51.42,35.72,2000,3,1,1459807904,1756266725,0\n"
+            b"LTE,418,20,7,1003,44,44.36,33.31,900,4,1,1459807904,1756266725,0\n"
+            b"LTE,432,35,200,,5,51.43,35.73,800,2,0,1459807904,1756266725,0\n"  # line 4: no cell
+            b"LTE,432,35,200,1005,5,51.44,35.74,800,2,0,1459807904,1756266725,0\n"
+        )
+        zipped = io.BytesIO()
+        with zipfile.ZipFile(zipped, "w") as archive:
+            archive.writestr("README.txt", "OpenCellID export")
+            archive.writestr("cell_towers.csv", dump)
+        for name, payload in (("gzip", gzip.compress(dump)), ("bzip2", bz2.compress(dump)), ("zip", zipped.getvalue())):
+            with self.subTest(compression=name):
+                CellTower.objects.all().delete()
+                job_id = create_job()
+                # No counting pass: that would decompress the whole dump twice.
+                with mock.patch("cellular.utils.importers._count_data_rows") as count_rows:
+                    result = import_towers_from_csv(
+                        io.BytesIO(payload), dataset_source="OPENCELLID", mcc=[432], radio_types=["lte"], job_id=job_id
+                    )
+                count_rows.assert_not_called()
+                self.assertEqual((get_job(job_id)["processed_rows"], get_job(job_id)["total_rows"]), (5, 5))
+                self.assertEqual((result["created"], result["filtered"]), (2, 2))
+                self.assertEqual(len(result["errors"]), 1)
+                self.assertTrue(result["errors"][0].startswith("خط 4:"))
+                tower = CellTower.objects.get(cell_id=1001)
+                self.assertEqual(
+                    (tower.radio_type, tower.mnc, tower.lac, tower.pci, tower.range_m, tower.samples, tower.lat, tower.lon),
+                    ("lte", 11, 100, 12, 1000, 5, 35.71, 51.41),
+                )
+                self.assertTrue(tower.is_approximate)
+                self.assertFalse(CellTower.objects.get(cell_id=1005).is_approximate)
+
+    def test_parallel_parse_matches_serial_import(self):
+        import gzip
+
+        lines = ["mcc,mnc,lac,cell_id,lat,lon,samples"]
+        for i in range(1, 41):
+            if i % 9 == 0:
+                lines.append(f"432,11,10,{i},not-a-lat,51.4,1")
+            elif i == 20:
+                lines.append("")  # blank lines still count for error line numbers
+            else:
+                lines.append(f"432,{11 if i % 2 else 35},10,{i},35.{i:02d},51.4,{i}")
+        payload = ("\n".join(lines) + "\n").encode()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "towers.csv")
+        with open(path, "wb") as f:
+            f.write(payload)
+
+        def run(source, **kwargs):
+            CellTower.objects.all().delete()
+            result = import_towers_from_csv(source, chunk_size=4, mnc=[11, 35], **kwargs)
+            return result, sorted(CellTower.objects.values_list("mnc", "cell_id", "lat", "samples"))
+
+        expected = run(io.BytesIO(payload))
+        self.assertEqual([e.split(":")[0] for e in expected[0]["errors"]], ["خط 10", "خط 19", "خط 28", "خط 37"])
+        # Byte ranges of ~4 rows, cut mid-line.
+        with open(path, "rb") as f, mock.patch("cellular.utils.import_workers._MIN_RANGE_BYTES", 1):
+            self.assertEqual(run(f, workers=2, path=path), expected)
+        # Without an explicit path (`.name` is not trusted) and for compressed input,
+        # the workers get line batches.
+        with open(path, "rb") as f, mock.patch("cellular.utils.import_workers._byte_ranges") as byte_ranges:
+            self.assertEqual(run(f, workers=2), expected)
+        byte_ranges.assert_not_called()
+        self.assertEqual(run(io.BytesIO(gzip.compress(payload)), workers=2), expected)
+
+    def test_parallel_parse_outside_the_main_thread_does_not_fork(self):
+        payload = b"mcc,mnc,lac,cell_id,lat,lon\n" + b"".join(b"432,11,10,%d,35.7,51.4\n" % i for i in range(1, 9))
+        outcome = {}
+
+        def job():
+            from cellular.utils.import_workers import _mp_context, iter_parallel_chunks
+
+            outcome["start_method"] = _mp_context().get_start_method()
+            text = io.StringIO(payload.decode())
+            fieldnames = text.readline().strip().split(",")
+            chunks = iter_parallel_chunks(
+                None, text, fieldnames, has_header=True, dataset_source="OTHER", chunk_size=3, filters={}, workers=2
+            )
+            outcome["rows"] = [row["cell_id"] for rows, _read, _errors, _filtered in chunks for row in rows]
+
+        thread = threading.Thread(target=job)  # like ImportStartView
+        thread.start()
+        thread.join()
+        self.assertIn(outcome["start_method"], ("forkserver", "spawn"))
+        self.assertEqual(outcome["rows"], list(range(1, 9)))
+
+    def test_copy_engine_is_used_only_on_postgres(self):
+        csv_text = "mcc,mnc,lac,cell_id,lat,lon\n432,11,1,1,35.7,51.4\n432,11,1,2,35.7,51.4\n"
+        with mock.patch("cellular.utils.importers.merge_chunk_copy") as copy_merge:
+            result = import_towers_from_csv(io.StringIO(csv_text))
+            copy_merge.assert_not_called()
+            self.assertEqual(result["created"], 2)
+
+            copy_merge.return_value = (1, [7, 7])
+            with mock.patch("cellular.utils.importers.connection", mock.Mock(vendor="postgresql")):
+                result = import_towers_from_csv(io.StringIO(csv_text))
+            self.assertEqual((result["created"], result["updated"]), (1, 1))
+            rows = copy_merge.call_args.args[0]
+            self.assertEqual([r["cell_id"] for r in rows], [1, 2])
+            with override_settings(TOWER_IMPORT={"PG_COPY": False}), mock.patch(
+                "cellular.utils.importers.connection", mock.Mock(vendor="postgresql")
+            ):
+                import_towers_from_csv(io.StringIO(csv_text))
+            self.assertEqual(copy_merge.call_count, 1)
+
+    def _assert_merge_rules(self):
+        """
+        Both merge engines: created / updated_samples / verified / skipped, NULL lac, duplicates
+        across chunks, towers created by others during the run.
+        """
+        from cellular.utils.import_jobs import create_job, get_job
+
+        null_lac = CellTower.objects.create(mcc=432, mnc=11, lac=None, cell_id=1, lat=35.70, lon=51.40, samples=5)
+        other_lac = CellTower.objects.create(mcc=432, mnc=11, lac=9, cell_id=1, lat=35.70, lon=51.40, samples=5)
+        twice = CellTower.objects.create(mcc=432, mnc=11, lac=1, cell_id=2, lat=35.70, lon=51.40, samples=5)
+        fewer = CellTower.objects.create(mcc=432, mnc=11, lac=2, cell_id=3, lat=35.70, lon=51.40, samples=5)
+        # Created while the import runs (e.g. by a live provider lookup): a tower like any other.
+        live = CellTower.objects.create(mcc=432, mnc=11, lac=6, cell_id=6, lat=35.70, lon=51.40, samples=1)
+        CellTower.objects.filter(pk=live.pk).update(created_at=timezone.now() + timedelta(hours=1))
+        csv_text = (
+            "mcc,mnc,lac,cell_id,lat,lon,samples\n"
+            "432,11,,1,35.80,51.40,7\n"  # chunk 1: updated_samples (NULL lac only)
+            "432,11,3,4,35.60,51.40,1\n"  # created
+            "432,11,3,4,35.61,51.40,1\n"  # chunk 2: created by chunk 1, skipped
+            "432,11,1,2,35.71,51.40,5\n"  # verified
+            "432,11,1,2,35.72,51.40,5\n"  # chunk 3: verified again
+            "432,11,1,2,35.90,51.40,6\n"  # updated_samples
+            "432,11,1,2,35.91,51.40,6\n"  # chunk 4: verified against 6
+            "432,11,2,3,35.50,51.40,3\n"  # skipped
+            "432,11,5,5,35.55,51.40,2\n"  # chunk 5: created, first row wins
+            "432,11,5,5,35.56,51.40,8\n"
+            "432,11,6,6,35.40,51.40,9\n"  # chunk 6: updated_samples
+        )
+        job_id = create_job()
+        with mock.patch("cellular.utils.importers.PROGRESS_UPDATE_SIZE", 1):
+            result = import_towers_from_csv(io.StringIO(csv_text), chunk_size=2, job_id=job_id)
+
+        self.assertEqual((result["created"], result["updated"], result["errors"]), (2, 6, []))
+        self.assertEqual(
+            [u["action"] for u in get_job(job_id)["last_updates"]],
+            [
+                "updated_samples", "created", "verified", "verified", "updated_samples", "verified", "skipped", "created",
+                "updated_samples",
+            ],
+        )
+        rows = lambda tower: CellTower.objects.filter(pk=tower.pk).values_list("lat", "samples", "checked_count", "verified_count").get()  # noqa: E731
+        self.assertEqual(rows(null_lac), (35.80, 7, 1, 0))
+        self.assertEqual(rows(other_lac), (35.70, 5, 0, 0))
+        self.assertEqual(rows(twice), (35.90, 6, 4, 3))
+        self.assertEqual(rows(fewer), (35.70, 5, 1, 0))
+        self.assertEqual(rows(live), (35.40, 9, 1, 0))
+        self.assertEqual(
+            list(CellTower.objects.filter(cell_id__in=(4, 5)).order_by("cell_id").values_list("lat", "checked_count")),
+            [(35.60, 1), (35.55, 1)],
+        )
+
+    def test_merge_rules_with_duplicate_rows(self):
+        with override_settings(TOWER_IMPORT={"PG_COPY": False}):
+            self._assert_merge_rules()
+
+    @skipUnless(connection.vendor == "postgresql", "COPY merge needs PostgreSQL")
+    def test_copy_merge_follows_the_same_rules(self):
+        from cellular.utils import importers
+
+        with mock.patch("cellular.utils.importers.merge_chunk_copy", wraps=importers.merge_chunk_copy) as copy_merge:
+            self._assert_merge_rules()
+        self.assertEqual(copy_merge.call_count, 6)
+
+
+class LocateCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.towers = [
+            CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=cell_id, lat=lat, lon=lon)
+            for cell_id, lat, lon in ((1, 35.70, 51.40), (2, 35.71, 51.40), (3, 35.70, 51.415))
+        ]
+
+    def setUp(self):
+        get_shared_tower_cache().clear()
+        get_locate_cache().clear()
+
+    @staticmethod
+    def _report(rsrp=-90, order=(1, 2, 3)):
+        return [{"mcc": 432, "mnc": 11, "lac": 10, "cellId": cid, "signalStrength": rsrp - 2 * cid} for cid in order]
+
+    def test_repeated_report_is_served_from_cache(self):
+        first = locate_cells(self._report(-90), allow_external_serving=False)
+        with mock.patch("cellular.services.locator._locate_resolved") as solve:
+            again = locate_cells(self._report(-89.5, order=(3, 1, 2)), allow_external_serving=False)
+        solve.assert_not_called()
+        self.assertEqual(again, first)
+
+        again["location"]["lat"] = 0.0  # callers get their own copy
+        self.assertEqual(locate_cells(self._report(-90), allow_external_serving=False), first)
+        self.assertEqual(get_locate_cache().stats()["hits"], 2)
+
+        moved = locate_cells(self._report(-84), allow_external_serving=False)
+        self.assertNotEqual(moved, first)
+
+    def test_tower_changes_invalidate_cached_results(self):
+        single = [{"mcc": 432, "mnc": 11, "lac": 10, "cellId": 1, "signalStrength": -91}]
+        first = locate_cells(single, allow_external_serving=False)
+        tower = self.towers[0]
+        tower.lat = 35.69
+        tower.save()
+        self.assertEqual(len(get_locate_cache()), 0)
+        moved = locate_cells(single, allow_external_serving=False)
+        self.assertAlmostEqual(moved["location"]["lat"] - first["location"]["lat"], -0.01, places=6)
+
+        # Bulk paths bypass signals and invalidate explicitly (imports, write-behind, index refresh).
+        CellTower.objects.filter(pk=tower.pk).update(lat=35.68)
+        invalidate_locate_results([tower.pk])
+        again = locate_cells(single, allow_external_serving=False)
+        self.assertAlmostEqual(again["location"]["lat"] - first["location"]["lat"], -0.02, places=6)
+
+        # A cache hit reports this report's signal, not the cached one.
+        hit = locate_cells([{**single[0], "signalStrength": -91.5}], allow_external_serving=False)
+        self.assertEqual(hit["location"], again["location"])
+        self.assertEqual(hit["debug"]["signal"], -91.5)
+
+        tower.delete()
+        with self.assertRaises(ValueError):
+            locate_cells(single, allow_external_serving=False)
+
+        locate_cells(self._report(order=(2, 3)), allow_external_serving=False)
+        with override_settings(TOWER_WRITE_BEHIND={"ENABLED": True, "FLUSH_INTERVAL_S": 0}):
+            get_write_buffer().record(self.towers[1].pk, checked=1)
+            get_write_buffer().flush()
+        self.assertEqual(len(get_locate_cache()), 0)
+
+        # A result computed across an invalidation is not stored.
+        cache = get_locate_cache()
+        epoch = cache.epoch
+        invalidate_locate_results([self.towers[2].pk])
+        cache.store(("k",), {"x": 1}, epoch=epoch)
+        self.assertEqual(len(cache), 0)
+
+
+class TrilaterationTests(TestCase):
+    TRUE = (35.7050, 51.4070)
+
+    def _towers(self, n, *, noise_m=0.0, seed=0):
+        rng = np.random.default_rng(seed)
+        towers = []
+        for k in range(n):
+            bearing = 360.0 * k / n + 7.0
+            dist = 600.0 + 150.0 * k
+            p = calculate_new_coordinates(*self.TRUE, dist, bearing)
+            towers.append({"lat": p["lat"], "lon": p["lon"], "radius": dist + rng.normal(0, noise_m), "rsrp": -80 - k})
+        return towers
+
+    def test_nlls_uses_every_tower(self):
+        for n in (3, 5, 12):
+            with self.subTest(n=n):
+                lat, lon = trilaterate_nlls(self._towers(n))
+                self.assertLess(haversine_distance(lat, lon, *self.TRUE), 1.0)
+        # Extra towers average out range noise.
+        few = trilaterate_nlls(self._towers(3, noise_m=60, seed=1))
+        many = trilaterate_nlls(self._towers(40, noise_m=60, seed=1))
+        self.assertLess(haversine_distance(*many, *self.TRUE), haversine_distance(*few, *self.TRUE))
+        self.assertIsNone(trilaterate_nlls(self._towers(2)))
+
+    def test_padded_batch_matches_individual_solves(self):
+        problems = [self._towers(n, noise_m=30, seed=n) for n in (3, 7, 4, 2)]
+        width = max(len(p) for p in problems)
+        shape = (len(problems), width)
+        lat, lon, radius, weight = (np.full(shape, np.nan) for _ in range(4))
+        mask = np.zeros(shape, dtype=bool)
+        for i, towers in enumerate(problems):
+            k = len(towers)
+            lat[i, :k] = [t["lat"] for t in towers]
+            lon[i, :k] = [t["lon"] for t in towers]
+            radius[i, :k] = [t["radius"] for t in towers]
+            weight[i, :k] = [tower_weight(t) for t in towers]
+            mask[i, :k] = True
+
+        b_lat, b_lon, ok = trilaterate_nlls_many(lat, lon, radius, weight, mask)
+        self.assertEqual(ok.tolist(), [True, True, True, False])
+        for i, towers in enumerate(problems[:3]):
+            s_lat, s_lon = trilaterate_nlls(towers)
+            self.assertAlmostEqual(b_lat[i], s_lat, places=9)
+            self.assertAlmostEqual(b_lon[i], s_lon, places=9)
+
+    def test_warm_start_reaches_the_same_fix(self):
+        towers = self._towers(6, noise_m=40, seed=3)
+        cold = trilaterate_nlls(towers)
+        near = calculate_new_coordinates(*cold, 80.0, 45.0)
+        warm = trilaterate_nlls(towers, initial=(near["lat"], near["lon"]))
+        self.assertLess(haversine_distance(*cold, *warm), 0.5)
+
+
+class GeometryKernelEquivalenceTests(TestCase):
+    """Every array kernel against its scalar counterpart on the same inputs."""
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        n = 300
+        self.lat1 = rng.uniform(25.0, 40.0, n)
+        self.lon1 = rng.uniform(44.0, 63.0, n)
+        self.lat2 = self.lat1 + rng.uniform(-0.05, 0.05, n)
+        self.lon2 = self.lon1 + rng.uniform(-0.05, 0.05, n)
+        self.rng = rng
+
+    def assertMatches(self, got, expected, atol=1e-7):
+        got, expected = np.asarray(got, dtype=float), np.asarray(expected, dtype=float)
+        self.assertEqual(got.shape, expected.shape)
+        np.testing.assert_allclose(got, expected, rtol=0, atol=atol, equal_nan=True)
+
+    def test_point_kernels(self):
+        pairs = list(zip(self.lat1, self.lon1, self.lat2, self.lon2))
+        self.assertMatches(haversine_many(self.lat1, self.lon1, self.lat2, self.lon2), [haversine_distance(*p) for p in pairs])
+        self.assertMatches(
+            bearing_many(self.lat1, self.lon1, self.lat2, self.lon2), [calculate_bearing_between_coords(*p) for p in pairs]
+        )
+        dist = self.rng.uniform(0, 20000, len(self.lat1))
+        brng = self.rng.uniform(0, 360, len(self.lat1))
+        lat, lon = destination_many(self.lat1, self.lon1, dist, brng)
+        expected = [calculate_new_coordinates(*p) for p in zip(self.lat1, self.lon1, dist, brng)]
+        self.assertMatches(lat, [e["lat"] for e in expected], atol=1e-10)
+        self.assertMatches(lon, [e["lon"] for e in expected], atol=1e-10)
+
+    def test_kernels_broadcast(self):
+        # One reference point against many, and (B, 1) against (B, K).
+        self.assertMatches(
+            haversine_many(35.7, 51.4, self.lat2, self.lon2),
+            [haversine_distance(35.7, 51.4, a, b) for a, b in zip(self.lat2, self.lon2)],
+        )
+        grid_lat = self.lat2.reshape(-1, 3)
+        grid_lon = self.lon2.reshape(-1, 3)
+        ref_lat, ref_lon = self.lat1[::3, None], self.lon1[::3, None]
+        got = bearing_many(ref_lat, ref_lon, grid_lat, grid_lon)
+        self.assertEqual(got.shape, grid_lat.shape)
+        self.assertAlmostEqual(
+            got[4, 2], calculate_bearing_between_coords(ref_lat[4, 0], ref_lon[4, 0], grid_lat[4, 2], grid_lon[4, 2]), places=9
+        )
+        lat, _lon = destination_many(35.7, 51.4, [[100.0], [200.0]], [0.0, 90.0, 180.0])
+        self.assertEqual(lat.shape, (2, 3))
+
+    def test_signal_kernels(self):
+        rsrp = [-140, -120.5, -101, -90, -70, -44, None]
+        tx = [40, None, 46, 43, None, 42, 40]
+        n = [None, 3.1, None, 2.2, None, None, None]
+        ref = [None, None, 85.5, None, 70.0, None, None]
+        nan = lambda values: [np.nan if v is None else v for v in values]  # noqa: E731
+        self.assertMatches(
+            calculate_distance_many(nan(rsrp), nan(tx), nan(n), nan(ref)),
+            [calculate_distance(*p) for p in zip(rsrp, tx, n, ref)],
+            atol=1e-6,
+        )
+        ta = [None, -1, 0, 5, 1282, 20000]
+        self.assertMatches(distance_from_ta_many(nan(ta)), nan([distance_from_ta(t) for t in ta]))
+        cells = [1, 2, 3, 255, 256, 0x1A2B3C4D]
+        self.assertMatches(estimate_bearing_many(cells), [estimate_bearing(c) for c in cells])
+        rsrq = [-10, None, -3, -20, None, -0.5, -7]
+        self.assertMatches(
+            tower_weight_many(nan(rsrp), nan(rsrq)),
+            [tower_weight({"rsrp": a, "rsrq": b}) for a, b in zip(rsrp, rsrq)],
+        )
+
+    def test_local_projector(self):
+        frame = LocalProjector(35.7, 51.4)
+        x, y = frame.project(self.lat2, self.lon2)
+        lat, lon = frame.unproject(x, y)
+        self.assertMatches(lat, self.lat2, atol=1e-12)
+        self.assertMatches(lon, self.lon2, atol=1e-12)
+        # Plane distances from the origin agree with haversine over a few km.
+        near_lat, near_lon = 35.7 + self.rng.uniform(-0.03, 0.03, 50), 51.4 + self.rng.uniform(-0.03, 0.03, 50)
+        x, y = frame.project(near_lat, near_lon)
+        self.assertMatches(np.hypot(x, y), haversine_many(35.7, 51.4, near_lat, near_lon), atol=1.0)
+        # A (B, 1) origin gives each row its own frame, matching the scalar projector.
+        rows = LocalProjector(self.lat1[::3, None], self.lon1[::3, None])
+        gx, gy = rows.project(self.lat2.reshape(-1, 3), self.lon2.reshape(-1, 3))
+        sx, sy = LocalProjector(self.lat1[6], self.lon1[6]).project(self.lat2[7], self.lon2[7])
+        self.assertAlmostEqual(gx[2, 1], sx, places=6)
+        self.assertAlmostEqual(gy[2, 1], sy, places=6)
+
+    def test_circle_intersections_lie_on_both_circles(self):
+        for r1, r2 in ((1500.0, 1200.0), (800.0, 1000.0)):
+            points = find_circle_intersections(35.70, 51.40, r1, 35.71, 51.41, r2)
+            self.assertEqual(len(points), 2)
+            for point in points:
+                self.assertAlmostEqual(haversine_distance(35.70, 51.40, point["lat"], point["lon"]), r1, delta=2.0)
+                self.assertAlmostEqual(haversine_distance(35.71, 51.41, point["lat"], point["lon"]), r2, delta=2.0)
+
+    def test_centroid_and_two_tower_kernels(self):
+        towers = [
+            [{"lat": float(a), "lon": float(b), "rsrp": float(c)} for a, b, c in zip(*row)]
+            for row in zip(self.lat1.reshape(-1, 4), self.lon1.reshape(-1, 4), self.rng.uniform(-120, -60, (75, 4)))
+        ]
+        mask = np.ones((75, 4), dtype=bool)
+        mask[::2, 3] = False  # ragged rows
+        lat = np.array([[t["lat"] for t in row] for row in towers])
+        lon = np.array([[t["lon"] for t in row] for row in towers])
+        rsrp = np.array([[t["rsrp"] for t in row] for row in towers])
+        c_lat, c_lon = weighted_centroid_many(lat, lon, rsrp_weight_many(rsrp), mask)
+        expected = [weighted_centroid(row[: int(m.sum())]) for row, m in zip(towers, mask)]
+        self.assertMatches(c_lat, [e["lat"] for e in expected], atol=1e-10)
+        self.assertMatches(c_lon, [e["lon"] for e in expected], atol=1e-10)
+
+        # Radii chosen so some pairs intersect and some do not.
+        r1 = self.rng.uniform(200, 6000, len(self.lat1))
+        r2 = self.rng.uniform(200, 6000, len(self.lat1))
+        cand_lat, cand_lon, hit = find_circle_intersections_many(self.lat1, self.lon1, r1, self.lat2, self.lon2, r2)
+        self.assertTrue(hit.any() and not hit.all())
+        cells = self.rng.integers(1, 1 << 28, (len(self.lat1), 2))
+        got_lat, got_lon = trilaterate_two_many(
+            self.lat1, self.lon1, r1, self.lat2, self.lon2, r2,
+            sector1=estimate_bearing_many(cells[:, 0]), sector2=estimate_bearing_many(cells[:, 1]),
+        )
+        for i in range(len(self.lat1)):
+            points = find_circle_intersections(self.lat1[i], self.lon1[i], r1[i], self.lat2[i], self.lon2[i], r2[i])
+            self.assertEqual(bool(points), bool(hit[i]))
+            if points:
+                self.assertMatches(cand_lat[:, i], [p["lat"] for p in points], atol=1e-10)
+                self.assertMatches(cand_lon[:, i], [p["lon"] for p in points], atol=1e-10)
+            best = trilaterate_two_towers(
+                {"lat": self.lat1[i], "lon": self.lon1[i], "radius": r1[i], "cellId": int(cells[i, 0])},
+                {"lat": self.lat2[i], "lon": self.lon2[i], "radius": r2[i], "cellId": int(cells[i, 1])},
+            )
+            self.assertAlmostEqual(got_lat[i], best["lat"], places=10)
+            self.assertAlmostEqual(got_lon[i], best["lon"], places=10)
+
+    def test_bench_command_reports_every_kernel(self):
+        out = io.StringIO()
+        call_command("bench_geometry", "--size", "200", "--repeat", "1", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2 + 6)
+        for line in lines[2:]:
+            self.assertLess(float(line.split()[-1]), 1e-6)
+
+
+class TrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for cell_id, lat, lon in ((1, 35.70, 51.40), (2, 35.71, 51.40), (3, 35.70, 51.415)):
+            CellTower.objects.create(mcc=432, mnc=11, lac=10, cell_id=cell_id, lat=lat, lon=lon)
+
+    def setUp(self):
+        get_shared_tower_cache().clear()
+        get_locate_cache().clear()
+        get_device_tracker().clear()
+
+    def test_filter_smooths_noisy_fixes_and_estimates_velocity(self):
+        tracker = get_device_tracker()
+        rng = np.random.default_rng(0)
+        raw_err, filtered_err, speeds = [], [], []
+        for k in range(60):
+            # 10 m/s due east, fixes every 5 s with 150 m noise.
+            truth = calculate_new_coordinates(35.70, 51.40, 50.0 * k, 90.0)
+            fix = calculate_new_coordinates(truth["lat"], truth["lon"], abs(rng.normal(0, 150)), rng.uniform(0, 360))
+            state = tracker.update("dev", fix["lat"], fix["lon"], 150.0, 1000.0 + 5 * k)
+            if k >= 10:
+                raw_err.append(haversine_distance(fix["lat"], fix["lon"], truth["lat"], truth["lon"]))
+                filtered_err.append(haversine_distance(state["lat"], state["lon"], truth["lat"], truth["lon"]))
+                speeds.append(state["speed_mps"])
+        self.assertLess(np.mean(filtered_err), 0.8 * np.mean(raw_err))
+        self.assertAlmostEqual(np.mean(speeds), 10.0, delta=2.5)
+        self.assertAlmostEqual(state["heading"], 90.0, delta=30.0)
+
+    def test_outliers_are_gated_then_the_track_restarts(self):
+        tracker = get_device_tracker()
+        for k in range(5):
+            tracker.update("dev", 35.70, 51.40, 50.0, 1000.0 + k)
+        far = calculate_new_coordinates(35.70, 51.40, 5000.0, 0.0)
+        statuses = [tracker.update("dev", far["lat"], far["lon"], 50.0, 1010.0 + k)["status"] for k in range(3)]
+        self.assertEqual(statuses, ["outlier", "outlier", "restarted"])
+        self.assertEqual(tracker.update("dev", 35.70, 51.40, 50.0, 5000.0)["status"], "started")
+
+    def test_endpoint_tracks_by_device_id(self):
+        cells = [{"mcc": 432, "mnc": 11, "lac": 10, "cellId": cid, "signalStrength": -90 - 3 * cid} for cid in (1, 2, 3)]
+        url = "/api/v1/locate/"
+        first = self.client.post(url, {"cells": cells, "device_id": "truck-7"}, content_type="application/json").json()
+        second = self.client.post(url, {"cells": cells, "device_id": "truck-7"}, content_type="application/json").json()
+        self.assertEqual(first["tracking"]["status"], "started")
+        self.assertEqual(second["tracking"]["status"], "updated")
+        self.assertEqual(second["tracking"]["updates"], 2)
+        self.assertLess(second["radius"], second["tracking"]["raw_radius"])
+
+        plain = self.client.post(url, {"cells": cells}, content_type="application/json").json()
+        self.assertNotIn("tracking", plain)
+        self.assertEqual(plain["location"], locate_cells(cells)["location"])
+
+
+class _CountingProvider:
+    name = "FAKE"
+    dataset_source = "OTHER"
+
+    def __init__(self, result=None, *, name="FAKE", delay_s=0.0):
+        self.name = name
+        self.result = result
+        self.delay_s = delay_s
+        self.calls = 0
+
+    def lookup(self, **kwargs):
+        self.calls += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return self.result
+
+
+class _BatchProvider(_CountingProvider):
+    max_batch_size = 10
+
+    def lookup_many(self, cells, *, timeout_s):
+        self.calls += 1
+        return [_fix(35.0 + cell["cell_id"] / 1e5, 51.0, 500) for cell in cells]
+
+
+class _AsyncCountingProvider(_CountingProvider):
+    async def alookup(self, **kwargs):
+        self.calls += 1
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        return self.result
+
+
+def _fix(lat, lon, accuracy_m):
+    return ProviderLookup(lat=lat, lon=lon, accuracy_m=accuracy_m, raw={}, request_url="", request_body={})
+
+
+class ProviderFanoutTests(TestCase):
+    CELL = {"mcc": 432, "mnc": 35, "lac": 7, "cell_id": 5150, "radio_type": "lte", "signal_strength": -90}
+    BASE = {"HEDGE_DELAY_S": 0.05, "DEADLINE_S": 2.0, "PICK": "first", "TIMEOUT_S": 1.0, "MAX_WORKERS": 4}
+
+    def test_hedged_mode_does_not_wait_for_a_slow_first_provider(self):
+        slow = _CountingProvider(_fix(35.0, 51.0, 500), name="SLOW", delay_s=0.5)
+        fast = _CountingProvider(_fix(35.1, 51.1, 900), name="FAST")
+        started = time.monotonic()
+        chosen, attempts = query_providers([slow, fast], self.CELL, config={**self.BASE, "MODE": "hedged"})
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(chosen.provider_name, "FAST")
+        self.assertEqual(
+            sorted((a.provider_name, a.outcome, a.error) for a in attempts),
+            [("FAST", None, None), ("SLOW", LookupOutcome.ABANDONED, None)],
+        )
+
+    def test_providers_abandoned_after_an_answer_are_not_failures(self):
+        resolver = TowerResolver()
+        resolver._providers = [
+            _CountingProvider(_fix(35.4, 51.4, 300), name="SLOW", delay_s=0.5),
+            _CountingProvider(_fix(35.5, 51.5, 300), name="FAST"),
+        ]
+        with override_settings(TOWER_PROVIDER_FANOUT={**self.BASE, "MODE": "hedged"}):
+            with self.assertNoLogs("cellular.services.tower_resolver", level="ERROR"):
+                res = resolver.resolve(allow_external=True, **self.CELL)
+        self.assertEqual(res.source, "FAST")
+        self.assertEqual(
+            sorted(TowerLookupLog.objects.values_list("provider", "success", "error")),
+            [("FAST", True, None), ("SLOW", False, LookupOutcome.ABANDONED)],
+        )
+
+        # Nobody answered before the deadline: a real timeout.
+        slow = _CountingProvider(_fix(35.4, 51.4, 300), name="SLOW", delay_s=0.3)
+        empty = _CountingProvider(None, name="EMPTY")
+        chosen, attempts = query_providers(
+            [slow, empty], self.CELL, config={**self.BASE, "MODE": "parallel", "DEADLINE_S": 0.1}
+        )
+        self.assertIsNone(chosen)
+        self.assertEqual(
+            sorted((a.provider_name, a.outcome) for a in attempts),
+            [("EMPTY", LookupOutcome.NOT_FOUND), ("SLOW", LookupOutcome.TIMEOUT)],
+        )
+
+    def test_parallel_most_accurate_waits_for_the_best_answer(self):
+        coarse = _CountingProvider(_fix(35.0, 51.0, 2000), name="COARSE")
+        fine = _CountingProvider(_fix(35.1, 51.1, 150), name="FINE", delay_s=0.1)
+        chosen, attempts = query_providers(
+            [coarse, fine], self.CELL, config={**self.BASE, "MODE": "parallel", "PICK": "most_accurate"}
+        )
+        self.assertEqual(chosen.provider_name, "FINE")
+        self.assertEqual(len(attempts), 2)
+
+    def test_resolver_logs_every_provider_outcome(self):
+        resolver = TowerResolver()
+        resolver._providers = [
+            _CountingProvider(None, name="EMPTY"),
+            _CountingProvider(_fix(35.2, 51.2, 300), name="GOOD", delay_s=0.05),
+        ]
+        with override_settings(TOWER_PROVIDER_FANOUT={**self.BASE, "MODE": "parallel"}):
+            res = resolver.resolve(allow_external=True, **self.CELL)
+        self.assertEqual(res.source, "GOOD")
+        self.assertEqual((res.tower.lat, res.tower.lon), (35.2, 51.2))
+        self.assertEqual(
+            sorted(TowerLookupLog.objects.values_list("provider", "success")),
+            [("EMPTY", False), ("GOOD", True)],
+        )
+
+    def test_resolve_many_looks_up_unknown_cells_together(self):
+        cells = [{"mcc": 432, "mnc": 35, "lac": 9, "cell_id": 7100 + i, "allow_external": True} for i in range(4)]
+        single = _CountingProvider(_fix(35.6, 51.6, 300), name="SINGLE", delay_s=0.1)
+        resolver = TowerResolver()
+        resolver._providers = [single]
+        started = time.monotonic()
+        results = resolver.resolve_many(cells)
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual((single.calls, {r.source for r in results}), (4, {"SINGLE"}))
+
+        batch = _BatchProvider(name="BATCH")
+        resolver = TowerResolver()
+        resolver._providers = [_CountingProvider(None, name="EMPTY"), batch]
+        cells = [{**cell, "cell_id": cell["cell_id"] + 100} for cell in cells]
+        results = resolver.resolve_many(cells)
+        self.assertEqual(batch.calls, 1)
+        self.assertEqual([r.tower.lat for r in results], [35.0 + c["cell_id"] / 1e5 for c in cells])
+        self.assertEqual(TowerLookupLog.objects.filter(provider="EMPTY", success=False).count(), 4)
+
+    async def test_async_resolver_runs_external_lookups_concurrently(self):
+        provider = _AsyncCountingProvider(_fix(35.3, 51.3, 400), name="ASYNC", delay_s=0.2)
+        resolver = AsyncTowerResolver()
+        resolver._providers = [provider]
+        cells = [{"mcc": 432, "mnc": 35, "lac": 9, "cell_id": 7000 + i, "allow_external": True} for i in range(5)]
+        started = time.monotonic()
+        results = await resolver.aresolve_many(cells)
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(provider.calls, 5)
+        self.assertEqual({r.source for r in results}, {"ASYNC"})
+        self.assertEqual(await CellTower.objects.filter(cell_id__gte=7000, cell_id__lt=7005).acount(), 5)
+
+
+@override_settings(TOWER_WRITE_BEHIND={"ENABLED": True, "FLUSH_INTERVAL_S": 0, "MAX_PENDING": 1000})
+class WriteBehindTests(TestCase):
+    def test_known_tower_updates_are_buffered_then_flushed_in_one_update(self):
+        hot = CellTower.objects.create(mcc=432, mnc=35, lac=7, cell_id=5150, lat=35.0, lon=51.0, checked_count=3)
+        attempt = ProviderAttempt(provider=_CountingProvider(name="GOOD"), lookup=_fix(35.5, 51.5, 700))
+        ids = {"mcc": 432, "mnc": 35, "lac": 7, "cell_id": 5150, "pci": None, "earfcn": None}
+        for _ in range(2):
+            with self.assertNumQueries(1):  # the get() of get_or_create, no UPDATE
+                tower = TowerResolver._upsert_from_lookup(attempt, radio_type="LTE", **ids)
+            self.assertEqual(tower.pk, hot.pk)
+
+        hot.refresh_from_db()
+        self.assertEqual((hot.lat, hot.checked_count), (35.0, 3))
+        with self.assertNumQueries(1):
+            self.assertEqual(get_write_buffer().flush(), 1)
+        hot.refresh_from_db()
+        self.assertEqual((hot.lat, hot.lon, hot.range_m, hot.checked_count), (35.5, 51.5, 700, 5))
+
+    def test_flush_keeps_manual_edits_made_after_buffering(self):
+        tower = CellTower.objects.create(mcc=432, mnc=35, lac=7, cell_id=5151, lat=35.0, lon=51.0, checked_count=1)
+        get_write_buffer().record(tower.pk, checked=1, fields={"lat": 35.5, "lon": 51.5, "source": "COMBAIN"})
+        CellTower.objects.filter(pk=tower.pk).update(lat=35.2, lon=51.2, source=DatasetSource.MANUAL)
+
+        self.assertEqual(get_write_buffer().flush(), 1)
+        tower.refresh_from_db()
+        self.assertEqual((tower.lat, tower.lon, tower.source, tower.checked_count), (35.2, 51.2, DatasetSource.MANUAL, 2))
+
+    def test_disabled_by_default(self):
+        with override_settings(TOWER_WRITE_BEHIND={}):
+            self.assertIsNone(get_write_buffer())
+
+
+class NegativeLookupCacheTests(TestCase):
+    def setUp(self):
+        get_negative_lookup_cache().clear()
+
+    def test_failed_external_lookup_is_not_repeated(self):
+        provider = _CountingProvider(result=None)
+        cell = {"mcc": 432, "mnc": 35, "cell_id": 424242, "lac": 7, "allow_external": True}
+        for signal in (-80, -90):
+            resolver = TowerResolver()
+            resolver._providers = [provider]
+            self.assertIsNone(resolver.resolve(signal_strength=signal, **cell).tower)
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(get_negative_lookup_cache().get((432, 35, 424242, 7)), "NOT_FOUND")
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        def slow_lookup():
+            calls.append(1)
+            time.sleep(0.1)
+            return "tower"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do(("k",), slow_lookup))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["tower"] * 5)
+        self.assertEqual(flight.stats()["coalesced"], 4)
+
+    def test_distributed_lock_waits_for_other_process(self):
+        flight = SingleFlight({"DISTRIBUTED": True, "POLL_S": 0.01, "WAIT_S": 2.0})
+        lock_key = flight._lock_key((432, 35, 7, 5150))
+        cache.set(lock_key, "other-process", 30)
+        threading.Timer(0.05, cache.delete, args=(lock_key,)).start()
+        result = flight.do((432, 35, 7, 5150), lambda: "provider", on_remote_done=lambda: "stored-by-other")
+        self.assertEqual(result, "stored-by-other")
+        self.assertIsNone(cache.get(lock_key))
+
+    def test_distributed_batch_waits_for_foreign_locks_together(self):
+        flight = SingleFlight({"DISTRIBUTED": True, "POLL_S": 0.01, "WAIT_S": 0.3})
+        keys = [(432, 35, 7, 5200 + i) for i in range(4)]
+        for key in keys[1:]:
+            cache.set(flight._lock_key(key), "other-process", 30)
+        threading.Timer(0.05, cache.delete, args=(flight._lock_key(keys[1]),)).start()
+        led = []
+
+        def lookup_many(batch):
+            led.append(list(batch))
+            return {key: "provider" for key in batch}
+
+        started = time.monotonic()
+        with self.assertLogs("cellular.services.singleflight", level="WARNING"):
+            results = flight.do_many(keys, lookup_many, on_remote_done=lambda key: "stored-by-other")
+        # Two keys stay locked: both give up at the same deadline, not one after the other.
+        self.assertLess(time.monotonic() - started, 0.55)
+        self.assertEqual(led, [[keys[0]], keys[2:]])
+        self.assertEqual([results[key] for key in keys], ["provider", "stored-by-other", "provider", "provider"])
+
+    def test_async_calls_coalesce_per_event_loop(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def lookup():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "tower"
+
+        async def burst():
+            return await asyncio.gather(*(flight.ado(("k",), lookup) for _ in range(3)))
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.extend(asyncio.run(burst()))) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # One leader per loop; a future of one loop is never awaited on another.
+        self.assertEqual((len(calls), results), (2, ["tower"] * 6))
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    async def test_async_resolvers_coalesce_the_same_cell(self):
+        provider = _AsyncCountingProvider(_fix(35.4, 51.4, 250), name="ASYNC", delay_s=0.1)
+        resolvers = [AsyncTowerResolver() for _ in range(3)]
+        for resolver in resolvers:
+            resolver._providers = [provider]
+        cell = {"mcc": 432, "mnc": 35, "lac": 11, "cell_id": 6100, "allow_external": True}
+        results = await asyncio.gather(*(r.aresolve(**cell) for r in resolvers))
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual({r.tower.pk for r in results}, {results[0].tower.pk})
+
+
+class ProviderTransportTests(TestCase):
+    def test_circuit_breaker_trips_and_recovers_after_half_open_probe(self):
+        now = [0.0]
+        breaker = CircuitBreaker(window=4, min_calls=4, error_rate=0.5, slow_call_s=1.0, open_s=30, clock=lambda: now[0])
+        for ok, elapsed in ((True, 0.1), (False, 0.1), (True, 0.1), (True, 2.0)):  # 2 of 4 failed (one was slow)
+            self.assertTrue(breaker.allow())
+            breaker.record(ok=ok, elapsed_s=elapsed)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        now[0] = 31.0
+        self.assertTrue(breaker.allow())  # the single half-open probe
+        self.assertFalse(breaker.allow())
+        breaker.record(ok=True, elapsed_s=0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_token_bucket_rejects_when_wait_exceeds_budget(self):
+        bucket = TokenBucket(rate_per_s=1.0, burst=2)
+        self.assertTrue(bucket.acquire(max_wait_s=0))
+        self.assertTrue(bucket.acquire(max_wait_s=0))
+        self.assertFalse(bucket.acquire(max_wait_s=0.1))
+        self.assertEqual(bucket.stats()["rejected"], 1)
+
+    @override_settings(TOWER_PROVIDER_TRANSPORT={"BREAKER_MIN_CALLS": 1, "BREAKER_ERROR_RATE": 0.5})
+    def test_open_circuit_skips_provider_and_shows_in_status(self):
+        from django.contrib.auth import get_user_model
+
+        transport = get_transport("TESTPROVIDER")
+        transport.breaker.record(ok=False, elapsed_s=0.1)
+        with self.assertRaises(ProviderUnavailable) as ctx:
+            transport.post("http://provider.invalid/")
+        self.assertEqual(classify_lookup_error(ctx.exception), LookupOutcome.CIRCUIT_OPEN)
+
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "pw"))
+        body = self.client.get("/api/v1/system/providers/").json()
+        self.assertEqual(body["providers"]["TESTPROVIDER"]["circuit"]["state"], "open")
+        self.assertIn("hit_rate", body["tower_cache"])
+
+
+class LruTtlCacheTests(TestCase):
+    def test_lru_eviction_and_ttl_expiry(self):
+        now = [0.0]
+        cache = LruTtlCache(max_entries=2, ttl_s=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)  # evicts "b" (least recently used)
+        self.assertIsNone(cache.get("b", None))
+        now[0] = 11.0
+        self.assertIsNone(cache.get("a", None))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]), (1, 2, 1, 1))
@@ -1,13 +1,60 @@
 import math
+
+import numpy as np
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_EARTH_RADIUS_M = 6371000.0
+_path_loss_defaults = None
+
+
+def path_loss_defaults():
+    """(TX_DEFAULT, N_DEFAULT, REF_LOSS, BAND_REF_LOSS) from settings.PATH_LOSS, read once per process."""
+    global _path_loss_defaults
+    if _path_loss_defaults is None:
+        cfg = getattr(settings, 'PATH_LOSS', None) or {}
+        _path_loss_defaults = (
+            float(cfg.get('TX_DEFAULT', 40)),
+            float(cfg.get('N_DEFAULT', 5.2)),
+            float(cfg.get('REF_LOSS', 80)),
+            bool(cfg.get('BAND_REF_LOSS', False)),
+        )
+    return _path_loss_defaults
+
+
+@receiver(setting_changed)
+def _reset_path_loss_defaults(*, setting, **kwargs):
+    global _path_loss_defaults
+    if setting == 'PATH_LOSS':
+        _path_loss_defaults = None
 
 
 def _get_path_loss_params(tx_power, n, ref_loss):
-    cfg = getattr(settings, 'PATH_LOSS', {})
+    tx_default, n_default, ref_default, _band = path_loss_defaults()
+    return (
+        tx_power if tx_power is not None else tx_default,
+        n if n is not None else n_default,
+        ref_loss if ref_loss is not None else ref_default,
+    )
+
+
+def tower_path_loss(tower):
+    """(tx, n, ref_loss) for RSRP -> distance at `tower` (`CellTower` or `IndexedTower`).
+
+    Uses the constants stored on the tower (`tx_power`, `path_loss_n`, and the
+    band-derived `ref_loss_db` when PATH_LOSS["BAND_REF_LOSS"] is on), falling back to
+    the PATH_LOSS defaults; `calculate_distance(rsrp, *tower_path_loss(t))` then needs
+    no settings lookup.
+    """
+    tx_default, n_default, ref_default, band = path_loss_defaults()
+    tx = getattr(tower, 'tx_power', None)
+    n = getattr(tower, 'path_loss_n', None)
+    ref_loss = getattr(tower, 'ref_loss_db', None) if band else None
     return (
-        tx_power if tx_power is not None else cfg.get('TX_DEFAULT', 40),
-        n if n is not None else cfg.get('N_DEFAULT', 5.2),
-        ref_loss if ref_loss is not None else cfg.get('REF_LOSS', 80),
+        tx if tx is not None else tx_default,
+        n if n is not None else n_default,
+        ref_loss if ref_loss is not None else ref_default,
     )
 
 
@@ -125,6 +172,12 @@ def estimate_ref_loss_from_earfcn(earfcn, gt_dbi=15.0, gr_dbi=0.0, system_losses
     ref_loss = fspl_1m - gt_dbi - gr_dbi + system_losses_db
     return ref_loss
 
+
+def band_ref_loss(earfcn):
+    """Per-tower REF_LOSS stored as `CellTower.ref_loss_db` (default gains/losses), or None."""
+    ref_loss = estimate_ref_loss_from_earfcn(earfcn)
+    return round(ref_loss, 2) if ref_loss is not None else None
+
 def estimate_bearing(cell_id):
     """Estimate a rough sector bearing (degrees) from Cell ID (heuristic).
 
@@ -170,38 +223,60 @@ def calculate_new_coordinates(lat, lon, distance_meters, bearing):
     }
 
 
+class LocalProjector:
+    """
+    Local tangent plane around (lat0, lon0): x metres east, y metres north
+    (equirectangular, fine over the few km a fix spans).
+
+    The reference constants are computed once, so projecting many points costs two
+    multiply-adds each. `project`/`unproject` take scalars or NumPy arrays; an array
+    origin (e.g. `lat[:, :1]` for one frame per batch row) broadcasts against them.
+    """
+
+    __slots__ = ("lat0", "lon0", "m_per_deg_lat", "m_per_deg_lon")
+
+    def __init__(self, lat0, lon0):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.m_per_deg_lat = _EARTH_RADIUS_M * math.pi / 180.0
+        if np.ndim(lat0):
+            self.m_per_deg_lon = self.m_per_deg_lat * np.cos(np.radians(lat0))
+        else:
+            self.m_per_deg_lon = self.m_per_deg_lat * math.cos(math.radians(lat0))
+
+    def project(self, lat, lon):
+        """(x, y) in metres of the point(s) (lat, lon)."""
+        return (lon - self.lon0) * self.m_per_deg_lon, (lat - self.lat0) * self.m_per_deg_lat
+
+    def unproject(self, x, y):
+        """(lat, lon) of the plane point(s) (x, y)."""
+        return self.lat0 + y / self.m_per_deg_lat, self.lon0 + x / self.m_per_deg_lon
+
+
 def find_circle_intersections(lat1, lon1, r1, lat2, lon2, r2):
-    """  find intersection points of two circles on Earth's surface."""
-    d = haversine_distance(lat1, lon1, lat2, lon2)
-    
+    """Intersection points of two circles (radii in metres), solved on the local plane of the first centre."""
+    frame = LocalProjector(lat1, lon1)
+    x2, y2 = frame.project(lat2, lon2)
+    d = math.hypot(x2, y2)
+
     # کنترل خطا: دایره‌ها نمی‌رسند یا یکی داخل دیگری است
     if d > r1 + r2 or d < abs(r1 - r2) or d == 0:
         return []
 
     a = (r1**2 - r2**2 + d**2) / (2 * d)
     h = math.sqrt(max(0, r1**2 - a**2))
-    
-    # نقطه میانی P2
-    x2 = lat1 + a * (lat2 - lat1) / d
-    y2 = lon1 + a * (lon2 - lon1) / d
-    
-    # ضرایب تبدیل (تقریبی برای فواصل کوتاه)
-    m_per_deg_lat = 111000
-    m_per_deg_lon = 111000 * math.cos(math.radians(lat1))
-    
-    # نقطه اول
-    lat_i1 = x2 + (h * (lon2 - lon1) / d) / (m_per_deg_lat / 111000)
-    lon_i1 = y2 - (h * (lat2 - lat1) / d) / (m_per_deg_lon / 111000)
-    
-    # نقطه دوم
-    lat_i2 = x2 - (h * (lon2 - lon1) / d) / (m_per_deg_lat / 111000)
-    lon_i2 = y2 + (h * (lat2 - lat1) / d) / (m_per_deg_lon / 111000)
-    
+
+    # نقطه میانی روی خط مراکز، سپس دو نقطه عمود بر آن
+    mx, my = a * x2 / d, a * y2 / d
+    ox, oy = -h * y2 / d, h * x2 / d
+    lat_i1, lon_i1 = frame.unproject(mx + ox, my + oy)
+    lat_i2, lon_i2 = frame.unproject(mx - ox, my - oy)
     return [
         {'lat': lat_i1, 'lon': lon_i1},
         {'lat': lat_i2, 'lon': lon_i2}
     ]
-    
+
+
 def trilaterate_two_towers(t1, t2):
     """
     الگوریتم اصلی: محاسبه مکان با دو دکل
@@ -301,133 +376,47 @@ def tower_weight(tower: dict) -> float:
     return max(1e-6, min(w, 1.0))
 
 
-def trilaterate_nlls(towers, max_iter: int = 25, damping: float = 1e-3, tol: float = 1e-3):
+def trilaterate_nlls(towers, max_iter: int = 25, damping: float = 1e-3, tol: float = 1e-3, initial=None):
     """
     Non-linear least squares trilateration (Gauss-Newton + damping) on local tangent plane.
-    Minimizes: sum_i w_i * (||p - p_i|| - r_i)^2
+    Minimizes: sum_i w_i * (||p - p_i|| - r_i)^2 over every tower, w_i = tower_weight.
 
     towers: list of dicts with 'lat','lon','radius' (meters), optional 'rsrp','rsrq' for weighting.
-    Returns (lat, lon) or None.
+    initial: optional (lat, lon) to start from instead of the weighted centroid
+    (e.g. a tracked device's predicted position).
+    Returns (lat, lon) or None. One-problem wrapper around `trilaterate_nlls_many`.
     """
     if not towers or len(towers) < 3:
         return None
-
-    # Reference projection point
-    lat0 = math.radians(towers[0]["lat"])
-    lon0 = math.radians(towers[0]["lon"])
-    R = 6371000.0
-
-    def proj(lat_deg, lon_deg):
-        lon_rad = math.radians(lon_deg)
-        lat_rad = math.radians(lat_deg)
-        x = R * (lon_rad - lon0) * math.cos(lat0)
-        y = R * (lat_rad - lat0)
-        return x, y
-
-    pts = []
-    for t in towers:
-        if t.get("radius") is None:
-            return None
-        x, y = proj(t["lat"], t["lon"])
-        pts.append((x, y, float(t["radius"]), tower_weight(t)))
-
-    # Initial guess: weighted centroid of anchor points
-    sw = sum(w for *_rest, w in pts)
-    if sw <= 0:
+    if any(t.get("radius") is None for t in towers):
         return None
-    x = sum(px * w for px, py, r, w in pts) / sw
-    y = sum(py * w for px, py, r, w in pts) / sw
-
-    lam = float(damping)
 
-    for _ in range(max_iter):
-        # Build weighted normal equations for 2 variables (x,y)
-        a11 = a12 = a22 = 0.0
-        b1 = b2 = 0.0
-        cost = 0.0
-
-        for xi, yi, ri, wi in pts:
-            dx = x - xi
-            dy = y - yi
-            di = math.hypot(dx, dy)
-            if di < 1e-6:
-                continue
-            fi = di - ri
-            # Jacobian
-            jx = dx / di
-            jy = dy / di
-            wfi = wi * fi
-
-            cost += wi * fi * fi
-            a11 += wi * jx * jx
-            a12 += wi * jx * jy
-            a22 += wi * jy * jy
-            b1 += jx * wfi
-            b2 += jy * wfi
-
-        # Solve (A + lam I) * delta = -b
-        a11_d = a11 + lam
-        a22_d = a22 + lam
-        det = a11_d * a22_d - a12 * a12
-        if abs(det) < 1e-12:
-            return None
-
-        dx_step = (-b1 * a22_d - (-b2) * a12) / det
-        dy_step = (a11_d * (-b2) - a12 * (-b1)) / det
-
-        if math.hypot(dx_step, dy_step) < tol:
-            break
-
-        x_new = x + dx_step
-        y_new = y + dy_step
-
-        # Simple acceptance: if cost decreases, accept and reduce damping; else increase damping
-        new_cost = 0.0
-        for xi, yi, ri, wi in pts:
-            di = math.hypot(x_new - xi, y_new - yi)
-            fi = di - ri
-            new_cost += wi * fi * fi
-
-        if new_cost <= cost or cost == 0.0:
-            x, y = x_new, y_new
-            lam = max(1e-6, lam * 0.5)
-        else:
-            lam = min(1e6, lam * 2.0)
-
-    # Convert back to lat/lon
-    lat_res_rad = lat0 + (y / R)
-    lon_res_rad = lon0 + (x / (R * math.cos(lat0)))
-    return math.degrees(lat_res_rad), math.degrees(lon_res_rad)
+    lat, lon, ok = trilaterate_nlls_many(
+        [[t["lat"] for t in towers]],
+        [[t["lon"] for t in towers]],
+        [[float(t["radius"]) for t in towers]],
+        [[tower_weight(t) for t in towers]],
+        init_lat=None if initial is None else [initial[0]],
+        init_lon=None if initial is None else [initial[1]],
+        max_iter=max_iter,
+        damping=damping,
+        tol=tol,
+    )
+    if not ok[0]:
+        return None
+    return float(lat[0]), float(lon[0])
 
 
-def trilaterate_three(t1, t2, t3):
-    """Simple trilateration using three towers with lat, lon and radius (meters).
+def trilaterate_linear(t1, t2, t3):
+    """Closed-form trilateration from three towers with lat, lon and radius (meters).
     Returns (lat, lon) or None on failure.
-    Note: Converts lat/lon to Cartesian on an equirectangular approximation which is
+    Note: Solves on the `LocalProjector` plane of the first tower, which is
     acceptable for small areas (few km). For larger areas use a proper geodetic solver.
     """
-    # Prefer NLLS when possible; fallback to linear solver below.
-    nlls = trilaterate_nlls([t1, t2, t3])
-    if nlls:
-        return nlls
-
-    # convert degrees to meters using local projection approx
-    # pick reference
-    lat0 = math.radians(t1['lat'])
-    lon0 = math.radians(t1['lon'])
-    R = 6371000.0
-
-    def proj(t):
-        # convert point degrees to radians then compute local planar coordinates
-        lon_rad = math.radians(t['lon'])
-        lat_rad = math.radians(t['lat'])
-        x = R * (lon_rad - lon0) * math.cos(lat0)
-        y = R * (lat_rad - lat0)
-        return x, y
-
-    x1, y1 = proj(t1)
-    x2, y2 = proj(t2)
-    x3, y3 = proj(t3)
+    frame = LocalProjector(t1['lat'], t1['lon'])
+    x1, y1 = frame.project(t1['lat'], t1['lon'])
+    x2, y2 = frame.project(t2['lat'], t2['lon'])
+    x3, y3 = frame.project(t3['lat'], t3['lon'])
     r1, r2, r3 = t1['radius'], t2['radius'], t3['radius']
 
     A = 2*(x2 - x1)
@@ -443,10 +432,284 @@ def trilaterate_three(t1, t2, t3):
 
     x = (C*E - B*F) / denom
     y = (A*F - C*D) / denom
+    return frame.unproject(x, y)
+
+
+def trilaterate_three(t1, t2, t3):
+    """Trilateration from three towers: NLLS first, `trilaterate_linear` as fallback.
+    Returns (lat, lon) or None on failure.
+    """
+    return trilaterate_nlls([t1, t2, t3]) or trilaterate_linear(t1, t2, t3)
+
+
+# ---------------------------------------------------------------------------
+# Array kernels: NumPy counterparts of the functions above for batches of
+# problems. Missing values are NaN; results match the scalar versions.
+# ---------------------------------------------------------------------------
+
+
+def calculate_distance_many(rsrp, tx_power=None, n=None, ref_loss=None):
+    """Array `calculate_distance`: NaN RSRP gives 500 m; `tx_power`, `n` and `ref_loss`
+    may be scalars or per-tower arrays (see `tower_path_loss`), NaN meaning the default."""
+    rsrp = np.asarray(rsrp, dtype=float)
+    tx_default, n_default, ref_default, _band = path_loss_defaults()
+
+    def param(value, default):
+        if value is None:
+            return default
+        value = np.asarray(value, dtype=float)
+        return np.where(np.isnan(value), default, value)
+
+    tx, n, ref_loss = param(tx_power, tx_default), param(n, n_default), param(ref_loss, ref_default)
+    with np.errstate(over="ignore", invalid="ignore"):
+        distance = np.power(10.0, (tx + np.abs(rsrp) - ref_loss) / (10 * n))
+    distance = np.clip(distance, 10.0, 50000.0)
+    return np.where(np.isnan(rsrp), 500.0, distance)
+
 
-    # convert back to lat/lon (from reference lat0/lon0)
-    lat_res_rad = lat0 + (y / R)
-    lon_res_rad = lon0 + (x / (R * math.cos(lat0)))
-    lat_res = math.degrees(lat_res_rad)
-    lon_res = math.degrees(lon_res_rad)
-    return lat_res, lon_res
+def distance_from_ta_many(ta):
+    """Array `distance_from_ta`: NaN (or out of range) TA gives NaN."""
+    ta = np.trunc(np.asarray(ta, dtype=float))
+    with np.errstate(invalid="ignore"):
+        valid = (ta >= 0) & (ta <= 10000)
+    return np.where(valid, np.maximum(ta, 1.0) * 78.0, np.nan)
+
+
+def estimate_bearing_many(cell_id):
+    """Array `estimate_bearing` over integer cell ids."""
+    cell_id = np.asarray(cell_id, dtype=np.int64)
+    return np.array([0.0, 120.0, 240.0])[(cell_id % 256) % 3]
+
+
+def haversine_many(lat1, lon1, lat2, lon2):
+    """Array `haversine_distance` (meters); inputs broadcast."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return _EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def bearing_many(lat1, lon1, lat2, lon2):
+    """Array `calculate_bearing_between_coords` (degrees 0-360); inputs broadcast."""
+    lat1, lat2 = np.radians(lat1), np.radians(lat2)
+    dlon = np.radians(np.subtract(lon2, lon1))
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+def destination_many(lat, lon, distance_meters, bearing):
+    """Array `calculate_new_coordinates`; returns (lat, lon) arrays."""
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    brng = np.radians(bearing)
+    d_div_r = np.asarray(distance_meters, dtype=float) / _EARTH_RADIUS_M
+
+    sin_lat2 = np.sin(lat1) * np.cos(d_div_r) + np.cos(lat1) * np.sin(d_div_r) * np.cos(brng)
+    lat2 = np.arcsin(np.clip(sin_lat2, -1.0, 1.0))
+    y = np.sin(brng) * np.sin(d_div_r) * np.cos(lat1)
+    x = np.cos(d_div_r) - np.sin(lat1) * np.sin(lat2)
+    return np.degrees(lat2), np.degrees(lon1 + np.arctan2(y, x))
+
+
+def weighted_centroid_many(lat, lon, weight, mask=None):
+    """
+    Weighted centroid along the last axis; `mask` marks real towers in padded rows.
+    Returns (lat, lon); NaN where a row has no weight.
+    """
+    weight = np.asarray(weight, dtype=float)
+    if mask is not None:
+        weight = np.where(mask, weight, 0.0)
+    sum_w = weight.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c_lat = np.where(sum_w > 0, (np.nan_to_num(lat) * weight).sum(axis=-1) / sum_w, np.nan)
+        c_lon = np.where(sum_w > 0, (np.nan_to_num(lon) * weight).sum(axis=-1) / sum_w, np.nan)
+    return c_lat, c_lon
+
+
+def rsrp_weight_many(rsrp):
+    """The `weighted_centroid` default weight: inverse |RSRP|, 1.0 where RSRP is NaN."""
+    rsrp = np.asarray(rsrp, dtype=float)
+    return np.where(np.isnan(rsrp), 1.0, 1.0 / (np.abs(rsrp) + 1e-6))
+
+
+def tower_weight_many(rsrp, rsrq=None):
+    """Array `tower_weight`; NaN metrics are ignored."""
+    rsrp = np.asarray(rsrp, dtype=float)
+    w = np.where(np.isnan(rsrp), 1.0, 1.0 / np.maximum(1.0, np.abs(rsrp)))
+    if rsrq is not None:
+        rsrq = np.asarray(rsrq, dtype=float)
+        w = w * np.where(np.isnan(rsrq), 1.0, 1.0 / np.maximum(1.0, np.abs(rsrq)))
+    return np.clip(w, 1e-6, 1.0)
+
+
+def find_circle_intersections_many(lat1, lon1, r1, lat2, lon2, r2):
+    """
+    Array `find_circle_intersections`; inputs broadcast. Returns (lat, lon, hit):
+    (2, ...) arrays of both intersection points (in the scalar order) and where
+    the circles intersect at all (the points are meaningless elsewhere).
+    """
+    lat1, lon1, r1, lat2, lon2, r2 = (np.asarray(v, dtype=float) for v in (lat1, lon1, r1, lat2, lon2, r2))
+    frame = LocalProjector(lat1, lon1)
+    x2, y2 = frame.project(lat2, lon2)
+    d = np.hypot(x2, y2)
+    hit = ~((d > r1 + r2) | (d < np.abs(r1 - r2)) | (d == 0))
+    safe_d = np.where(hit, d, 1.0)
+
+    a = (r1**2 - r2**2 + safe_d**2) / (2 * safe_d)
+    h = np.sqrt(np.maximum(0, r1**2 - a**2))
+    mx, my = a * x2 / safe_d, a * y2 / safe_d
+    ox, oy = -h * y2 / safe_d, h * x2 / safe_d
+    lat, lon = frame.unproject(np.stack([mx + ox, mx - ox]), np.stack([my + oy, my - oy]))
+    return lat, lon, hit
+
+
+def _angle_diff(a, b):
+    diff = np.abs(a - b)
+    return np.where(diff > 180, 360 - diff, diff)
+
+
+def trilaterate_two_many(lat1, lon1, r1, lat2, lon2, r2, *, rsrp1=None, rsrp2=None, sector1=0.0, sector2=0.0):
+    """
+    Array `trilaterate_two_towers`: circle intersection picked by sector agreement,
+    RSRP-weighted centroid where the circles do not intersect. Returns (lat, lon).
+    `sector1/2` are the expected sector bearings (`estimate_bearing` of the cell).
+    """
+    lat1, lon1, r1, lat2, lon2, r2 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (lat1, lon1, r1, lat2, lon2, r2)))
+    cand_lat, cand_lon, hit = find_circle_intersections_many(lat1, lon1, r1, lat2, lon2, r2)
+
+    score = _angle_diff(bearing_many(lat1, lon1, cand_lat, cand_lon), sector1) + _angle_diff(
+        bearing_many(lat2, lon2, cand_lat, cand_lon), sector2
+    )
+    pick = (score[1] < score[0]).astype(int)
+    best_lat = np.take_along_axis(cand_lat, pick[None], axis=0)[0]
+    best_lon = np.take_along_axis(cand_lon, pick[None], axis=0)[0]
+
+    w1 = rsrp_weight_many(np.full(lat1.shape, np.nan) if rsrp1 is None else rsrp1)
+    w2 = rsrp_weight_many(np.full(lat2.shape, np.nan) if rsrp2 is None else rsrp2)
+    c_lat, c_lon = weighted_centroid_many(np.stack([lat1, lat2], -1), np.stack([lon1, lon2], -1), np.stack([w1, w2], -1))
+    return np.where(hit, best_lat, c_lat), np.where(hit, best_lon, c_lon)
+
+
+def trilaterate_nlls_many(
+    lat,
+    lon,
+    radius,
+    weight,
+    mask=None,
+    *,
+    init_lat=None,
+    init_lon=None,
+    max_iter: int = 25,
+    damping: float = 1e-3,
+    tol: float = 1e-3,
+):
+    """
+    Batched weighted Gauss-Newton: every row of the (B, K) arrays is one problem over
+    all of its towers; ragged batches are padded and the padding excluded by `mask`.
+    Each iteration is a handful of array operations whatever K and B are, so
+    per-problem cost barely grows with tower count and batches amortize the Python
+    overhead. Problems keep their own damping and stop on their own convergence.
+    `init_lat`/`init_lon` (B,) warm-start rows from a known position; NaN rows start
+    from the weighted centroid.
+    Returns (lat, lon, ok); rows with fewer than 3 towers or a singular system are not ok.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    radius = np.asarray(radius, dtype=float)
+    weight = np.asarray(weight, dtype=float)
+    mask = np.ones(lat.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    mask = mask & ~np.isnan(radius)
+
+    # One frame per row, centred on its first tower.
+    frame = LocalProjector(lat[:, :1], lon[:, :1])
+    px, py = frame.project(lat, lon)
+    # Padding is zeroed (not NaN) so it drops out of every weighted sum.
+    px = np.where(mask, px, 0.0)
+    py = np.where(mask, py, 0.0)
+    r = np.where(mask, radius, 0.0)
+    w = np.where(mask, weight, 0.0)
+
+    sw = w.sum(axis=1)
+    ok = (mask.sum(axis=1) >= 3) & (sw > 0)
+    safe_sw = np.where(ok, sw, 1.0)
+    x = (px * w).sum(axis=1) / safe_sw
+    y = (py * w).sum(axis=1) / safe_sw
+    if init_lat is not None and init_lon is not None:
+        i_lat = np.asarray(init_lat, dtype=float)
+        i_lon = np.asarray(init_lon, dtype=float)
+        warm = np.isfinite(i_lat) & np.isfinite(i_lon)
+        i_x, i_y = frame.project(i_lat[:, None], i_lon[:, None])
+        x = np.where(warm, i_x[:, 0], x)
+        y = np.where(warm, i_y[:, 0], y)
+    lam = np.full(x.shape, float(damping))
+    active = ok.copy()
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        dx = x[:, None] - px
+        dy = y[:, None] - py
+        di = np.hypot(dx, dy)
+        use = mask & (di >= 1e-6)
+        safe_di = np.where(use, di, 1.0)
+        fi = di - r
+        jx = np.where(use, dx / safe_di, 0.0)
+        jy = np.where(use, dy / safe_di, 0.0)
+        wu = np.where(use, w, 0.0)
+        wfi = wu * fi
+
+        cost = (wfi * fi).sum(axis=1)
+        a11_d = (wu * jx * jx).sum(axis=1) + lam
+        a12 = (wu * jx * jy).sum(axis=1)
+        a22_d = (wu * jy * jy).sum(axis=1) + lam
+        b1 = (jx * wfi).sum(axis=1)
+        b2 = (jy * wfi).sum(axis=1)
+
+        det = a11_d * a22_d - a12 * a12
+        singular = active & (np.abs(det) < 1e-12)
+        ok &= ~singular
+        active &= ~singular
+        safe_det = np.where(active, det, 1.0)
+        step_x = (-b1 * a22_d - (-b2) * a12) / safe_det
+        step_y = (a11_d * (-b2) - a12 * (-b1)) / safe_det
+
+        active &= ~(np.hypot(step_x, step_y) < tol)
+        x_new = x + step_x
+        y_new = y + step_y
+        f_new = np.hypot(x_new[:, None] - px, y_new[:, None] - py) - r
+        new_cost = (w * f_new * f_new).sum(axis=1)
+
+        accept = active & ((new_cost <= cost) | (cost == 0.0))
+        x = np.where(accept, x_new, x)
+        y = np.where(accept, y_new, y)
+        lam = np.where(accept, np.maximum(1e-6, lam * 0.5), np.where(active, np.minimum(1e6, lam * 2.0), lam))
+
+    res_lat, res_lon = frame.unproject(x[:, None], y[:, None])
+    return res_lat[:, 0], res_lon[:, 0], ok
+
+
+def trilaterate_linear_many(lat, lon, radius):
+    """Array `trilaterate_linear` over the first three columns of (B, K) arrays; returns (lat, lon, ok)."""
+    lat = np.asarray(lat, dtype=float)[:, :3]
+    lon = np.asarray(lon, dtype=float)[:, :3]
+    radius = np.asarray(radius, dtype=float)[:, :3]
+    frame = LocalProjector(lat[:, :1], lon[:, :1])
+    x, y = frame.project(lat, lon)
+    (x1, x2, x3), (y1, y2, y3), (r1, r2, r3) = x.T, y.T, radius.T
+
+    A = 2 * (x2 - x1)
+    B = 2 * (y2 - y1)
+    C = r1**2 - r2**2 - x1**2 + x2**2 - y1**2 + y2**2
+    D = 2 * (x3 - x2)
+    E = 2 * (y3 - y2)
+    F = r2**2 - r3**2 - x2**2 + x3**2 - y2**2 + y3**2
+    denom = A * E - B * D
+    with np.errstate(invalid="ignore"):
+        ok = np.abs(denom) >= 1e-6
+    safe = np.where(ok, denom, 1.0)
+    px = (C * E - B * F) / safe
+    py = (A * F - C * D) / safe
+    res_lat, res_lon = frame.unproject(px[:, None], py[:, None])
+    return res_lat[:, 0], res_lon[:, 0], ok
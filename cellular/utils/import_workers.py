@@ -0,0 +1,172 @@
+"""
+Parallel parse/normalize stage for tower imports.
+
+`_normalize_row` (alias lookups plus `_to_int`/`_to_float` on every field) costs
+more CPU than the DB merge on big files, so with `TOWER_IMPORT["WORKERS"]` the
+input is cut into tasks that a process pool parses and normalizes, and the
+importing thread stays the single writer, merging finished chunks in file order:
+
+- a plain CSV on disk is split into byte ranges of about `chunk_size` rows; each
+  worker reads its own range (a line belongs to the range it starts in), so the
+  parent never touches the data,
+- anything else (compressed dumps, in-memory uploads) is read line by line in the
+  parent and shipped to the workers in batches of `chunk_size` lines.
+
+Only files the caller names are split by bytes: the management command passes its
+path, Django's temporary uploads have `temporary_file_path()`. A `.name` attribute
+is never trusted.
+
+Workers report error lines relative to their task plus the physical lines it
+spanned; the writer adds the lines of all earlier tasks, so messages carry the
+same line numbers as a serial import. Both modes cut the input at line breaks, so
+quoted fields spanning lines are not supported (tower dumps have none).
+
+The pool forks only from the main thread (the management command). Imports started
+by `ImportStartView` run in a server thread, and forking there could copy locks held
+by other threads into the children. Those imports use forkserver (or spawn), whose
+workers set Django up themselves.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bytes sampled to estimate the byte-range size of `chunk_size` rows.
+_SAMPLE_BYTES = 1 << 20
+_MIN_RANGE_BYTES = 1 << 16
+
+
+def _init_parse_worker() -> None:
+    import django
+    from django.apps import apps
+
+    if not apps.ready:  # forkserver/spawn workers
+        django.setup()
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.current_thread() is threading.main_thread():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _parse_task(task: Tuple[Any, ...], fieldnames: List[str], dataset_source: str, filters: Dict[str, Any]):
+    """Parse one task: (rows, data rows read, (relative line, error) pairs, filtered rows, lines spanned)."""
+    # Imported here: unpickling this module in a fresh worker must not need the app registry.
+    from .importers import _parse_rows, _raw_row_filter
+
+    if task[0] == "range":
+        _kind, path, start, end = task
+        with open(path, "rb") as f:
+            if start > 0:
+                f.seek(start - 1)
+                if f.read(1) != b"\n":
+                    f.readline()  # the line in progress belongs to the previous range
+            begin = f.tell()
+            data = f.read(max(0, end - begin)) if begin < end else b""
+            if data and not data.endswith(b"\n"):
+                data += f.readline()
+        text = data.decode("utf-8")
+    else:
+        _kind, lines = task
+        text = "".join(lines)
+
+    spanned = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+    reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=fieldnames)
+    keep = _raw_row_filter(fieldnames, **filters)
+    rows, rows_read, errors, filtered = _parse_rows(reader, dataset_source, keep)
+    return rows, rows_read, errors, filtered, spanned
+
+
+def _file_path(file_obj, path: Optional[str]) -> Optional[str]:
+    """Path to split an uncompressed binary `file_obj` by: the caller's `path`, else a temporary upload's."""
+    if file_obj is None or isinstance(file_obj, io.TextIOBase):
+        return None
+    if path:
+        return path
+    if hasattr(file_obj, "temporary_file_path"):
+        return file_obj.temporary_file_path()
+    return None
+
+
+def _byte_ranges(path: str, has_header: bool, chunk_size: int) -> Iterator[Tuple[str, str, int, int]]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data_start = len(f.readline()) if has_header else 0
+        f.seek(data_start)
+        sample = f.read(_SAMPLE_BYTES)
+    bytes_per_line = len(sample) / max(1, sample.count(b"\n"))
+    step = max(_MIN_RANGE_BYTES, int(bytes_per_line * chunk_size))
+    for start in range(data_start, size, step):
+        yield ("range", path, start, min(start + step, size))
+
+
+def _line_batches(text, chunk_size: int) -> Iterator[Tuple[str, List[str]]]:
+    batch: List[str] = []
+    for line in text:  # continues after the header the reader consumed
+        batch.append(line)
+        if len(batch) >= chunk_size:
+            yield ("lines", batch)
+            batch = []
+    if batch:
+        yield ("lines", batch)
+
+
+def iter_parallel_chunks(
+    file_obj,
+    text,
+    fieldnames: Sequence[str],
+    *,
+    has_header: bool,
+    path: Optional[str] = None,
+    dataset_source: str,
+    chunk_size: int,
+    filters: Dict[str, Any],
+    workers: int,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Tuple[List[Dict], int, List[str], int]]:
+    """
+    `_iter_normalized_chunks` over a process pool: same (rows, rows read, errors,
+    filtered) tuples, in file order. `file_obj` is the uncompressed upload (None
+    otherwise), `path` its filesystem path if the caller knows it, and `text` the
+    text stream positioned after the header.
+    """
+    from .importers import _line_error
+
+    path = _file_path(file_obj, path)
+    tasks = _byte_ranges(path, has_header, chunk_size) if path else _line_batches(text, chunk_size)
+    max_in_flight = max(1, max_in_flight or 2 * workers)
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_mp_context(),
+        initializer=_init_parse_worker,
+    )
+    fieldnames = list(fieldnames)
+    line_offset = 1 if has_header else 0
+    pending: deque = deque()
+
+    def finish(future: Future):
+        nonlocal line_offset
+        rows, rows_read, errors, filtered, spanned = future.result()
+        messages = [_line_error(line_offset + line, message) for line, message in errors]
+        line_offset += spanned
+        return rows, rows_read, messages, filtered
+
+    try:
+        for task in tasks:
+            pending.append(executor.submit(_parse_task, task, fieldnames, dataset_source, filters))
+            # Bounded memory: hand finished chunks to the writer before reading further.
+            while len(pending) >= max_in_flight:
+                yield finish(pending.popleft())
+        while pending:
+            yield finish(pending.popleft())
+    finally:
+        executor.shutdown(cancel_futures=True)
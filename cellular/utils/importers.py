@@ -1,23 +1,30 @@
 import csv
 import io
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import defaultdict
+from contextlib import nullcontext
+from functools import partial
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from django.db import transaction
-from django.db.models import Q
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
 from cellular.models import CellTower
 from cellular.choices import DatasetSource
+from cellular.services.locate_cache import invalidate_locate_results
+from .geometry import band_ref_loss
 from .import_jobs import update_job, append_update
+from .pg_import import copy_import_run, merge_chunk_copy
+from .tower_sources import OPENCELLID_COLUMNS, is_headerless, open_tower_source
 
 # field mapping for csv
 CSV_FIELD_MAPPING: Dict[str, Sequence[str]] = {
     "radio_type": ("radio_type", "radioType", "radio", "rat"),
     "mcc": ("mcc", "MCC"),
-    "mnc": ("mnc", "MNC"),
-    "lac": ("lac", "LAC", "tac", "TAC"),
-    "cell_id": ("cell_id", "cellId", "cid", "eci", "CellID"),
-    "pci": ("pci", "PCI", "physicalCellId"),
+    "mnc": ("mnc", "MNC", "net"),
+    "lac": ("lac", "LAC", "tac", "TAC", "area"),
+    "cell_id": ("cell_id", "cellId", "cid", "eci", "CellID", "cell"),
+    "pci": ("pci", "PCI", "physicalCellId", "unit"),
     "earfcn": ("earfcn", "EARFCN", "frequency", "freq"),
     "range_m": ("range_m", "range", "coverage", "rangeMeters"),
     "lat": ("lat", "latitude", "Latitude"),
@@ -30,54 +37,278 @@ CSV_FIELD_MAPPING: Dict[str, Sequence[str]] = {
 }
 
 BATCH_SIZE = 1000
-LOOKUP_BATCH_SIZE = 200
+# cell_ids per lookup query (under SQLite's old 999 bound-parameter limit).
+LOOKUP_BATCH_SIZE = 900
+# Error messages kept for the result/job; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
 
 
 PROGRESS_UPDATE_SIZE = 200
 
+UPDATE_FIELDS = [
+    "radio_type",
+    "mcc",
+    "mnc",
+    "lac",
+    "cell_id",
+    "pci",
+    "earfcn",
+    "ref_loss_db",
+    "range_m",
+    "is_approximate",
+    "samples",
+    "lat",
+    "lon",
+    "tx_power",
+    "antenna_azimuth",
+    "source",
+    "checked_count",
+    "verified_count",
+    "updated_at",
+]
+
+TowerKey = Tuple[int, int, int, Optional[int]]
+
+DEFAULT_TOWER_IMPORT = {
+    # Rows normalized, looked up and written together; memory is bounded by this,
+    # not by the file size.
+    "CHUNK_SIZE": 5000,
+    # On PostgreSQL, COPY each chunk into a staging table and merge it set-wise
+    # (see utils/pg_import.py); other databases always use the ORM path.
+    "PG_COPY": True,
+    "COPY_CHUNK_SIZE": 50000,
+    # Processes parsing/normalizing ahead of the (single, ordered) DB writer;
+    # 0 parses in the importing thread (see utils/import_workers.py).
+    "WORKERS": 0,
+}
+
+
+def tower_import_config() -> Dict:
+    return {**DEFAULT_TOWER_IMPORT, **(getattr(settings, "TOWER_IMPORT", None) or {})}
+
+
+def _use_copy_engine(cfg: Dict) -> bool:
+    return bool(cfg["PG_COPY"]) and connection.vendor == "postgresql"
+
 
 def import_towers_from_csv(
     file_obj,
     dataset_source: str = DatasetSource.OTHER,
     update_existing: bool = True,
     job_id: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    mcc: Optional[Collection[int]] = None,
+    mnc: Optional[Collection[int]] = None,
+    radio_types: Optional[Collection[str]] = None,
+    layout: str = "auto",
+    workers: Optional[int] = None,
+    path: Optional[str] = None,
 ) -> Dict[str, int]:
-
-    created_instances: List[CellTower] = []
-    rows_to_update: List[CellTower] = []
+    """
+    Stream a tower CSV into the DB in chunks of `chunk_size` rows: each chunk is
+    normalized, matched against existing towers, merged and bulk-written (in its
+    own transaction) before the next one is read, so memory stays flat for any
+    file size. Job progress counts the data rows read so far, against a total
+    counted up front for uncompressed input only.
+
+    The file may be gzip/bzip2/zip compressed and, with `layout` "auto" or
+    "opencellid", a header-less OpenCellID/MLS dump. Rows outside the `mcc`,
+    `mnc` and `radio_types` filters are dropped before normalization and only
+    counted as `filtered`.
+
+    With `workers` (default `TOWER_IMPORT["WORKERS"]`), parsing and normalization
+    run in a process pool and this thread only merges the chunks, in file order.
+    `path`, the filesystem path of `file_obj` if the caller knows it, lets the
+    workers read byte ranges of an uncompressed file themselves.
+
+    On PostgreSQL the merge runs as COPY + set-based SQL (`TOWER_IMPORT["PG_COPY"]`).
+    """
+    cfg = tower_import_config()
+    use_copy = _use_copy_engine(cfg)
+    if chunk_size is None:
+        chunk_size = cfg["COPY_CHUNK_SIZE"] if use_copy else cfg["CHUNK_SIZE"]
     errors: List[str] = []
-    existing_lookup: Dict[Tuple[int, int, int, Optional[int]], CellTower] = {}
-    seen_new_keys: set = set()
-
-    text_wrapper = _ensure_text_mode(file_obj)
-    reader = csv.DictReader(text_wrapper)
-
-    normalized_rows = []
-    for idx, raw_row in enumerate(reader, start=2):  # 1 برای header
-        try:
-            normalized = _normalize_row(raw_row, default_source=dataset_source)
-            normalized_rows.append(normalized)
-        except ValueError as exc:
-            errors.append(f"خط {idx}: {exc}")
-
-    if not normalized_rows:
-        return {"created": 0, "updated": 0, "errors": errors}
+    # Keys this run created (ORM path; the COPY path keeps their ids in a temp table):
+    # later rows of them are in-file duplicates. Towers others create meanwhile are not.
+    created_keys: set = set()
+    stream = open_tower_source(file_obj)
+    headerless = is_headerless(stream, layout)
+    # Counting a compressed dump would decompress it twice; its total stays unknown
+    # (progress reports the rows read so far) until the import finishes.
+    total_rows = _count_data_rows(stream, has_header=not headerless) if stream is file_obj else None
+    text = _ensure_text_mode(stream)
+    reader = csv.DictReader(text, fieldnames=OPENCELLID_COLUMNS if headerless else None)
+    fieldnames = list(reader.fieldnames or ())
+    filters = {"mcc": mcc, "mnc": mnc, "radio_types": radio_types}
+    workers = cfg["WORKERS"] if workers is None else workers
 
-    existing_lookup = _fetch_existing_lookup(normalized_rows)
-
-    processed_rows = 0
-    total_rows = len(normalized_rows)
     if job_id:
         update_job(
             job_id,
             status="IN_PROGRESS",
-            total_rows=total_rows,
+            total_rows=total_rows or 0,
             processed_rows=0,
             errors=errors,
         )
 
-    for row in normalized_rows:
-        processed_rows += 1
+    created_count = 0
+    updated_count = 0
+    processed_rows = 0
+    filtered_rows = 0
+    skipped_errors = 0
+    if workers > 0:
+        from .import_workers import iter_parallel_chunks
+
+        chunks = iter_parallel_chunks(
+            file_obj if stream is file_obj else None,
+            text,
+            fieldnames,
+            has_header=not headerless,
+            path=path,
+            dataset_source=dataset_source,
+            chunk_size=max(1, chunk_size),
+            filters=filters,
+            workers=workers,
+        )
+    else:
+        chunks = _iter_normalized_chunks(
+            reader, dataset_source, max(1, chunk_size), keep=_raw_row_filter(fieldnames, **filters)
+        )
+    merge = _merge_chunk_copy if use_copy else partial(_merge_chunk, created_keys=created_keys)
+    with copy_import_run() if use_copy else nullcontext():
+        for rows, rows_read, chunk_errors, filtered in chunks:
+            filtered_rows += filtered
+            room = MAX_REPORTED_ERRORS - len(errors)
+            errors.extend(chunk_errors[:room])
+            skipped_errors += max(0, len(chunk_errors) - room)
+
+            created, updated = merge(
+                rows,
+                update_existing=update_existing,
+                job_id=job_id,
+                row_offset=processed_rows,
+            )
+            created_count += created
+            updated_count += updated
+            processed_rows += rows_read
+            if job_id:
+                update_job(job_id, processed_rows=processed_rows, total_rows=max(total_rows or 0, processed_rows))
+
+    if skipped_errors:
+        errors.append(f"... {skipped_errors} more errors")
+    result = {"created": created_count, "updated": updated_count, "filtered": filtered_rows, "errors": errors}
+    if job_id:
+        update_job(job_id, processed_rows=processed_rows, total_rows=processed_rows, status="SUCCESS", result=result)
+    return result
+
+
+def _iter_normalized_chunks(
+    reader: csv.DictReader,
+    dataset_source: str,
+    chunk_size: int,
+    *,
+    keep: Optional[Callable[[Dict[str, str]], bool]] = None,
+) -> Iterator[Tuple[List[Dict], int, List[str], int]]:
+    """(normalized rows, data rows read, error messages, filtered rows) per `chunk_size` data rows."""
+    while True:
+        rows, rows_read, errors, filtered = _parse_rows(reader, dataset_source, keep, limit=chunk_size)
+        if not rows_read:
+            return
+        yield rows, rows_read, [_line_error(line, message) for line, message in errors], filtered
+
+
+def _parse_rows(
+    reader: csv.DictReader,
+    dataset_source: str,
+    keep: Optional[Callable[[Dict[str, str]], bool]],
+    limit: Optional[int] = None,
+) -> Tuple[List[Dict], int, List[Tuple[int, str]], int]:
+    """
+    Normalize up to `limit` data rows of `reader`: (rows, data rows read,
+    (line, error) pairs, filtered rows). Lines are the reader's physical
+    line numbers, so blank lines and the header are counted.
+    """
+    rows: List[Dict] = []
+    errors: List[Tuple[int, str]] = []
+    rows_read = 0
+    filtered = 0
+    for raw_row in reader:
+        rows_read += 1
+        if keep is not None and not keep(raw_row):
+            filtered += 1
+        else:
+            try:
+                rows.append(_normalize_row(raw_row, default_source=dataset_source))
+            except ValueError as exc:
+                errors.append((reader.line_num, str(exc)))
+        if limit is not None and rows_read >= limit:
+            break
+    return rows, rows_read, errors, filtered
+
+
+def _line_error(line: int, message: str) -> str:
+    return f"خط {line}: {message}"
+
+
+def _raw_row_filter(
+    fieldnames: Sequence[str],
+    *,
+    mcc: Optional[Collection[int]] = None,
+    mnc: Optional[Collection[int]] = None,
+    radio_types: Optional[Collection[str]] = None,
+) -> Optional[Callable[[Dict[str, str]], bool]]:
+    """
+    Predicate on raw CSV rows for the MCC / MNC / radio filters, reading only the
+    filtered columns (resolved once from the header), or None without filters.
+    """
+    default_radio = CellTower._meta.get_field("radio_type").default
+    checks = []
+    for field, allowed, parse, default in (
+        ("mcc", mcc, _to_int, None),
+        ("mnc", mnc, _to_int, None),
+        ("radio_type", radio_types, lambda v: v.strip().lower(), default_radio),
+    ):
+        if allowed is None:
+            continue
+        if field == "radio_type":
+            allowed = {str(v).lower() for v in allowed}
+        else:
+            allowed = {int(v) for v in allowed}
+        columns = [c for c in CSV_FIELD_MAPPING[field] if c in fieldnames]
+        checks.append((columns, allowed, parse, default))
+    if not checks:
+        return None
+
+    def keep(raw_row: Dict[str, str]) -> bool:
+        for columns, allowed, parse, default in checks:
+            value = next((raw_row[c] for c in columns if raw_row[c] not in ("", None)), None)
+            if (default if value is None else parse(value)) not in allowed:
+                return False
+        return True
+
+    return keep
+
+
+def _merge_chunk(
+    rows: List[Dict],
+    *,
+    update_existing: bool,
+    created_keys: set,
+    job_id: Optional[str],
+    row_offset: int,
+) -> Tuple[int, int]:
+    """
+    Apply the created / updated_samples / verified / skipped rules to one chunk and
+    write it. `created_keys` (shared by the run's chunks) gains the keys created here.
+    """
+    if not rows:
+        return 0, 0
+
+    created_instances: List[CellTower] = []
+    rows_to_update: List[CellTower] = []
+    existing_lookup = _fetch_existing_lookup(rows)
+
+    for processed_rows, row in enumerate(rows, start=row_offset + 1):
         key = (row["mcc"], row["mnc"], row["cell_id"], row["lac"])
         instance = existing_lookup.get(key)
         new_samples = row.get("samples") or 0
@@ -86,6 +317,8 @@ def import_towers_from_csv(
         old_lat = None
         old_lon = None
 
+        if key in created_keys:
+            continue  # تکراری در همان فایل (همین اجرا ساخته است)
         if instance:
             action = "skipped"
             old_samples = instance.samples or 0
@@ -109,19 +342,13 @@ def import_towers_from_csv(
                 if update_existing:
                     rows_to_update.append(instance)
         else:
-            if key in seen_new_keys:
-                continue  # تکراری در همان فایل
-            seen_new_keys.add(key)
+            created_keys.add(key)
             new_tower = CellTower(**row)
             new_tower.checked_count = 1
             new_tower.verified_count = 1
             created_instances.append(new_tower)
-            old_lat, old_lon = None, None
-            old_samples = None
-            action = "created"
 
         if job_id and processed_rows % PROGRESS_UPDATE_SIZE == 0:
-            update_job(job_id, processed_rows=processed_rows)
             append_update(
                 job_id,
                 {
@@ -141,12 +368,7 @@ def import_towers_from_csv(
                 },
             )
 
-    if job_id:
-        update_job(job_id, processed_rows=processed_rows)
-
     created_count = 0
-    updated_count = 0
-
     with transaction.atomic():
         for chunk in _chunked(created_instances, BATCH_SIZE):
             CellTower.objects.bulk_create(chunk, ignore_conflicts=True)
@@ -161,37 +383,55 @@ def import_towers_from_csv(
                     obj.updated_at = now
                     deduped[int(obj.pk)] = obj
             rows_to_update = list(deduped.values())
+            CellTower.objects.bulk_update(rows_to_update, UPDATE_FIELDS, batch_size=BATCH_SIZE)
 
-            CellTower.objects.bulk_update(
-                rows_to_update,
-                [
-                    "radio_type",
-                    "mcc",
-                    "mnc",
-                    "lac",
-                    "cell_id",
-                    "pci",
-                    "earfcn",
-                    "range_m",
-                    "is_approximate",
-                    "samples",
-                    "lat",
-                    "lon",
-                    "tx_power",
-                    "antenna_azimuth",
-                    "source",
-                    "checked_count",
-                    "verified_count",
-                    "updated_at",
-                ],
-                batch_size=BATCH_SIZE,
-            )
-            updated_count = len(rows_to_update)
+    if update_existing and rows_to_update:
+        # bulk_update sends no post_save: drop cached fixes that used these towers.
+        invalidate_locate_results([obj.pk for obj in rows_to_update])
+    return created_count, len(rows_to_update) if update_existing else 0
 
-    result = {"created": created_count, "updated": updated_count, "errors": errors}
-    if job_id:
-        update_job(job_id, processed_rows=total_rows, status="SUCCESS", result=result)
-    return result
+
+def _merge_chunk_copy(
+    rows: List[Dict],
+    *,
+    update_existing: bool,
+    job_id: Optional[str],
+    row_offset: int,
+) -> Tuple[int, int]:
+    created, updated_ids = merge_chunk_copy(
+        rows,
+        update_existing=update_existing,
+        now=timezone.now(),
+        job_id=job_id,
+        row_offset=row_offset,
+        progress_every=PROGRESS_UPDATE_SIZE,
+    )
+    if updated_ids:
+        # Set-based UPDATEs send no post_save: drop cached fixes that used these towers.
+        invalidate_locate_results(updated_ids)
+    return created, len(set(updated_ids))
+
+
+def _count_data_rows(file_obj, has_header: bool = True) -> Optional[int]:
+    """Data lines in a seekable upload (one cheap pass over the bytes), for progress; None otherwise."""
+    if not (hasattr(file_obj, "seek") and hasattr(file_obj, "read")):
+        return None
+    try:
+        file_obj.seek(0)
+        lines = 0
+        last = None
+        while True:
+            block = file_obj.read(1 << 20)
+            if not block:
+                break
+            lines += block.count("\n" if isinstance(block, str) else b"\n")
+            last = block[-1:]
+        file_obj.seek(0)
+    except (OSError, ValueError):
+        return None
+    if last is not None and last not in ("\n", b"\n"):
+        lines += 1  # no trailing newline
+    return max(0, lines - 1) if has_header else lines
 
 
 def _ensure_text_mode(file_obj):
@@ -205,37 +445,28 @@ def _ensure_text_mode(file_obj):
 
 def _fetch_existing_lookup(
     rows: List[Dict],
-) -> Dict[Tuple[int, int, int, Optional[int]], CellTower]:
+) -> Dict[TowerKey, CellTower]:
+    """
+    Existing towers for the rows' keys. Keys are grouped by (mcc, mnc) and fetched
+    with one `cell_id IN (...)` per group (a prefix of the unique index); `lac` is
+    matched here, so a NULL lac only pairs with NULL.
+    """
     if not rows:
         return {}
 
-    keys = []
+    keys = set()
+    cell_ids_by_network: Dict[Tuple[int, int], set] = defaultdict(set)
     for row in rows:
-        keys.append((row["mcc"], row["mnc"], row["cell_id"], row["lac"]))
-
-    lookup: Dict[Tuple[int, int, int, Optional[int]], CellTower] = {}
-
-    for chunk in _chunked(keys, LOOKUP_BATCH_SIZE):
-        conditions = []
-        for mcc, mnc, cell_id, lac in chunk:
-            condition = Q(mcc=mcc, mnc=mnc, cell_id=cell_id)
-            if lac is None:
-                condition &= Q(lac__isnull=True)
-            else:
-                condition &= Q(lac=lac)
-            conditions.append(condition)
-
-        if not conditions:
-            continue
-
-        combined_condition = conditions[0]
-        for condition in conditions[1:]:
-            combined_condition |= condition
-
-        queryset = CellTower.objects.filter(combined_condition)
-        for tower in queryset:
-            key = (tower.mcc, tower.mnc, tower.cell_id, tower.lac)
-            lookup[key] = tower
+        keys.add((row["mcc"], row["mnc"], row["cell_id"], row["lac"]))
+        cell_ids_by_network[(row["mcc"], row["mnc"])].add(row["cell_id"])
+
+    lookup: Dict[TowerKey, CellTower] = {}
+    for (mcc, mnc), cell_ids in cell_ids_by_network.items():
+        for chunk in _chunked(sorted(cell_ids), LOOKUP_BATCH_SIZE):
+            for tower in CellTower.objects.filter(mcc=mcc, mnc=mnc, cell_id__in=chunk):
+                key = (tower.mcc, tower.mnc, tower.cell_id, tower.lac)
+                if key in keys:
+                    lookup[key] = tower
     return lookup
 
 
@@ -281,6 +512,8 @@ def _normalize_row(raw_row: Dict[str, str], default_source: str) -> Dict:
         "cell_id": cell_id,
         "pci": pci,
         "earfcn": earfcn,
+        # bulk_create/bulk_update skip CellTower.save(), so precompute here.
+        "ref_loss_db": band_ref_loss(earfcn),
         "range_m": range_m,
         "is_approximate": is_approximate,
         "samples": samples,
@@ -294,6 +527,8 @@ def _normalize_row(raw_row: Dict[str, str], default_source: str) -> Dict:
 
 def _apply_row_to_instance(instance: CellTower, row: Dict) -> None:
     for field, value in row.items():
+        if field == "ref_loss_db" and instance.ref_loss_calibrated and instance.ref_loss_db is not None:
+            continue  # calibrated: kept, as by CellTower.save()
         setattr(instance, field, value)
 
 
@@ -327,6 +562,6 @@ def _to_float(value, required: bool = False) -> Optional[float]:
         return None
 
 
-def _chunked(items: Sequence[CellTower], size: int) -> Iterable[Sequence[CellTower]]:
+def _chunked(items: Sequence, size: int) -> Iterable[Sequence]:
     for start in range(0, len(items), size):
         yield items[start : start + size]
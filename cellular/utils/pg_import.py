@@ -0,0 +1,216 @@
+"""
+PostgreSQL import engine: COPY a chunk into a staging table, then merge set-wise.
+
+The ORM path (`bulk_create(ignore_conflicts=True)` + an 18-column `bulk_update`)
+sends every row through Python model instances and a huge CASE/WHEN UPDATE. Here
+each chunk of normalized rows is streamed with `COPY` into a temporary (never
+WAL-logged) staging table and the rules of `import_towers_from_csv` run as a few
+statements:
+
+- rows matching an existing tower (NULL `lac` matches NULL) pick up its id and samples,
+- `created`: `INSERT ... SELECT ... ON CONFLICT DO NOTHING` for unmatched keys,
+- `updated_samples`: `UPDATE ... FROM` copying the row when it has more samples,
+- `verified` / `skipped`: `UPDATE ... FROM` bumping checked (and verified) counts.
+
+Duplicate keys follow the ORM path's row-by-row rules. For a new key the first row
+creates the tower and later ones are dropped, in later chunks too: `copy_import_run()`
+keeps the ids of the towers the run inserted in a temporary table (towers created by
+others meanwhile, e.g. by live provider lookups, are merged like any existing tower). Every row of an existing tower counts:
+each compares against the samples left by the rows before it (a window max), so
+checked grows by the number of rows, verified by the rows that matched, and the
+last row that raised the samples is copied.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from cellular.models import CellTower
+
+from .import_jobs import append_update
+
+# Normalized row fields, in `_normalize_row` order.
+ROW_FIELDS = (
+    "radio_type",
+    "mcc",
+    "mnc",
+    "lac",
+    "cell_id",
+    "pci",
+    "earfcn",
+    "ref_loss_db",
+    "range_m",
+    "is_approximate",
+    "samples",
+    "lat",
+    "lon",
+    "tx_power",
+    "antenna_azimuth",
+    "source",
+)
+KEY_FIELDS = ("mcc", "mnc", "cell_id", "lac")
+STAGE_TABLE = "tower_import_stage"
+CREATED_TABLE = "tower_import_created"
+
+
+def _column(name: str) -> str:
+    return connection.ops.quote_name(CellTower._meta.get_field(name).column)
+
+
+def _stage_ddl() -> str:
+    columns = ", ".join(
+        f"{_column(name)} {CellTower._meta.get_field(name).db_type(connection)}" for name in ROW_FIELDS
+    )
+    return (
+        f"CREATE TEMPORARY TABLE {STAGE_TABLE} ("
+        f"row_no bigint, {columns}, "
+        "tower_id bigint, old_samples integer, prev_samples integer, old_lat double precision, old_lon double precision)"
+    )
+
+
+@contextmanager
+def copy_import_run() -> Iterator[None]:
+    """Scope of one import: the ids of the towers it inserts, kept across its chunks."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {CREATED_TABLE}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {CREATED_TABLE} (tower_id bigint PRIMARY KEY)")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {CREATED_TABLE}")
+
+
+def merge_chunk_copy(
+    rows: List[Dict],
+    *,
+    update_existing: bool,
+    now,
+    job_id: Optional[str],
+    row_offset: int,
+    progress_every: int,
+) -> Tuple[int, List[int]]:
+    """
+    Merge one chunk through a COPY-loaded staging table, inside `copy_import_run()`;
+    returns (created, updated tower ids).
+    """
+    if not rows:
+        return 0, []
+
+    table = connection.ops.quote_name(CellTower._meta.db_table)
+    pk = connection.ops.quote_name(CellTower._meta.pk.column)
+    cols = ", ".join(_column(name) for name in ROW_FIELDS)
+    s_cols = ", ".join(f"s.{_column(name)}" for name in ROW_FIELDS)
+    mcc, mnc, cell_id, lac = (_column(name) for name in KEY_FIELDS)
+    samples = _column("samples")
+    new_samples = f"COALESCE(s.{samples}, 0)"
+    same_key = (
+        f"{{a}}.{mcc} = {{b}}.{mcc} AND {{a}}.{mnc} = {{b}}.{mnc} AND {{a}}.{cell_id} = {{b}}.{cell_id} "
+        f"AND {{a}}.{lac} IS NOT DISTINCT FROM {{b}}.{lac}"
+    )
+    ref_loss, calibrated = _column("ref_loss_db"), _column("ref_loss_calibrated")
+    copied = ", ".join(
+        f"{_column(name)} = s.{_column(name)}"
+        for name in ROW_FIELDS
+        if name not in KEY_FIELDS and name not in ("samples", "ref_loss_db")
+    )
+    # A calibrated ref_loss_db is kept, as by CellTower.save().
+    copied += (
+        f", {ref_loss} = CASE WHEN t.{calibrated} AND t.{ref_loss} IS NOT NULL "
+        f"THEN t.{ref_loss} ELSE s.{ref_loss} END"
+    )
+    checked, verified, updated_at, created_at = (
+        _column(name) for name in ("checked_count", "verified_count", "updated_at", "created_at")
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGE_TABLE}")
+        cursor.execute(_stage_ddl())
+        with cursor.copy(f"COPY {STAGE_TABLE} (row_no, {cols}) FROM STDIN") as copy:
+            for row_no, row in enumerate(rows, start=row_offset + 1):
+                copy.write_row((row_no, *(row[name] for name in ROW_FIELDS)))
+
+        cursor.execute(
+            f"UPDATE {STAGE_TABLE} s SET tower_id = t.{pk}, old_samples = COALESCE(t.{samples}, 0), "
+            f"old_lat = t.{_column('lat')}, old_lon = t.{_column('lon')} "
+            f"FROM {table} t WHERE {same_key.format(a='t', b='s')}"
+        )
+        # Towers an earlier chunk of this run created: duplicates within the file.
+        cursor.execute(f"DELETE FROM {STAGE_TABLE} s USING {CREATED_TABLE} c WHERE s.tower_id = c.tower_id")
+        # A new key is created by its first row; later rows of it are dropped.
+        cursor.execute(
+            f"DELETE FROM {STAGE_TABLE} s USING {STAGE_TABLE} d "
+            f"WHERE s.tower_id IS NULL AND d.tower_id IS NULL "
+            f"AND {same_key.format(a='d', b='s')} AND d.row_no < s.row_no"
+        )
+        # Samples each row of an existing tower is compared with. When updating,
+        # earlier rows of the same tower that raised them count.
+        if update_existing:
+            cursor.execute(
+                f"UPDATE {STAGE_TABLE} s SET prev_samples = GREATEST(s.old_samples, w.prev) FROM ("
+                f"SELECT row_no, MAX(COALESCE({samples}, 0)) OVER ("
+                f"PARTITION BY tower_id ORDER BY row_no ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS prev "
+                f"FROM {STAGE_TABLE} WHERE tower_id IS NOT NULL) w WHERE s.row_no = w.row_no"
+            )
+        else:
+            cursor.execute(f"UPDATE {STAGE_TABLE} SET prev_samples = old_samples WHERE tower_id IS NOT NULL")
+
+        if job_id:
+            cursor.execute(
+                f"SELECT {mcc}, {mnc}, {cell_id}, {lac}, "
+                f"CASE WHEN tower_id IS NULL THEN 'created' "
+                f"WHEN {new_samples} > prev_samples THEN 'updated_samples' "
+                f"WHEN {new_samples} = prev_samples THEN 'verified' ELSE 'skipped' END, "
+                f"prev_samples, {new_samples}, old_lat, old_lon, {_column('lat')}, {_column('lon')} "
+                f"FROM {STAGE_TABLE} s WHERE row_no %% %s = 0 ORDER BY row_no",
+                [progress_every],
+            )
+            for r in cursor.fetchall():
+                append_update(
+                    job_id,
+                    {
+                        "key": {"mcc": r[0], "mnc": r[1], "cell_id": r[2], "lac": r[3]},
+                        "action": r[4],
+                        "old_samples": r[5],
+                        "new_samples": r[6],
+                        "old_lat": r[7],
+                        "old_lon": r[8],
+                        "new_lat": r[9],
+                        "new_lon": r[10],
+                    },
+                )
+
+        cursor.execute(
+            f"WITH inserted AS ("
+            f"INSERT INTO {table} ({cols}, {calibrated}, {checked}, {verified}, {created_at}, {updated_at}) "
+            f"SELECT {s_cols}, FALSE, 1, 1, %s, %s FROM {STAGE_TABLE} s WHERE s.tower_id IS NULL ORDER BY s.row_no "
+            f"ON CONFLICT ({mcc}, {mnc}, {cell_id}, {lac}) DO NOTHING RETURNING {pk}) "
+            f"INSERT INTO {CREATED_TABLE} SELECT {pk} FROM inserted",
+            [now, now],
+        )
+        created = max(0, cursor.rowcount)
+
+        updated_ids: List[int] = []
+        if update_existing:
+            # The last row that raised a tower's samples is the one it ends up with.
+            cursor.execute(
+                f"UPDATE {table} t SET {copied}, {samples} = {new_samples}, {updated_at} = %s "
+                f"FROM (SELECT DISTINCT ON (tower_id) * FROM {STAGE_TABLE} s "
+                f"WHERE tower_id IS NOT NULL AND {new_samples} > prev_samples ORDER BY tower_id, row_no DESC) s "
+                f"WHERE t.{pk} = s.tower_id",
+                [now],
+            )
+            cursor.execute(
+                f"UPDATE {table} t SET {checked} = t.{checked} + c.n_rows, {verified} = t.{verified} + c.n_verified, "
+                f"{updated_at} = %s "
+                f"FROM (SELECT tower_id, COUNT(*) AS n_rows, "
+                f"COUNT(*) FILTER (WHERE {new_samples} = prev_samples) AS n_verified "
+                f"FROM {STAGE_TABLE} s WHERE tower_id IS NOT NULL GROUP BY tower_id) c "
+                f"WHERE t.{pk} = c.tower_id RETURNING t.{pk}",
+                [now],
+            )
+            updated_ids.extend(r[0] for r in cursor.fetchall())
+
+        cursor.execute(f"DROP TABLE {STAGE_TABLE}")
+    return created, updated_ids
@@ -0,0 +1,75 @@
+"""
+Opening tower dumps as they are published: plain, gzip, bzip2 or zip CSV, with or
+without a header row.
+
+OpenCellID and MLS exports (`cell_towers.csv.gz`, `MLS-full-cell-export-*.csv.gz`)
+ship without a header in the `OPENCELLID_COLUMNS` layout; their column names are
+aliases in `CSV_FIELD_MAPPING`, so such rows normalize like any headered CSV.
+"""
+
+import bz2
+import gzip
+import io
+import zipfile
+
+OPENCELLID_COLUMNS = (
+    "radio",
+    "mcc",
+    "net",
+    "area",
+    "cell",
+    "unit",
+    "lon",
+    "lat",
+    "range",
+    "samples",
+    "changeable",
+    "created",
+    "updated",
+    "averageSignal",
+)
+
+LAYOUTS = ("auto", "header", "opencellid")
+
+_RADIO_NAMES = {"GSM", "UMTS", "CDMA", "LTE", "NR"}
+
+
+def open_tower_source(file_obj):
+    """
+    A readable, seekable stream of the CSV text in `file_obj`, decompressing gzip,
+    bzip2 or zip (its first `.csv` member, else its first file) by magic bytes, so
+    uploads saved under any name work. Text streams are returned as they are.
+    """
+    if isinstance(file_obj, io.TextIOBase):
+        file_obj.seek(0)
+        return file_obj
+    file_obj.seek(0)
+    magic = file_obj.read(4)
+    file_obj.seek(0)
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=file_obj, mode="rb")
+    if magic[:3] == b"BZh":
+        return bz2.BZ2File(file_obj, mode="rb")
+    if magic == b"PK\x03\x04":
+        archive = zipfile.ZipFile(file_obj)
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if not members:
+            raise ValueError("Zip archive contains no files")
+        csv_members = [info for info in members if info.filename.lower().endswith(".csv")]
+        return archive.open((csv_members or members)[0])
+    return file_obj
+
+
+def is_headerless(stream, layout: str = "auto") -> bool:
+    """Whether `stream` is in the header-less OpenCellID layout (sniffed from its first line for "auto")."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}' (expected one of {', '.join(LAYOUTS)})")
+    if layout != "auto":
+        return layout == "opencellid"
+    stream.seek(0)
+    first_line = stream.readline()
+    stream.seek(0)
+    if isinstance(first_line, bytes):
+        first_line = first_line.decode("utf-8", errors="replace")
+    fields = first_line.strip().lstrip("\ufeff").split(",")
+    return len(fields) >= 2 and fields[0].strip().upper() in _RADIO_NAMES and fields[1].strip().isdigit()
@@ -288,6 +288,10 @@ PATH_LOSS = {
     'N_DEFAULT': 2.6145,
     # Reference loss at 1 meter (dB)
     'REF_LOSS': 80,
+    # Use each tower's band-derived reference loss (CellTower.ref_loss_db, from EARFCN)
+    # instead of REF_LOSS. N_DEFAULT was calibrated against the flat REF_LOSS, so
+    # recalibrate before turning this on.
+    'BAND_REF_LOSS': _env_bool("PATH_LOSS_BAND_REF_LOSS", False),
 }
 
 # ==================== Towers / Map Defaults ====================
@@ -314,3 +318,120 @@ GOOGLE_GEOLOCATION_API_KEY = os.getenv("GOOGLE_GEOLOCATION_API_KEY", "").strip()
 
 # If enabled, snapshot neighbor towers may be resolved via external APIs (paid).
 ALLOW_EXTERNAL_NEIGHBOR_LOOKUP = _env_bool("ALLOW_EXTERNAL_NEIGHBOR_LOOKUP", False)
+
+# ==================== Tower Resolver Caching ====================
+# Worker-wide LRU/TTL cache of LOCAL_DB hits keyed on tower identity (mcc, mnc, cell_id, lac).
+TOWER_CACHE = {
+    "ENABLED": _env_bool("TOWER_CACHE_ENABLED", True),
+    "MAX_ENTRIES": int(os.getenv("TOWER_CACHE_MAX_ENTRIES", 50000)),
+    "TTL_S": float(os.getenv("TOWER_CACHE_TTL_S", 600)),
+}
+
+# Negative cache for cells no external provider could resolve (seconds per outcome).
+TOWER_NEGATIVE_CACHE = {
+    "ENABLED": _env_bool("TOWER_NEGATIVE_CACHE_ENABLED", True),
+    "MAX_ENTRIES": int(os.getenv("TOWER_NEGATIVE_CACHE_MAX_ENTRIES", 20000)),
+    "TTL_S": {
+        "NOT_FOUND": float(os.getenv("TOWER_NEGATIVE_TTL_NOT_FOUND_S", 6 * 3600)),
+        "HTTP_ERROR": float(os.getenv("TOWER_NEGATIVE_TTL_HTTP_ERROR_S", 300)),
+        "TIMEOUT": float(os.getenv("TOWER_NEGATIVE_TTL_TIMEOUT_S", 60)),
+    },
+}
+
+# PCI signature lookups: rank candidates by distance to the reference point in SQL.
+TOWER_SIGNATURE_LOOKUP = {
+    "SQL_RANKING": _env_bool("TOWER_SIGNATURE_SQL_RANKING", True),
+    "BBOX_RADIUS_M": float(os.getenv("TOWER_SIGNATURE_BBOX_RADIUS_M", 30000)),
+}
+
+# How external providers are queried for one cell: sequential | parallel | hedged.
+# PICK=first returns the first answer; PICK=most_accurate waits up to DEADLINE_S for the best one.
+TOWER_PROVIDER_FANOUT = {
+    "MODE": os.getenv("TOWER_PROVIDER_MODE", "sequential").strip().lower(),
+    "HEDGE_DELAY_S": float(os.getenv("TOWER_PROVIDER_HEDGE_DELAY_S", 1.0)),
+    "DEADLINE_S": float(os.getenv("TOWER_PROVIDER_DEADLINE_S", 12.0)),
+    "PICK": os.getenv("TOWER_PROVIDER_PICK", "first").strip().lower(),
+    "TIMEOUT_S": float(os.getenv("TOWER_PROVIDER_TIMEOUT_S", 10.0)),
+    "MAX_WORKERS": int(os.getenv("TOWER_PROVIDER_MAX_WORKERS", 16)),
+    "ASYNC_MAX_CONCURRENCY": int(os.getenv("TOWER_PROVIDER_ASYNC_MAX_CONCURRENCY", 32)),
+}
+
+# Coalesce concurrent external lookups of the same cell (see cellular/services/singleflight.py).
+TOWER_SINGLE_FLIGHT = {
+    "ENABLED": _env_bool("TOWER_SINGLE_FLIGHT_ENABLED", True),
+    # Also lock across processes through the Django cache (needs a shared backend).
+    "DISTRIBUTED": _env_bool("TOWER_SINGLE_FLIGHT_DISTRIBUTED", False),
+    "CACHE_ALIAS": os.getenv("TOWER_SINGLE_FLIGHT_CACHE_ALIAS", "default"),
+    "LOCK_TTL_S": float(os.getenv("TOWER_SINGLE_FLIGHT_LOCK_TTL_S", 30.0)),
+    "WAIT_S": float(os.getenv("TOWER_SINGLE_FLIGHT_WAIT_S", 15.0)),
+}
+
+# Buffer checked_count bumps / provider updates of known towers and flush them in bulk
+# (see cellular/services/write_behind.py). Off: saved in the request path.
+TOWER_WRITE_BEHIND = {
+    "ENABLED": _env_bool("TOWER_WRITE_BEHIND_ENABLED", False),
+    "FLUSH_INTERVAL_S": float(os.getenv("TOWER_WRITE_BEHIND_FLUSH_INTERVAL_S", 5.0)),
+    "MAX_PENDING": int(os.getenv("TOWER_WRITE_BEHIND_MAX_PENDING", 500)),
+}
+
+# Shared HTTP transport for external providers (see cellular/services/providers/transport.py):
+# pooled sessions, per-provider token bucket and circuit breaker.
+TOWER_PROVIDER_TRANSPORT = {
+    "POOL_MAXSIZE": int(os.getenv("TOWER_PROVIDER_POOL_MAXSIZE", 32)),
+    "RATE_PER_S": float(os.getenv("TOWER_PROVIDER_RATE_PER_S", 20)),
+    "BURST": int(os.getenv("TOWER_PROVIDER_BURST", 40)),
+    "MAX_WAIT_S": float(os.getenv("TOWER_PROVIDER_RATE_MAX_WAIT_S", 2.0)),
+    "BREAKER_ERROR_RATE": float(os.getenv("TOWER_PROVIDER_BREAKER_ERROR_RATE", 0.5)),
+    "BREAKER_SLOW_CALL_S": float(os.getenv("TOWER_PROVIDER_BREAKER_SLOW_CALL_S", 5.0)),
+    "BREAKER_OPEN_S": float(os.getenv("TOWER_PROVIDER_BREAKER_OPEN_S", 30)),
+    "PROVIDERS": {},
+}
+
+# Worker-resident columnar tower index for DB-free local lookups
+# (see cellular/services/tower_index.py for the memory budget).
+TOWER_INDEX = {
+    "ENABLED": _env_bool("TOWER_INDEX_ENABLED", False),
+    # "memory" loads towers into each worker; "mmap" maps the file at PATH
+    # (written by `manage.py export_tower_file`) once for all workers.
+    "BACKEND": os.getenv("TOWER_INDEX_BACKEND", "memory"),
+    "PATH": os.getenv("TOWER_INDEX_PATH", ""),
+    "REFRESH_INTERVAL_S": float(os.getenv("TOWER_INDEX_REFRESH_INTERVAL_S", 60)),
+    "FULL_RELOAD_S": float(os.getenv("TOWER_INDEX_FULL_RELOAD_S", 3600)),
+    "REFRESH_OVERLAP_S": float(os.getenv("TOWER_INDEX_REFRESH_OVERLAP_S", 5)),
+}
+
+# Batch locate endpoint (/api/v1/locate/batch/).
+LOCATE_BATCH = {
+    "MAX_REPORTS": int(os.getenv("LOCATE_BATCH_MAX_REPORTS", 1000)),
+}
+
+# Cache of locate results keyed on resolved towers + quantized RSRP/TA/RSRQ
+# (see cellular/services/locate_cache.py).
+LOCATE_CACHE = {
+    "ENABLED": _env_bool("LOCATE_CACHE_ENABLED", True),
+    "MAX_ENTRIES": int(os.getenv("LOCATE_CACHE_MAX_ENTRIES", 20000)),
+    "TTL_S": float(os.getenv("LOCATE_CACHE_TTL_S", 60)),
+    "RSRP_BUCKET_DB": float(os.getenv("LOCATE_CACHE_RSRP_BUCKET_DB", 2)),
+    "TA_BUCKET": float(os.getenv("LOCATE_CACHE_TA_BUCKET", 1)),
+    "RSRQ_BUCKET_DB": float(os.getenv("LOCATE_CACHE_RSRQ_BUCKET_DB", 2)),
+}
+
+# Per-device tracking for locate requests with a device_id: warm-started solve +
+# constant-velocity Kalman filter (see cellular/services/tracking.py).
+TRACKING = {
+    "ENABLED": _env_bool("TRACKING_ENABLED", True),
+    "MAX_DEVICES": int(os.getenv("TRACKING_MAX_DEVICES", 10000)),
+    "TTL_S": float(os.getenv("TRACKING_TTL_S", 900)),
+    "MAX_GAP_S": float(os.getenv("TRACKING_MAX_GAP_S", 300)),
+    "ACCEL_STD_MPS2": float(os.getenv("TRACKING_ACCEL_STD_MPS2", 1.5)),
+}
+
+# Tower CSV imports: streamed in chunks; on PostgreSQL each chunk is COPY'd into a
+# staging table and merged set-wise (see cellular/utils/pg_import.py).
+TOWER_IMPORT = {
+    "CHUNK_SIZE": int(os.getenv("TOWER_IMPORT_CHUNK_SIZE", 5000)),
+    "PG_COPY": _env_bool("TOWER_IMPORT_PG_COPY", True),
+    "COPY_CHUNK_SIZE": int(os.getenv("TOWER_IMPORT_COPY_CHUNK_SIZE", 50000)),
+    # Parse/normalize processes feeding the ordered DB writer; 0 parses in-process.
+    "WORKERS": int(os.getenv("TOWER_IMPORT_WORKERS", 0)),
+}
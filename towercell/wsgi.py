@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'towercell.settings')
 
 application = get_wsgi_application()
+
+# Load the in-memory tower index (no-op unless TOWER_INDEX["ENABLED"]).
+from cellular.services.tower_index import warm_tower_index  # noqa: E402
+
+warm_tower_index()